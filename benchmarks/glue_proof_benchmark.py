@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+# TODO: makes the benchmark able to import rulam when run from the repo directory
+sys.path.append(os.path.abspath("."))
+sys.path.append(os.path.abspath(".."))
+
+from nltk.sem import linearlogic
+from nltk.sem.glue import Glue
+from rulam import glue_proof
+from rulam.canonical import structural_key
+from rulam.drt_glue import DrtGlueFormula
+from rulam.glue_proof import prove
+
+"""
+Time of ``nltk.sem.glue.Glue.get_readings`` and of the indexed engine of
+``rulam.glue_proof`` on noun phrases with a growing number of modifiers, then of
+the keys of the derivations of the indexed engine, computed from the structure of
+the glue or, as before, by simplifying it again and formatting its bindings, up to
+bigger noun phrases (nltk is too slow for them)
+
+    python3 benchmarks/glue_proof_benchmark.py [max_modifiers] [repeat] [max_key_modifiers]
+"""
+
+
+def modified_noun_premises(modifiers):
+    premises = [
+        (r"\x.([],[zajats(x)])", "(gv -o gr)"),
+        (r"\P Q.(([x],[]) + P(x) + Q(x))", "((gv -o gr) -o ((g -o G) -o G))"),
+        (r"\x.([],[bezhat(x)])", "(g -o f)"),
+    ]
+    for i in range(modifiers):
+        premises.append((r"\P x.(([],[adj%s(x)]) + P(x))" % i, "((gv -o gr) -o (gv -o gr))"))
+    return premises
+
+
+def compile_agenda(premises):
+    return Glue().gfl_to_compiled([DrtGlueFormula(meaning, glue) for meaning, glue in premises])
+
+
+def measure(get_readings, premises, repeat):
+    best = None
+    for _ in range(repeat):
+        agenda = compile_agenda(premises)
+        start = time.perf_counter()
+        readings = get_readings(agenda)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, readings
+
+
+def string_glue_key(glue, glue_simp, indices):
+    """The key of a derivation as it was computed before ``glue_proof._glue_key``"""
+    bindings = ()
+    if isinstance(glue, linearlogic.ApplicationExpression):
+        bindings = tuple(sorted(
+            (str(variable), str(value)) for variable, value in glue.bindings.d.items()
+        ))
+    return structural_key(glue.simplify()), bindings, indices
+
+
+def measure_glue_keys(premises, repeat):
+    """Time of the keys of all the derivations of ``prove``, computed either way"""
+    derivations = []
+    glue_key = glue_proof._glue_key
+
+    def recording_glue_key(*derivation):
+        derivations.append(derivation)
+        return glue_key(*derivation)
+
+    glue_proof._glue_key = recording_glue_key
+    try:
+        prove(compile_agenda(premises))
+    finally:
+        glue_proof._glue_key = glue_key
+
+    times = []
+    for key in (string_glue_key, glue_key):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for derivation in derivations:
+                key(*derivation)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times.append(best)
+    string_time, structural_time = times
+    return len(derivations), string_time, structural_time
+
+
+def main(max_modifiers=5, repeat=3, max_key_modifiers=6):
+    glue = Glue()
+    print("modifiers  readings      nltk   indexed  speedup")
+    for modifiers in range(1, max_modifiers + 1):
+        premises = modified_noun_premises(modifiers)
+        nltk_time, nltk_readings = measure(glue.get_readings, premises, repeat)
+        indexed_time, indexed_readings = measure(prove, premises, repeat)
+        assert sorted(set(map(str, nltk_readings))) == sorted(
+            str(formula.meaning) for formula in indexed_readings
+        )
+        print("%9d  %8d  %7.3fs  %7.3fs  %6.1fx" % (
+            modifiers, len(indexed_readings), nltk_time, indexed_time, nltk_time / indexed_time
+        ))
+
+    print()
+    print("modifiers  derivations  string keys  structural keys  speedup")
+    for modifiers in range(1, max_key_modifiers + 1):
+        derivations, string_time, structural_time = measure_glue_keys(
+            modified_noun_premises(modifiers), repeat
+        )
+        print("%9d  %11d  %10.4fs  %14.4fs  %6.1fx" % (
+            modifiers, derivations, string_time, structural_time, string_time / structural_time
+        ))
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
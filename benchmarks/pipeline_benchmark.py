@@ -0,0 +1,185 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+from functools import reduce
+from operator import add
+# TODO: makes the benchmark able to import rulam when run from the repo directory
+sys.path.append(os.path.abspath("."))
+sys.path.append(os.path.abspath(".."))
+
+import nltk
+from nltk.parse.dependencygraph import DependencyGraph
+from rulam.anaphora_resolution import resolve_anaphora
+from rulam.compact_conllu import CompactSentence
+from rulam.dependency_parser import StaticDependencyParser
+from rulam.drt_glue import DrtRuLamGlueDict
+from rulam.glue_reading import BASIC_GRAMMAR_FILENAME, RuLamGlueReadingCommand
+from rulam.web_udpipe_processor import postprocess_conllu
+
+"""
+Time of every stage of the pipeline on recorded UDPipe parses (``fixtures/sentences.conllu``
+replayed by ``StaticDependencyParser``), so the numbers don't depend on the network:
+
+    python3 benchmarks/pipeline_benchmark.py -o results.json
+    python3 benchmarks/pipeline_benchmark.py --compare results.json
+
+The results are JSON (seconds per call of every stage and case), ``--compare`` prints the
+ratios to an earlier run and fails if a stage got slower than ``--threshold`` times.
+"""
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "sentences.conllu")
+
+SENTENCES = {
+    "short": "Заяц бежит",
+    "medium": "Вчера заяц очень быстро бежал.",
+    "long": "Вчера заяц, как всегда, очень быстро и совершенно бесшумно бежал домой.",
+}
+
+# discourses start with a noun, the rest of the sentences refer to it
+DISCOURSE_SIZES = {"short": 2, "medium": 8, "long": 32}
+ANAPHORIC_SENTENCES = [
+    "Он серый", "Он бежит", "Она очень серая.", "Лиса бежит",
+    "Он, конечно, очень быстро бежит.", "Он совсем не серый.",
+]
+
+
+def discourse(size):
+    return ["Заяц бежит"] + list(itertools.islice(itertools.cycle(ANAPHORIC_SENTENCES), size - 1))
+
+
+def measure(function, setup=None, repeat=5, min_run_time=0.05):
+    """
+    Seconds per call of ``function(*setup())``, ``setup`` is not timed. Every run
+    loops until it takes ``min_run_time``, the number of loops is fixed by the first run.
+    """
+    def run(loops):
+        elapsed = 0.0
+        for _ in range(loops):
+            args = setup() if setup is not None else ()
+            start = time.perf_counter()
+            function(*args)
+            elapsed += time.perf_counter() - start
+        return elapsed
+
+    loops = 1
+    while True:
+        elapsed = run(loops)
+        if elapsed >= min_run_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    times = [elapsed / loops] + [run(loops) / loops for _ in range(repeat - 1)]
+    return {
+        "loops": loops,
+        "best": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+    }
+
+
+def run_benchmarks(repeat=5):
+    depparser = StaticDependencyParser.from_conllu_file(FIXTURES)
+    reading_command = RuLamGlueReadingCommand(depparser=depparser)
+    glue = reading_command._glue
+    glue_dict = glue.get_glue_dict()
+    results = []
+
+    def record(stage, case, size, timing):
+        results.append(dict(stage=stage, case=case, size=size, **timing))
+        print("%-30s %-7s %4d  %10.6fs" % (stage, case, size, timing["best"]), file=sys.stderr)
+
+    record("read_file", "basic", len(glue_dict), measure(
+        lambda: DrtRuLamGlueDict(BASIC_GRAMMAR_FILENAME), repeat=repeat
+    ))
+
+    for case, sentence in SENTENCES.items():
+        conllu = depparser.process_text_conllu(sentence)
+        depgraph = DependencyGraph(conllu)
+        compact = CompactSentence.from_conllu(conllu)
+        size = len(compact)
+        glueformulas = glue_dict.to_glueformula_list(depgraph)
+
+        record("postprocess_conllu", case, size, measure(lambda: postprocess_conllu(conllu), repeat=repeat))
+        record("to_glueformula_list", case, size, measure(
+            lambda: glue_dict.to_glueformula_list(depgraph), repeat=repeat
+        ))
+        record("to_glueformula_list[compact]", case, size, measure(
+            lambda: glue_dict.to_glueformula_list(compact), repeat=repeat
+        ))
+        record("glue_proof", case, size, measure(
+            glue.get_readings, lambda: (glue.gfl_to_compiled(glueformulas),), repeat=repeat
+        ))
+
+    for case, size in DISCOURSE_SIZES.items():
+        readings = [
+            reading_command.parse_to_readings(sentence)[0].simplify() for sentence in discourse(size)
+        ]
+        unresolved = reduce(add, readings).simplify()
+
+        record("combine_readings", case, size, measure(
+            lambda: reading_command.combine_readings(readings), repeat=repeat
+        ))
+        record("resolve_anaphora", case, size, measure(lambda: resolve_anaphora(unresolved), repeat=repeat))
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "nltk": nltk.__version__,
+            "machine": platform.machine(),
+        },
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print the ratio of the best times to the baseline, ``False`` if a stage regressed"""
+    baseline_times = {(result["stage"], result["case"]): result["best"] for result in baseline["results"]}
+    ok = True
+    for result in report["results"]:
+        key = (result["stage"], result["case"])
+        if key not in baseline_times:
+            continue
+        ratio = result["best"] / baseline_times[key]
+        regressed = ratio > threshold
+        ok = ok and not regressed
+        print("%-30s %-7s %6.2fx%s" % (key + (ratio, "  REGRESSION" if regressed else "")))
+    return ok
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description="Benchmark of every stage of the pipeline")
+    argparser.add_argument("-o", "--output", help="JSON file of the results, stdout if omitted")
+    argparser.add_argument("--repeat", type=int, default=5)
+    argparser.add_argument("--compare", help="JSON results of an earlier run")
+    argparser.add_argument(
+        "--threshold", type=float, default=1.5, help="slowdown of a stage counted as a regression"
+    )
+    args = argparser.parse_args(argv)
+
+    with warnings.catch_warnings():
+        # DependencyGraph looks for a 'ROOT' relation, UDPipe calls it 'root'
+        warnings.simplefilter("ignore", UserWarning)
+        report = run_benchmarks(args.repeat)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            if not compare(report, json.load(baseline), args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+"""
+Import time of rulam and of its entry points, every import in a fresh interpreter:
+
+    python3 benchmarks/startup_benchmark.py -o startup.json
+    python3 benchmarks/startup_benchmark.py --compare startup.json
+
+``import rulam`` must not load NLTK or requests, ``--max-rulam`` fails the run
+if it takes longer than that many seconds.
+"""
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "rulam",
+    "rulam.symbolizer",
+    "rulam.compact_conllu",
+    "rulam.web_udpipe_processor",
+    "rulam.dependency_parser",
+    "rulam.glue_reading",
+    "rulam.parser",
+]
+
+HEAVY_MODULES = ["nltk", "requests"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def measure_import(module, repeat=5):
+    """Seconds taken by ``import module`` and the heavy modules it loaded"""
+    times = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO, check=True, stdout=subprocess.PIPE, universal_newlines=True,
+        ).stdout
+        seconds, loaded = json.loads(output.strip().splitlines()[-1])
+        times.append(seconds)
+    return {
+        "best": min(times),
+        "median": statistics.median(times),
+        "loaded": loaded,
+    }
+
+
+def run_benchmarks(repeat=5):
+    results = []
+    for module in MODULES:
+        timing = measure_import(module, repeat)
+        results.append(dict(module=module, **timing))
+        print("%-30s %8.1fms  %s" % (module, timing["best"] * 1000, " ".join(timing["loaded"])), file=sys.stderr)
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+        },
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print the ratio of the best times to the baseline, ``False`` if an import regressed"""
+    baseline_times = {result["module"]: result["best"] for result in baseline["results"]}
+    ok = True
+    for result in report["results"]:
+        if result["module"] not in baseline_times:
+            continue
+        ratio = result["best"] / baseline_times[result["module"]]
+        regressed = ratio > threshold
+        ok = ok and not regressed
+        print("%-30s %6.2fx%s" % (result["module"], ratio, "  REGRESSION" if regressed else ""))
+    return ok
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description="Import time of rulam")
+    argparser.add_argument("-o", "--output", help="JSON file of the results, stdout if omitted")
+    argparser.add_argument("--repeat", type=int, default=5)
+    argparser.add_argument("--compare", help="JSON results of an earlier run")
+    argparser.add_argument(
+        "--threshold", type=float, default=1.5, help="slowdown of an import counted as a regression"
+    )
+    argparser.add_argument(
+        "--max-rulam", type=float, default=0.05, help="seconds allowed for a bare 'import rulam'"
+    )
+    args = argparser.parse_args(argv)
+
+    report = run_benchmarks(args.repeat)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    ok = True
+    bare = report["results"][0]
+    if bare["loaded"] or bare["best"] > args.max_rulam:
+        print("'import rulam' took %.1fms and loaded %s" % (bare["best"] * 1000, bare["loaded"]))
+        ok = False
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            ok = compare(report, json.load(baseline), args.threshold) and ok
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,40 @@
-from rulam import anaphora_resolution
-from rulam import drt_glue
-from rulam import glue_reading
-from rulam import glue
-from rulam import parser
-from rulam import symbolizer
-from rulam import udpipe_glue_connector
-from rulam import web_udpipe_processor
+import importlib
+
+"""
+The submodules are imported on first access (``rulam.parser``, ``from rulam import glue``),
+so that ``import rulam`` stays cheap and doesn't load NLTK until the pipeline is used.
+"""
+
+__all__ = [
+    "anaphora_resolution",
+    "async_parser",
+    "batch",
+    "canonical",
+    "compact_conllu",
+    "conllu_cache",
+    "conllu_stream",
+    "dependency_parser",
+    "discourse",
+    "drt_glue",
+    "glue_reading",
+    "glue",
+    "glue_proof",
+    "instrumentation",
+    "local_udpipe_processor",
+    "parser",
+    "serve",
+    "symbolizer",
+    "udpipe_glue_connector",
+    "web_udpipe_processor",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        # import_module sets the attribute of the package, __getattr__ isn't called again
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
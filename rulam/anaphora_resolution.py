@@ -1,3 +1,4 @@
+import typing as tp
 import nltk
 from nltk.sem.logic import (
     AbstractVariableExpression,
@@ -9,6 +10,7 @@ from nltk.sem.logic import (
     LambdaExpression,
     NegatedExpression
 )
+from .instrumentation import stage
 
 
 class PossibleAntecedents(list, nltk.sem.drt.DrtExpression, Expression):
@@ -40,37 +42,212 @@ class AnaphoraResolutionException(Exception):
     pass
 
 
-def resolve_anaphora(expression, trail=[]):
-    if isinstance(expression, ApplicationExpression):
-        if expression.is_pronoun_function():
-            possible_antecedents = PossibleAntecedents()
-            for ancestor in trail:
-                for ref in ancestor.get_refs():
-                    refex = expression.make_VariableExpression(ref)
-
-                    # ==========================================================
-                    # Don't allow resolution to itself or other types
-                    # ==========================================================
-                    if refex.__class__ == expression.argument.__class__ and not (
-                        refex == expression.argument
-                    ):
-                        possible_antecedents.append(refex)
+GENDER_PREDICATES = frozenset(["MALE", "FEMALE", "NEUT"])
 
-            if len(possible_antecedents) == 1:
-                resolution = possible_antecedents[0]
-            else:
-                resolution = possible_antecedents
-            return expression.make_EqualityExpression(expression.argument, resolution)
+
+class ReferentLayer(tp.NamedTuple):
+    """
+    Immutable index of the referents accessible after a DRS: its top level referents
+    and gender predicates on top of the layer of the DRSs before it. The threads of
+    a discourse share the layers of the sentences they have in common, so a new
+    sentence only indexes its own referents.
+    """
+    previous: tp.Optional["ReferentLayer"]
+    refexes: tp.Tuple  # referent expressions of the DRS, in order
+    genders: tp.Mapping  # variable -> gender predicate, from the conditions of the DRS
+
+    @classmethod
+    def push(cls, previous: tp.Optional["ReferentLayer"], drs) -> "ReferentLayer":
+        genders = {}
+        _index_genders(drs, genders)
+        refexes = tuple(nltk.sem.drt.DrtVariableExpression(ref) for ref in _get_refs(drs))
+        return cls(previous, refexes, genders)
+
+    def layers(self) -> tp.List["ReferentLayer"]:
+        """This layer and the ones below it, the first DRS first"""
+        layers = []
+        layer = self
+        while layer is not None:
+            layers.append(layer)
+            layer = layer.previous
+        layers.reverse()
+        return layers
+
+
+class AccessibleReferents:
+    """
+    Discourse referents of the ancestors of the node being resolved, outermost
+    ancestor first. Referents are indexed by their expression type, and the
+    gender predicates seen in the DRSs are indexed by referent.
+    """
+
+    def __init__(self, index_genders=True, base: tp.Optional[ReferentLayer] = None):
+        """
+        :param base: referents accessible before all the ancestors, only read
+            when the candidates of a pronoun are first needed
+        """
+        self.index_genders = index_genders
+        self._by_type = {}
+        self._pushed = []
+        self._refexes = {}
+        self.genders = {}
+        self._base = base
+
+    def _load_base(self):
+        base, self._base = self._base, None
+        by_type = {}
+        genders = {}
+        for layer in base.layers():
+            for refex in layer.refexes:
+                by_type.setdefault(refex.__class__, []).append(refex)
+            if self.index_genders:
+                for variable, gender in layer.genders.items():
+                    genders.setdefault(variable, gender)
+        # the referents of the base come before those of the ancestors
+        for refex_class, refexes in self._by_type.items():
+            by_type.setdefault(refex_class, []).extend(refexes)
+        self._by_type = by_type
+        for variable, gender in self.genders.items():
+            genders.setdefault(variable, gender)
+        self.genders = genders
+
+    def _refex(self, ref):
+        try:
+            return self._refexes[ref]
+        except KeyError:
+            refex = self._refexes[ref] = nltk.sem.drt.DrtVariableExpression(ref)
+            return refex
+
+    def push(self, ancestor):
+        refexes = [self._refex(ref) for ref in _get_refs(ancestor)]
+        for refex in refexes:
+            self._by_type.setdefault(refex.__class__, []).append(refex)
+        self._pushed.append(refexes)
+
+        if self.index_genders:
+            _index_genders(ancestor, self.genders)
+
+    def pop(self):
+        for refex in reversed(self._pushed.pop()):
+            self._by_type[refex.__class__].pop()
+
+    def candidates(self, expression_type):
+        if self._base is not None:
+            self._load_base()
+        return self._by_type.get(expression_type, ())
+
+    def gender_agrees(self, first, second):
+        first_gender = self.genders.get(first.variable)
+        second_gender = self.genders.get(second.variable)
+        return first_gender is None or second_gender is None or first_gender == second_gender
+
+
+def _index_genders(drs, genders):
+    if isinstance(drs, nltk.sem.drt.DRS):
+        for cond in drs.conds:
+            if (
+                isinstance(cond, ApplicationExpression)
+                and isinstance(cond.function, AbstractVariableExpression)
+                and cond.function.variable.name in GENDER_PREDICATES
+                and isinstance(cond.argument, AbstractVariableExpression)
+            ):
+                genders.setdefault(cond.argument.variable, cond.function.variable.name)
+
+
+def _get_refs(expression):
+    """``expression.get_refs()`` without recursing into nested concatenations"""
+    refs = []
+    stack = [expression]
+    while stack:
+        expression = stack.pop()
+        if isinstance(expression, nltk.sem.drt.DrtConcatenation):
+            stack.append(expression.second)
+            stack.append(expression.first)
+        elif isinstance(expression, nltk.sem.drt.DrtNegatedExpression):
+            stack.append(expression.term)
         else:
-            r_function = resolve_anaphora(expression.function, trail + [expression])
-            r_argument = resolve_anaphora(expression.argument, trail + [expression])
-            return expression.__class__(r_function, r_argument)
+            refs.extend(expression.get_refs())
+    return refs
 
-    elif isinstance(expression, nltk.sem.drt.DRS):
-        r_conds = []
-        for cond in expression.conds:
-            r_cond = resolve_anaphora(cond, trail + [expression])
 
+def resolve_anaphora(expression, trail=[], match_gender=False, referents: tp.Optional[ReferentLayer] = None):
+    """
+    Replace every pronoun condition ``PRO(x)`` by ``(x = y)``, where ``y`` is the
+    referent accessible from the pronoun (or the list of possible referents).
+
+    The expression is walked once, iteratively, so deeply nested concatenations
+    don't hit the recursion limit.
+
+    :param trail: ancestors of ``expression``, whose referents are accessible too
+    :param referents: referents accessible before those of ``trail``, e.g. of the
+        earlier sentences of a discourse thread
+    :param match_gender: only resolve to referents whose gender predicate
+        (``MALE``, ``FEMALE``, ``NEUT``) doesn't contradict the pronoun's one
+    """
+    with stage("resolve_anaphora"):
+        return _resolve_anaphora(expression, trail, match_gender, referents)
+
+
+def _resolve_anaphora(expression, trail, match_gender, referents=None):
+    accessible = AccessibleReferents(index_genders=match_gender, base=referents)
+    for ancestor in trail:
+        accessible.push(ancestor)
+
+    result = _enter(expression, accessible, match_gender)
+    if not isinstance(result, _Frame):
+        return result
+
+    stack = [result]
+    while True:
+        frame = stack[-1]
+        if frame.next_child < len(frame.children):
+            child = frame.children[frame.next_child]
+            frame.next_child += 1
+            child_result = _enter(child, accessible, match_gender)
+            if isinstance(child_result, _Frame):
+                stack.append(child_result)
+            else:
+                frame.add_result(child_result)
+            continue
+
+        stack.pop()
+        accessible.pop()
+        result = frame.build()
+        if not stack:
+            return result
+        stack[-1].add_result(result)
+
+
+class _Frame:
+    """An expression whose children are being resolved"""
+
+    __slots__ = ("expression", "children", "results", "next_child")
+
+    def __init__(self, expression, children):
+        self.expression = expression
+        self.children = children
+        self.results = []
+        self.next_child = 0
+
+    def add_result(self, result):
+        self.results.append(result)
+
+    def build(self):
+        raise NotImplementedError()
+
+
+class _ApplicationFrame(_Frame):
+    __slots__ = ()
+
+    def build(self):
+        return self.expression.__class__(*self.results)
+
+
+class _DRSFrame(_Frame):
+    __slots__ = ()
+
+    def add_result(self, r_cond):
+        if len(self.results) < len(self.expression.conds):
             # if the condition is of the form '(x = [])' then raise exception
             if isinstance(r_cond, EqualityExpression):
                 if isinstance(r_cond.first, PossibleAntecedents):
@@ -84,40 +261,142 @@ def resolve_anaphora(expression, trail=[]):
                             "Variable '%s' does not "
                             "resolve to anything." % r_cond.first
                         )
+        self.results.append(r_cond)
 
-            r_conds.append(r_cond)
-        if expression.consequent:
-            consequent = resolve_anaphora(expression.consequent, trail + [expression])
+    def build(self):
+        conds_count = len(self.expression.conds)
+        consequent = self.results[conds_count] if self.expression.consequent else None
+        return self.expression.__class__(
+            self.expression.refs, self.results[:conds_count], consequent
+        )
+
+
+class _ConcatenationFrame(_Frame):
+    __slots__ = ()
+
+    def build(self):
+        if self.expression.consequent:
+            consequent, first, second = self.results
         else:
             consequent = None
-        return expression.__class__(expression.refs, r_conds, consequent)
+            first, second = self.results
+        return self.expression.__class__(first, second, consequent)
+
+
+class _LambdaFrame(_Frame):
+    __slots__ = ()
+
+    def build(self):
+        return self.expression.__class__(self.expression.variable, *self.results)
+
+
+def _enter(expression, accessible, match_gender):
+    """
+    Resolve a leaf right away, or make the frame of an inner node
+    (its referents become accessible until the frame is built)
+    """
+    if isinstance(expression, ApplicationExpression):
+        if expression.is_pronoun_function():
+            possible_antecedents = PossibleAntecedents()
+            # ==========================================================
+            # Don't allow resolution to itself or other types
+            # ==========================================================
+            for refex in accessible.candidates(expression.argument.__class__):
+                if not (refex == expression.argument) and (
+                    not match_gender or accessible.gender_agrees(refex, expression.argument)
+                ):
+                    possible_antecedents.append(refex)
+
+            if len(possible_antecedents) == 1:
+                resolution = possible_antecedents[0]
+            else:
+                resolution = possible_antecedents
+            return expression.make_EqualityExpression(expression.argument, resolution)
+        frame = _ApplicationFrame(expression, [expression.function, expression.argument])
+
+    elif isinstance(expression, nltk.sem.drt.DRS):
+        children = list(expression.conds)
+        if expression.consequent:
+            children.append(expression.consequent)
+        frame = _DRSFrame(expression, children)
 
     elif isinstance(expression, AbstractVariableExpression):
         return expression
 
     elif isinstance(expression, NegatedExpression):
-        return expression.__class__(
-            resolve_anaphora(expression.term, trail + [expression])
-        )
+        frame = _ApplicationFrame(expression, [expression.term])
 
     elif isinstance(expression, nltk.sem.drt.DrtConcatenation):
+        children = [expression.first, expression.second]
         if expression.consequent:
-            consequent = resolve_anaphora(expression.consequent, trail + [expression])
-        else:
-            consequent = None
-        return expression.__class__(
-            resolve_anaphora(expression.first, trail + [expression]),
-            resolve_anaphora(expression.second, trail + [expression]),
-            consequent,
-        )
+            children.insert(0, expression.consequent)
+        frame = _ConcatenationFrame(expression, children)
 
     elif isinstance(expression, BinaryExpression):
-        return expression.__class__(
-            resolve_anaphora(expression.first, trail + [expression]),
-            resolve_anaphora(expression.second, trail + [expression]),
-        )
+        frame = _ApplicationFrame(expression, [expression.first, expression.second])
 
     elif isinstance(expression, LambdaExpression):
-        return expression.__class__(
-            expression.variable, resolve_anaphora(expression.term, trail + [expression])
-        )
+        frame = _LambdaFrame(expression, [expression.term])
+
+    else:
+        return None
+
+    accessible.push(expression)
+    return frame
+
+
+class AnaphoraLink(tp.NamedTuple):
+    pronoun: tp.Any  # variable of the pronoun's referent
+    antecedents: tp.List[tp.Any]  # variables it was resolved to, several if it is ambiguous
+
+
+def anaphora_links(unresolved, resolved) -> tp.List[AnaphoraLink]:
+    """
+    Pronouns of ``unresolved`` (its ``PRO(x)`` conditions) and what they were
+    resolved to in ``resolved = resolve_anaphora(unresolved)``, in the order of
+    the conditions
+    """
+    pronouns = {
+        expression.argument.variable
+        for expression in _iter_subexpressions(unresolved)
+        if isinstance(expression, ApplicationExpression) and expression.is_pronoun_function()
+    }
+    links = []
+    for expression in _iter_subexpressions(resolved):
+        if (
+            isinstance(expression, EqualityExpression)
+            and isinstance(expression.first, AbstractVariableExpression)
+            and expression.first.variable in pronouns
+        ):
+            antecedents = expression.second
+            if not isinstance(antecedents, PossibleAntecedents):
+                antecedents = [antecedents]
+            links.append(AnaphoraLink(
+                expression.first.variable, [antecedent.variable for antecedent in antecedents]
+            ))
+    return links
+
+
+def _iter_subexpressions(expression):
+    """The expression and all of its subexpressions, in pre-order"""
+    stack = [expression]
+    while stack:
+        expression = stack.pop()
+        yield expression
+        if isinstance(expression, nltk.sem.drt.DRS):
+            children = list(expression.conds)
+            if expression.consequent:
+                children.append(expression.consequent)
+        elif isinstance(expression, nltk.sem.drt.DrtConcatenation):
+            children = [expression.first, expression.second]
+            if expression.consequent:
+                children.append(expression.consequent)
+        elif isinstance(expression, (NegatedExpression, LambdaExpression)):
+            children = [expression.term]
+        elif isinstance(expression, BinaryExpression):
+            children = [expression.first, expression.second]
+        elif isinstance(expression, ApplicationExpression):
+            children = [expression.function, expression.argument]
+        else:
+            children = []
+        stack.extend(reversed(children))
@@ -0,0 +1,137 @@
+import asyncio
+import typing as tp
+from itertools import islice
+from concurrent.futures import Executor
+from .dependency_parser import UDPipeDependencyParser, WebUDPipeDependencyParser
+from .discourse import read_document
+
+"""
+Asyncio interface for parsing many documents concurrently
+Dependency parsing is I/O bound and runs in the default thread pool of the event
+loop, the glue, DRS and anaphora stages are CPU bound and run in the given executor
+(a ``ProcessPoolExecutor`` scales them beyond a single core).
+"""
+
+Document = tp.List[str]  # sentences of a single discourse
+
+
+class DocumentReadings(tp.NamedTuple):
+    index: int  # position of the document in the input
+    sentence_readings: tp.List[tp.List[tp.Any]]
+    thread_readings: tp.List[tp.Any]
+    error: tp.Optional[Exception] = None
+
+
+async def fetch_conllu(
+    documents: tp.Iterable[Document],
+    depparser: tp.Optional[UDPipeDependencyParser] = None,
+    concurrency: int = 4,
+    max_pending: tp.Optional[int] = None,
+) -> tp.AsyncIterator[tp.Tuple[int, tp.List[str]]]:
+    """
+    Yield ``(index, conllu_sentences)`` of every document as soon as it is parsed,
+    with at most ``concurrency`` documents being parsed at once.
+
+    :param max_pending: documents taken from ``documents`` and not yielded yet at
+        most, ``4 * concurrency`` if ``None``
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    async for index, conllu_sentences in _as_completed(
+        (
+            _fetch_document_conllu(index, document, depparser, semaphore)
+            for index, document in enumerate(documents)
+        ),
+        _max_pending(max_pending, concurrency),
+    ):
+        yield index, conllu_sentences
+
+
+async def iter_readings(
+    documents: tp.Iterable[Document],
+    depparser: tp.Optional[UDPipeDependencyParser] = None,
+    concurrency: int = 4,
+    executor: tp.Optional[Executor] = None,
+    semtype_file: tp.Optional[str] = None,
+    max_threads: tp.Optional[int] = None,
+    max_pending: tp.Optional[int] = None,
+) -> tp.AsyncIterator[DocumentReadings]:
+    """
+    Yield the readings of every document in the order they are completed, so
+    a slow document doesn't hold up the rest of the batch. Failures are reported
+    in ``DocumentReadings.error`` instead of being raised.
+
+    :param concurrency: how many documents are dependency parsed at once
+    :param executor: where the CPU bound stages run, the loop's default executor if ``None``
+    :param max_threads: threads of a document built at most, all of them if ``None``
+    :param max_pending: documents taken from ``documents`` and not yielded yet at
+        most, ``4 * concurrency`` if ``None``
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    async for result in _as_completed(
+        (
+            _read_document(index, document, depparser, semaphore, executor, semtype_file, max_threads)
+            for index, document in enumerate(documents)
+        ),
+        _max_pending(max_pending, concurrency),
+    ):
+        yield result
+
+
+async def _fetch_document_conllu(
+    index: int,
+    document: Document,
+    depparser: tp.Optional[UDPipeDependencyParser],
+    semaphore: asyncio.Semaphore,
+) -> tp.Tuple[int, tp.List[str]]:
+    if depparser is None:
+        depparser = WebUDPipeDependencyParser()
+    async with semaphore:
+        conllu_sentences = await asyncio.get_running_loop().run_in_executor(
+            None, depparser.process_sentences_conllu, document
+        )
+    return index, conllu_sentences
+
+
+async def _read_document(
+    index: int,
+    document: Document,
+    depparser: tp.Optional[UDPipeDependencyParser],
+    semaphore: asyncio.Semaphore,
+    executor: tp.Optional[Executor],
+    semtype_file: tp.Optional[str],
+    max_threads: tp.Optional[int],
+) -> DocumentReadings:
+    try:
+        _, conllu_sentences = await _fetch_document_conllu(index, document, depparser, semaphore)
+        sentence_readings, thread_readings = await asyncio.get_running_loop().run_in_executor(
+            executor, read_document, conllu_sentences, semtype_file, max_threads
+        )
+    except Exception as e:
+        return DocumentReadings(index, [], [], e)
+    return DocumentReadings(index, sentence_readings, thread_readings)
+
+
+def _max_pending(max_pending: tp.Optional[int], concurrency: int) -> int:
+    return 4 * concurrency if max_pending is None else max_pending
+
+
+async def _as_completed(coroutines: tp.Iterable[tp.Awaitable], max_pending: int) -> tp.AsyncIterator:
+    """
+    Results of ``coroutines`` in the order they complete. At most ``max_pending``
+    of them are scheduled at once, the next ones are only taken from ``coroutines``
+    when one completes (``asyncio.as_completed`` would take all of them first).
+    """
+    coroutines = iter(coroutines)
+    pending = set()
+    try:
+        while True:
+            for coroutine in islice(coroutines, max_pending - len(pending)):
+                pending.add(asyncio.ensure_future(coroutine))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
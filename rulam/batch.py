@@ -0,0 +1,283 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import typing as tp
+from .conllu_stream import iter_conllu_sentences
+from .dependency_parser import (
+    LocalUDPipeDependencyParser,
+    UDPipeDependencyParser,
+    WebUDPipeDependencyParser,
+)
+from .discourse import get_reading_command, read_document
+
+"""
+Corpus runner: ``python -m rulam.batch corpus.jsonl -o readings.jsonl``
+Documents are sharded across a process pool, every worker loads the grammar and
+the dependency parser once. The input is read in windows of ``max_pending``
+documents, so a large corpus isn't queued for the pool all at once. Results are written as JSON lines in input order,
+each tagged with the id of its document, so that an interrupted run can be
+resumed with ``--resume`` (the documents already in the output are skipped).
+"""
+
+
+class BatchDocument(tp.NamedTuple):
+    id: tp.Any
+    sentences: tp.Optional[tp.List[str]] = None  # already split into sentences
+    text: tp.Optional[str] = None  # split into sentences by the dependency parser
+
+
+class BatchStats(tp.NamedTuple):
+    documents: int
+    sentences: int
+    errors: int
+    skipped: int  # documents found in the output of an earlier run
+    seconds: float
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0.0
+
+    @property
+    def sentences_per_second(self) -> float:
+        return self.sentences / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            "%s documents (%s failed, %s skipped), %s sentences in %.2fs: "
+            "%.2f documents/s, %.2f sentences/s" % (
+                self.documents, self.errors, self.skipped, self.sentences, self.seconds,
+                self.documents_per_second, self.sentences_per_second,
+            )
+        )
+
+
+def read_jsonl_documents(lines: tp.Iterable[str]) -> tp.Iterator[BatchDocument]:
+    """
+    One JSON object per line: ``{"id": ..., "sentences": [...]}`` or
+    ``{"id": ..., "text": "..."}``; the id defaults to the number of the line
+    """
+    for number, line in enumerate(lines):
+        if not line.strip():
+            continue
+        document = json.loads(line)
+        if "sentences" not in document and "text" not in document:
+            raise ValueError("Document on line %s has neither 'sentences' nor 'text'" % (number + 1))
+        yield BatchDocument(document.get("id", number), document.get("sentences"), document.get("text"))
+
+
+def read_text_documents(lines: tp.Iterable[str]) -> tp.Iterator[BatchDocument]:
+    """Paragraphs (separated by empty lines) are the documents, numbered from 0"""
+    paragraph = []
+    index = 0
+    for line in lines:
+        line = line.strip()
+        if line:
+            paragraph.append(line)
+        elif paragraph:
+            yield BatchDocument(index, text="\n".join(paragraph))
+            paragraph = []
+            index += 1
+    if paragraph:
+        yield BatchDocument(index, text="\n".join(paragraph))
+
+
+# the parser and the semtype file of the worker process, set by _init_worker
+_worker_depparser = None
+_worker_semtype_file = None
+
+
+def _init_worker(
+    depparser: tp.Optional[UDPipeDependencyParser],
+    semtype_file: tp.Optional[str],
+    model_path: tp.Optional[str] = None,
+):
+    global _worker_depparser, _worker_semtype_file
+    if depparser is None:
+        # the model is loaded by every worker, it isn't pickled from the parent
+        depparser = LocalUDPipeDependencyParser(model_path) if model_path else WebUDPipeDependencyParser()
+    _worker_depparser = depparser
+    _worker_semtype_file = semtype_file
+    # load the grammar and the parser's model now rather than with the first document
+    get_reading_command(semtype_file)._glue.get_glue_dict()
+    _worker_depparser.load()
+
+
+def process_document(document: BatchDocument) -> tp.Dict[str, tp.Any]:
+    """
+    JSON record of the readings of a document: the DRS and FOL of every thread
+    whose anaphora could be resolved, or the error that stopped the document
+    """
+    record = {"id": document.id, "sentences": 0, "drs": [], "fol": [], "error": None}
+    try:
+        if document.sentences is not None:
+            conllu_sentences = _worker_depparser.process_sentences_conllu(document.sentences)
+        else:
+            conllu_sentences = list(
+                iter_conllu_sentences([_worker_depparser.process_text_conllu(document.text)])
+            )
+        record["sentences"] = len(conllu_sentences)
+        _, thread_readings = read_document(conllu_sentences, _worker_semtype_file)
+        record["drs"] = [str(reading) for reading in thread_readings]
+        record["fol"] = [str(reading.fol()) for reading in thread_readings]
+    except Exception as e:
+        record["drs"], record["fol"] = [], []
+        record["error"] = "%s: %s" % (type(e).__name__, e)
+    return record
+
+
+def read_finished_ids(path: str) -> tp.Set[tp.Any]:
+    """
+    Ids of the documents already written to the output; a line cut short by
+    a crash is removed from the file
+    """
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+    with open(path, "r+", encoding="utf-8") as output:
+        complete = 0
+        for line in iter(output.readline, ""):
+            if not line.endswith("\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            finished.add(_hashable_id(record["id"]))
+            complete = output.tell()
+        output.truncate(complete)
+    return finished
+
+
+def _hashable_id(id_):
+    return json.dumps(id_) if isinstance(id_, (list, dict)) else id_
+
+
+def run_batch(
+    documents: tp.Iterable[BatchDocument],
+    output: tp.TextIO,
+    workers: tp.Optional[int] = None,
+    depparser: tp.Optional[UDPipeDependencyParser] = None,
+    semtype_file: tp.Optional[str] = None,
+    finished_ids: tp.Collection = (),
+    chunksize: int = 1,
+    progress: tp.Optional[tp.Callable[[BatchStats], None]] = None,
+    max_pending: tp.Optional[int] = None,
+    model_path: tp.Optional[str] = None,
+) -> BatchStats:
+    """
+    Write the record of every document to ``output`` as a JSON line, in input order
+
+    :param workers: size of the process pool, ``os.cpu_count()`` if ``None``;
+        ``0`` processes the documents in this process
+    :param depparser: parser used by every worker (it is pickled), a
+        ``LocalUDPipeDependencyParser`` of ``model_path`` built by every worker or
+        a ``WebUDPipeDependencyParser`` if ``None``
+    :param finished_ids: ids of the documents to skip
+    :param progress: called with the stats after every document
+    :param max_pending: documents read from the input before their records are
+        written at most, ``4 * workers * chunksize`` if ``None``
+    :param model_path: local UDPipe model loaded by every worker if there is no ``depparser``
+    """
+    skipped = 0
+
+    def pending():
+        nonlocal skipped
+        for document in documents:
+            if _hashable_id(document.id) in finished_ids:
+                skipped += 1
+            else:
+                yield document
+
+    start = time.perf_counter()
+    processed = sentences = errors = 0
+
+    def write(records):
+        nonlocal processed, sentences, errors
+        for record in records:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            processed += 1
+            sentences += record["sentences"]
+            errors += record["error"] is not None
+            if progress is not None:
+                progress(BatchStats(processed, sentences, errors, skipped, time.perf_counter() - start))
+
+    if workers == 0:
+        _init_worker(depparser, semtype_file, model_path)
+        write(map(process_document, pending()))
+    else:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if max_pending is None:
+            max_pending = 4 * workers * chunksize
+        with multiprocessing.Pool(workers, _init_worker, (depparser, semtype_file, model_path)) as pool:
+            # Pool.imap would read the whole input ahead of the workers
+            for window in _windows(pending(), max_pending):
+                write(pool.imap(process_document, window, chunksize))
+
+    return BatchStats(processed, sentences, errors, skipped, time.perf_counter() - start)
+
+
+def _windows(iterable: tp.Iterable, size: int) -> tp.Iterator[tp.List]:
+    iterator = iter(iterable)
+    while True:
+        window = list(itertools.islice(iterator, max(size, 1)))
+        if not window:
+            return
+        yield window
+
+
+def main(argv: tp.Optional[tp.List[str]] = None):
+    argparser = argparse.ArgumentParser(
+        prog="python -m rulam.batch", description="Build the DRS of every document of a corpus"
+    )
+    argparser.add_argument("input", help="JSONL or plain text file, '-' for stdin")
+    argparser.add_argument("-o", "--output", help="JSONL file of the results, stdout if omitted")
+    argparser.add_argument(
+        "--format", choices=["auto", "jsonl", "text"], default="auto",
+        help="format of the input, 'auto' decides by the .jsonl extension",
+    )
+    argparser.add_argument("-j", "--workers", type=int, default=None, help="number of processes")
+    argparser.add_argument("--chunksize", type=int, default=1, help="documents sent to a worker at once")
+    argparser.add_argument(
+        "--max-pending", type=int, default=None,
+        help="documents read ahead of the output at most, 4 * workers * chunksize by default",
+    )
+    argparser.add_argument("--model", help="local UDPipe model, the web service is used if omitted")
+    argparser.add_argument("--semtype-file", help="glue semtype file instead of the default grammar")
+    argparser.add_argument(
+        "--resume", action="store_true", help="skip the documents already in the output file"
+    )
+    args = argparser.parse_args(argv)
+
+    if args.resume and not args.output:
+        argparser.error("--resume needs --output")
+    input_format = args.format
+    if input_format == "auto":
+        input_format = "jsonl" if args.input.endswith(".jsonl") else "text"
+    read_documents = read_jsonl_documents if input_format == "jsonl" else read_text_documents
+
+    finished_ids = read_finished_ids(args.output) if args.resume else set()
+    input_file = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output_file = open(args.output, "a" if args.resume else "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        stats = run_batch(
+            read_documents(input_file), output_file, args.workers, None,
+            args.semtype_file, finished_ids, args.chunksize, max_pending=args.max_pending,
+            model_path=args.model,
+        )
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    print(stats, file=sys.stderr)
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import typing as tp
+from nltk.sem import drt, linearlogic
+from nltk.sem.logic import (
+    AbstractVariableExpression,
+    ApplicationExpression,
+    BinaryExpression,
+    NegatedExpression,
+    VariableBinderExpression,
+)
+from .anaphora_resolution import PossibleAntecedents
+
+"""
+Structural keys of expressions: hashable, equal only for expressions of the same
+shape with the same names, and computed in a single walk instead of by
+formatting the expression as a string (which is what ``Expression.__hash__`` does).
+"""
+
+
+def _drs(expression):
+    children = list(expression.conds)
+    if expression.consequent is not None:
+        children.append(expression.consequent)
+    names = tuple(ref.name for ref in expression.refs)
+    return (len(names),) + names + (len(expression.conds), expression.consequent is not None), children
+
+
+def _concatenation(expression):
+    if expression.consequent is not None:
+        return (True,), (expression.first, expression.second, expression.consequent)
+    return (False,), (expression.first, expression.second)
+
+
+def _variable(expression):
+    return (expression.variable.name,), ()
+
+
+def _binder(expression):
+    return (expression.variable.name,), (expression.term,)
+
+
+# the first matching base class decides how a node is walked
+_NODE_KINDS = [
+    (drt.DRS, _drs),
+    (AbstractVariableExpression, _variable),
+    (drt.DrtConcatenation, _concatenation),
+    (BinaryExpression, lambda expression: ((), (expression.first, expression.second))),
+    (ApplicationExpression, lambda expression: ((), (expression.function, expression.argument))),
+    (VariableBinderExpression, _binder),
+    (NegatedExpression, lambda expression: ((), (expression.term,))),
+    (drt.DrtProposition, lambda expression: ((expression.variable.name,), (expression.drs,))),
+    (PossibleAntecedents, lambda expression: ((len(expression),), tuple(expression))),
+    (
+        linearlogic.AtomicExpression,
+        lambda expression: ((expression.name, tuple(expression.dependencies)), ()),
+    ),
+    (
+        linearlogic.ImpExpression,
+        lambda expression: ((), (expression.antecedent, expression.consequent)),
+    ),
+    (
+        linearlogic.ApplicationExpression,
+        lambda expression: ((), (expression.function, expression.argument)),
+    ),
+]
+
+_node_kinds = {}  # class -> its entry in _NODE_KINDS
+
+
+def _node_kind(cls):
+    try:
+        return _node_kinds[cls]
+    except KeyError:
+        for base, children in _NODE_KINDS:
+            if issubclass(cls, base):
+                break
+        else:
+            base, children = object, lambda expression: ((repr(expression),), ())
+        kind = _node_kinds[cls] = (children, children in (_drs, _variable, _binder))
+        return kind
+
+
+def structural_key(expression, bound_variables=False) -> tuple:
+    """
+    Flat pre-order tuple of the node classes and names of ``expression``.
+
+    :param bound_variables: replace the variables bound by lambdas and quantifiers
+        by the number of binders between them and their binder (de Bruijn indices),
+        so that alphabetic variants like ``\\x.P(x)`` and ``\\y.P(y)`` have the same
+        key. Such a key doesn't depend on the context of the expression, the key of
+        ``F(A)`` is the application class followed by the keys of ``F`` and ``A``.
+    """
+    key = []
+    bound = {}  # name -> depths of the binders in scope
+    depth = 0
+    stack = [expression]
+    while stack:
+        expression = stack.pop()
+        if expression.__class__ is _EndOfScope:
+            bound[expression.name].pop()
+            depth -= 1
+            continue
+
+        children, has_names = _node_kind(expression.__class__)
+        tokens, nodes = children(expression)
+        key.append(expression.__class__)
+        if bound_variables and has_names:
+            if children is _binder:
+                bound.setdefault(expression.variable.name, []).append(depth)
+                tokens = ()
+                depth += 1
+                stack.append(_EndOfScope(expression.variable.name))
+            elif bound:
+                tokens = tuple(
+                    depth - bound[token][-1] if isinstance(token, str) and bound.get(token) else token
+                    for token in tokens
+                )
+        key.extend(tokens)
+        stack.extend(reversed(nodes))
+    return tuple(key)
+
+
+def sortable_key(key: tuple) -> tuple:
+    """
+    ``key`` with every token tagged by the name of its type, so that the keys of
+    expressions of different shapes can be ordered (classes and ints don't compare)
+    """
+    return tuple(
+        (token.__qualname__, "") if isinstance(token, type) else (token.__class__.__name__, token)
+        for token in key
+    )
+
+
+class _EndOfScope(tp.NamedTuple):
+    name: str
+
+
+def alpha_normal_key(expression) -> tuple:
+    """
+    Structural key of ``expression`` that doesn't depend on the names of its bound
+    variables: discourse referents of DRSs and variables of lambdas and quantifiers
+    are numbered in the order they are introduced, so that ``([x],[P(x)])`` and
+    ``([z3],[P(z3)])`` have the same key. Free variables keep their names.
+    Two expressions with the same key are alphabetic variants of each other.
+    """
+    key = []
+    bound = {}  # name -> numbers of the referents and binders in scope
+    introduced = 0
+    stack = [expression]
+    while stack:
+        expression = stack.pop()
+        if expression.__class__ is _EndOfScope:
+            bound[expression.name].pop()
+            continue
+
+        children, has_names = _node_kind(expression.__class__)
+        tokens, nodes = children(expression)
+        key.append(expression.__class__)
+        if has_names:
+            if children is _variable:
+                numbers = bound.get(tokens[0])
+                if numbers:
+                    tokens = (numbers[-1],)
+            else:
+                # the referents of a DRS scope over its conditions and consequent,
+                # a binder's variable over its term
+                names = tokens[1:1 + tokens[0]] if children is _drs else tokens
+                numbers = []
+                for name in names:
+                    bound.setdefault(name, []).append(introduced)
+                    stack.append(_EndOfScope(name))
+                    numbers.append(introduced)
+                    introduced += 1
+                tokens = (
+                    (tokens[0],) + tuple(numbers) + tokens[1 + tokens[0]:]
+                    if children is _drs else tuple(numbers)
+                )
+        key.extend(tokens)
+        stack.extend(reversed(nodes))
+    return tuple(key)
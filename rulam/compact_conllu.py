@@ -0,0 +1,194 @@
+import sys
+import typing as tp
+from array import array
+from collections.abc import Mapping
+from types import MappingProxyType
+
+"""
+Columnar representation of a dependency parsed sentence
+Every CoNLL-U column is a list (or an int array) indexed by token, the repetitive
+columns (UPOS, XPOS, FEATS, DEPREL and lemmas) hold interned strings shared by
+all sentences. Nodes are views into the columns with the keys of the node dicts
+of ``nltk.DependencyGraph``, so the glue dict walks them without building a graph.
+"""
+
+
+class CompactSentence:
+    __slots__ = (
+        "words", "lemmas", "upos", "xpos", "feats", "heads", "rels",
+        "_child_offsets", "_children", "_extra_dependencies", "nodes",
+    )
+
+    def __init__(self, words, lemmas, upos, xpos, feats, heads, rels):
+        """
+        Columns of the tokens, token ``i`` has the address ``i + 1``
+        """
+        self.words = list(words)
+        self.lemmas = [sys.intern(lemma) for lemma in lemmas]
+        self.upos = [sys.intern(tag) for tag in upos]
+        self.xpos = [sys.intern(tag) for tag in xpos]
+        self.feats = [sys.intern(feats) for feats in feats]
+        self.heads = array("i", heads)
+        self.rels = [sys.intern(rel) for rel in rels]
+        self._extra_dependencies = None
+        self._index_dependents()
+        self.nodes = CompactNodes(self)
+
+    @classmethod
+    def from_conllu(cls, conllu: str) -> "CompactSentence":
+        """
+        Read a single CoNLL-U sentence; comments, multiword tokens and empty
+        nodes are skipped (just like ``DependencyGraph`` does)
+        """
+        columns = ([], [], [], [], [], [], [])
+        for line in conllu.splitlines():
+            if not line or line.startswith("#"):
+                continue
+            cells = line.split("\t")
+            if len(cells) != 10:
+                raise ValueError("CoNLL-U line should have 10 fields: %r" % line)
+            if cells[6] == "_":
+                continue
+            for column, value in zip(columns, (cells[1], cells[2], cells[3], cells[4], cells[5], int(cells[6]), cells[7])):
+                column.append(value)
+        return cls(*columns)
+
+    def _index_dependents(self):
+        # the dependents of every node, grouped by relation in the order the relations
+        # first occur, as in the 'deps' dicts of DependencyGraph; stored as
+        # _children[_child_offsets[address]:_child_offsets[address + 1]]
+        groups = [None] * (len(self.heads) + 1)
+        for address, (head, rel) in enumerate(zip(self.heads, self.rels), start=1):
+            if not 0 <= head <= len(self.heads):
+                raise ValueError("Token %s has no head %s" % (address, head))
+            if groups[head] is None:
+                groups[head] = {}
+            groups[head].setdefault(rel, []).append(address)
+
+        self._child_offsets = array("i", [0])
+        self._children = array("i")
+        for node_groups in groups:
+            if node_groups is not None:
+                for dependents in node_groups.values():
+                    self._children.extend(dependents)
+            self._child_offsets.append(len(self._children))
+
+    def __len__(self):
+        return len(self.heads)
+
+    @property
+    def root(self) -> tp.Optional["CompactNode"]:
+        top_dependents = self.dependents(0)
+        return self.nodes[top_dependents[0]] if top_dependents else None
+
+    def dependents(self, address: int) -> tp.Sequence[int]:
+        """
+        Addresses of the dependents of the node, in the order of
+        ``chain.from_iterable(node['deps'].values())`` of ``DependencyGraph``
+        """
+        if self._extra_dependencies is not None and address in self._extra_dependencies:
+            return [
+                dependent
+                for dependents in self._extra_dependencies[address].values()
+                for dependent in dependents
+            ]
+        return self._children[self._child_offsets[address]:self._child_offsets[address + 1]]
+
+    def dependency_groups(self, address: int) -> tp.Dict[str, tp.List[int]]:
+        if self._extra_dependencies is not None and address in self._extra_dependencies:
+            return {rel: list(dependents) for rel, dependents in self._extra_dependencies[address].items()}
+        groups = {}
+        for dependent in self._children[self._child_offsets[address]:self._child_offsets[address + 1]]:
+            groups.setdefault(self.rels[dependent - 1], []).append(dependent)
+        return groups
+
+    def add_dependency(self, address: int, rel: str, dependent: int):
+        """Same as ``node['deps'].setdefault(rel, []).append(dependent)``"""
+        if self._extra_dependencies is None:
+            self._extra_dependencies = {}
+        if address not in self._extra_dependencies:
+            self._extra_dependencies[address] = self.dependency_groups(address)
+        self._extra_dependencies[address].setdefault(rel, []).append(dependent)
+
+    def to_conllu(self) -> str:
+        return "\n".join(
+            "\t".join((
+                str(address), self.words[i], self.lemmas[i], self.upos[i], self.xpos[i],
+                self.feats[i], str(self.heads[i]), self.rels[i], "_", "_"
+            ))
+            for i, address in enumerate(range(1, len(self) + 1))
+        )
+
+
+class CompactNodes:
+    """
+    ``DependencyGraph.nodes`` look-alike: node views by address, every view
+    is made when its node is first looked up
+    """
+
+    __slots__ = ("sentence", "_views")
+
+    def __init__(self, sentence: CompactSentence):
+        self.sentence = sentence
+        self._views = [None] * (len(sentence) + 1)
+
+    def __getitem__(self, address: int) -> "CompactNode":
+        try:
+            view = self._views[address] if address >= 0 else None
+        except IndexError:
+            view = None
+        if view is None:
+            if not 0 <= address < len(self._views):
+                raise KeyError(address)
+            view = self._views[address] = CompactNode(self.sentence, address)
+        return view
+
+    def __len__(self):
+        return len(self._views)
+
+    def __iter__(self):
+        return iter(range(len(self._views)))
+
+
+class CompactNode(Mapping):
+    """
+    Read-only view of a node with the keys of a ``DependencyGraph`` node dict
+    """
+
+    __slots__ = ("sentence", "address")
+
+    KEYS = ("address", "word", "lemma", "ctag", "tag", "feats", "head", "deps", "rel")
+
+    # node dict key -> column of CompactSentence
+    _COLUMNS = {
+        "word": "words", "lemma": "lemmas", "ctag": "upos", "tag": "xpos",
+        "feats": "feats", "head": "heads", "rel": "rels",
+    }
+
+    def __init__(self, sentence: CompactSentence, address: int):
+        self.sentence = sentence
+        self.address = address
+
+    def __getitem__(self, key):
+        column = self._COLUMNS.get(key)
+        if column is not None:
+            if self.address == 0:
+                return "TOP" if key in ("ctag", "tag") else None
+            return getattr(self.sentence, column)[self.address - 1]
+        if key == "address":
+            return self.address
+        if key == "deps":
+            return MappingProxyType(self.sentence.dependency_groups(self.address))
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def dependents(self) -> tp.Sequence[int]:
+        return self.sentence.dependents(self.address)
+
+    def __repr__(self):
+        return "CompactNode(%r)" % dict(self)
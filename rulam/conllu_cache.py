@@ -0,0 +1,197 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import typing as tp
+import unicodedata
+from collections import OrderedDict
+
+"""
+Content-addressed cache of UDPipe CoNLL-U output
+Entries are kept in memory with LRU eviction and, optionally, in a sqlite file
+so that they survive worker restarts.
+"""
+
+DEFAULT_MAX_BYTES = 64 << 20  # UTF-8 size of the CoNLL-U kept in memory by default
+
+
+def normalize_text(text: str) -> str:
+    """
+    Whitespace differences within a line don't change the parse, line breaks do
+    (they separate sentences of the presegmented input), so they are kept.
+    """
+    text = unicodedata.normalize("NFC", text)
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines())
+
+
+def make_key(text: str, model: str, options: str = "") -> str:
+    digest = hashlib.sha256()
+    for part in (model, options, normalize_text(text)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ConlluCache:
+    def __init__(
+        self,
+        max_size: int = 10000,
+        max_bytes: tp.Optional[int] = DEFAULT_MAX_BYTES,
+        ttl: tp.Optional[float] = None,
+        path: tp.Optional[str] = None,
+        max_disk_size: tp.Optional[int] = None,
+        clock: tp.Callable[[], float] = time.time,
+    ):
+        """
+        :param max_size: how many entries are kept in memory
+        :param max_bytes: total UTF-8 size of the entries kept in memory, not bounded
+            if ``None``; a bigger entry than that is not kept in memory at all
+        :param ttl: seconds an entry stays valid, entries never expire if ``None``
+        :param path: sqlite file to persist the entries to, memory only if ``None``
+        :param max_disk_size: how many entries are kept in the sqlite file
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_size = max_disk_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (created, conllu, size in bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conllu "
+                "(key TEXT PRIMARY KEY, conllu TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and self.clock() - created > self.ttl
+
+    def get(self, key: str) -> tp.Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                self._forget(key)
+                entry = None
+
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, conllu FROM conllu WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[0]):
+                    entry = row
+                    self._remember(key, *entry)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, conllu: str):
+        with self._lock:
+            created = self.clock()
+            self._remember(key, created, conllu)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO conllu (key, conllu, created) VALUES (?, ?, ?)",
+                    (key, conllu, created)
+                )
+                if self.max_disk_size is not None:
+                    self._db.execute(
+                        "DELETE FROM conllu WHERE key NOT IN "
+                        "(SELECT key FROM conllu ORDER BY created DESC LIMIT ?)",
+                        (self.max_disk_size,)
+                    )
+                self._db.commit()
+
+    def _remember(self, key: str, created: float, conllu: str):
+        self._forget(key)
+        size = len(conllu.encode("utf-8"))
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._entries[key] = (created, conllu, size)
+        self._bytes += size
+        while len(self._entries) > self.max_size or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def get_or_compute(self, key: str, compute: tp.Callable[[], str]) -> str:
+        conllu = self.get(key)
+        if conllu is None:
+            conllu = compute()
+            self.set(key, conllu)
+        return conllu
+
+    def get_or_compute_many(
+        self, keys: tp.List[str], compute: tp.Callable[[tp.List[int]], tp.List[str]]
+    ) -> tp.List[str]:
+        """
+        The entries of all the keys; ``compute`` gets the positions of the
+        missing keys in ``keys`` and returns their values, in the same order
+        """
+        values = [self.get(key) for key in keys]
+        missing = [index for index, value in enumerate(values) if value is None]
+        if missing:
+            for index, value in zip(missing, compute(missing)):
+                self.set(keys[index], value)
+                values[index] = value
+        return values
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM conllu")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> tp.Dict[str, tp.Any]:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "size": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+_default_cache = ConlluCache()
+
+
+def get_default_cache() -> tp.Optional[ConlluCache]:
+    return _default_cache
+
+
+def set_default_cache(cache: tp.Optional[ConlluCache]):
+    """
+    Replace the cache shared by the UDPipe processors, ``None`` disables caching
+    """
+    global _default_cache
+    _default_cache = cache
@@ -0,0 +1,109 @@
+import typing as tp
+from .compact_conllu import CompactSentence
+from .dependency_parser import UDPipeDependencyParser, WebUDPipeDependencyParser
+
+"""
+Streaming pipeline: raw text -> UDPipe output chunks -> CoNLL-U sentences -> readings
+Every stage is a generator, so a corpus of any size is processed in constant
+memory and the readings of the first sentence come out before the rest of
+the text is even parsed.
+"""
+
+DEFAULT_CHUNK_SIZE = 10000  # characters of text sent to UDPipe at once
+
+
+class SentenceReadings(tp.NamedTuple):
+    index: int  # position of the sentence in the stream
+    conllu: str
+    readings: tp.List[tp.Any]
+    error: tp.Optional[Exception] = None
+
+
+def iter_text_chunks(lines: tp.Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> tp.Iterator[str]:
+    """
+    Group the lines of a text (e.g. an open file) into chunks of about ``chunk_size``
+    characters. Chunks end at paragraph breaks (empty lines), so that no sentence
+    is cut in two, unless a paragraph makes the chunk twice as long:
+    then it is cut at the end of a line.
+    """
+    chunk = []
+    size = 0
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            if size >= chunk_size:
+                yield "\n".join(chunk)
+                chunk, size = [], 0
+            elif chunk:
+                chunk.append("")
+            continue
+        if size >= 2 * chunk_size:
+            yield "\n".join(chunk)
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line) + 1
+    if chunk:
+        yield "\n".join(chunk)
+
+
+def iter_conllu_chunks(
+    chunks: tp.Iterable[str], depparser: tp.Optional[UDPipeDependencyParser] = None
+) -> tp.Iterator[str]:
+    """
+    CoNLL-U output of UDPipe for every chunk of text. The chunks bypass the
+    CoNLL-U cache, which would otherwise fill up with text that is never seen again.
+    """
+    if depparser is None:
+        depparser = WebUDPipeDependencyParser()
+    for chunk in chunks:
+        yield depparser.process_chunk_conllu(chunk)
+
+
+def iter_conllu_sentences(conllu_chunks: tp.Iterable[str]) -> tp.Iterator[str]:
+    """
+    CoNLL-U sentences (without comment lines) one by one; a sentence may
+    continue in the next chunk
+    """
+    sentence = []
+    for chunk in conllu_chunks:
+        for line in chunk.splitlines():
+            if not line.strip():
+                if sentence:
+                    yield "\n".join(sentence)
+                    sentence = []
+            elif not line.startswith("#"):
+                sentence.append(line)
+    if sentence:
+        yield "\n".join(sentence)
+
+
+def iter_sentence_readings(
+    lines: tp.Iterable[str],
+    depparser: tp.Optional[UDPipeDependencyParser] = None,
+    reading_command=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> tp.Iterator[SentenceReadings]:
+    """
+    Readings of every sentence of the text, in order. A sentence whose readings
+    can't be built is reported in ``SentenceReadings.error`` and the stream goes on.
+
+    :param reading_command: a ``RuLamGlueReadingCommand``, the default one if ``None``
+    """
+    if reading_command is None:
+        from .glue_reading import RuLamGlueReadingCommand
+
+        reading_command = RuLamGlueReadingCommand()
+
+    conllu_sentences = iter_conllu_sentences(
+        iter_conllu_chunks(iter_text_chunks(lines, chunk_size), depparser)
+    )
+    for index, conllu in enumerate(conllu_sentences):
+        try:
+            readings = [
+                reading.simplify()
+                for reading in reading_command.depgraph_to_readings(CompactSentence.from_conllu(conllu))
+            ]
+        except Exception as e:
+            yield SentenceReadings(index, conllu, [], e)
+            continue
+        yield SentenceReadings(index, conllu, readings)
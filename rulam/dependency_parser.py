@@ -0,0 +1,146 @@
+import typing as tp
+from .web_udpipe_processor import (
+    WebUDPipeClient,
+    split_conllu_sentences,
+    strip_conllu_comments,
+    web_udpipe_process_sentences_conllu,
+    web_udpipe_process_text_conllu,
+)
+from .local_udpipe_processor import (
+    load_model,
+    local_udpipe_process_sentences_conllu,
+    local_udpipe_process_text_conllu,
+)
+
+
+class UDPipeDependencyParser:
+    """
+    Base class of the dependency parsers pluggable into ``RuLamDrtGlue``.
+    Subclasses only have to produce CoNLL-U text for the given sentence.
+    """
+
+    def process_text_conllu(self, text: str) -> str:
+        raise NotImplementedError()
+
+    def process_chunk_conllu(self, text: str) -> str:
+        """
+        CoNLL-U of a chunk of a stream, which is unlikely to be parsed again:
+        the parsers with a cache bypass it
+        """
+        return self.process_text_conllu(text)
+
+    def load(self):
+        """
+        Load what the parser needs (e.g. a model) now rather than with the first
+        sentence, in worker processes which get the parser pickled
+        """
+
+    def process_sentences_conllu(self, sentences: tp.List[str]) -> tp.List[str]:
+        """
+        CoNLL-U of every sentence, in the order of ``sentences``. Subclasses should
+        override it with a single parser call, this fallback parses them one by one.
+        """
+        return [self.process_text_conllu(sentence) for sentence in sentences]
+
+    def parse(self, sentence: str) -> tp.List["DependencyGraph"]:
+        from nltk.parse.dependencygraph import DependencyGraph
+
+        return [DependencyGraph(self.process_text_conllu(sentence))]
+
+    def parse_sents(self, sentences: tp.List[str]) -> tp.List["DependencyGraph"]:
+        """
+        One dependency graph per sentence, ``result[i]`` belongs to ``sentences[i]``
+        """
+        from nltk.parse.dependencygraph import DependencyGraph
+
+        return [
+            DependencyGraph(conllu) for conllu in self.process_sentences_conllu(sentences)
+        ]
+
+
+class WebUDPipeDependencyParser(UDPipeDependencyParser):
+    def __init__(self, client: tp.Optional[WebUDPipeClient] = None):
+        """
+        :param client: connection to the UDPipe server, the shared default one if ``None``
+        """
+        self.client = client
+
+    def process_text_conllu(self, text: str) -> str:
+        return web_udpipe_process_text_conllu(text, client=self.client)
+
+    def process_chunk_conllu(self, text: str) -> str:
+        return web_udpipe_process_text_conllu(text, client=self.client, cache=False)
+
+    def process_sentences_conllu(self, sentences: tp.List[str]) -> tp.List[str]:
+        return web_udpipe_process_sentences_conllu(sentences, self.client)
+
+
+class LocalUDPipeDependencyParser(UDPipeDependencyParser):
+    def __init__(self, model_path: tp.Optional[str] = None):
+        """
+        :param model_path: path to the UDPipe model file,
+            defaults to the ``RULAM_UDPIPE_MODEL`` environment variable
+        """
+        self.model_path = model_path
+        # fail early if the model is unavailable
+        self.load()
+
+    def load(self):
+        load_model(self.model_path)
+
+    def process_text_conllu(self, text: str) -> str:
+        return local_udpipe_process_text_conllu(text, self.model_path)
+
+    def process_chunk_conllu(self, text: str) -> str:
+        return local_udpipe_process_text_conllu(text, self.model_path, cache=False)
+
+    def process_sentences_conllu(self, sentences: tp.List[str]) -> tp.List[str]:
+        return local_udpipe_process_sentences_conllu(sentences, self.model_path)
+
+
+class StaticDependencyParser(UDPipeDependencyParser):
+    """
+    Stand-in for UDPipe that replays recorded CoNLL-U, for benchmarks and for
+    running offline. Only the recorded sentences can be parsed.
+    """
+
+    def __init__(self, conllu_by_text: tp.Mapping[str, str]):
+        """
+        :param conllu_by_text: CoNLL-U of every sentence (without comments) by its text
+        """
+        self.conllu_by_text = dict(conllu_by_text)
+
+    @classmethod
+    def from_conllu(cls, conllu: str) -> "StaticDependencyParser":
+        """
+        Recorded UDPipe output: every sentence is looked up by its ``# text = ...`` comment
+        """
+        conllu_by_text = {}
+        for sentence in split_conllu_sentences(conllu):
+            if not strip_conllu_comments(sentence).strip():
+                continue  # comments of the file
+            for line in sentence.splitlines():
+                if line.startswith("# text = "):
+                    text = " ".join(line[len("# text = "):].split())
+                    conllu_by_text[text] = strip_conllu_comments(sentence) + "\n\n"
+                    break
+            else:
+                raise ValueError("Recorded sentence has no '# text = ' comment:\n%s" % sentence)
+        return cls(conllu_by_text)
+
+    @classmethod
+    def from_conllu_file(cls, path: str, encoding: str = "utf-8") -> "StaticDependencyParser":
+        with open(path, encoding=encoding) as conllu_file:
+            return cls.from_conllu(conllu_file.read())
+
+    def process_text_conllu(self, text: str) -> str:
+        """CoNLL-U of every line of ``text``, which must have been recorded"""
+        conllu = []
+        for line in text.splitlines():
+            line = " ".join(line.split())
+            if not line:
+                continue
+            if line not in self.conllu_by_text:
+                raise KeyError("No recorded parse of %r" % line)
+            conllu.append(self.conllu_by_text[line])
+        return "".join(conllu)
@@ -0,0 +1,351 @@
+import itertools
+import time
+import typing as tp
+from nltk.sem.drt import DRS, DrtVariableExpression
+from nltk.sem.logic import unique_variable
+from .anaphora_resolution import AnaphoraResolutionException, ReferentLayer, resolve_anaphora
+from .compact_conllu import CompactSentence
+from .glue_reading import RuLamGlueReadingCommand, merge_readings
+from .instrumentation import stage
+
+"""
+Discourse threads of sessions growing one sentence at a time: a thread keeps the
+resolved DRS of its last sentence and the thread it extends, so extending it
+only simplifies, renames and resolves the readings of the new sentence, and only
+indexes their referents. The DRS of the whole thread is merged when it is used.
+The threads of a whole discourse are enumerated lazily by ``iter_threads``, with
+the anaphora of every thread resolved at once as in
+``RuLamGlueReadingCommand.combine_readings``. ``read_document`` runs the glue,
+DRS and anaphora stages on a parsed document with one reading command per
+process, for workers of ``async_parser`` and ``batch``.
+"""
+
+DEFAULT_MAX_THREADS = 100  # threads of a discourse kept at most
+
+
+class DiscourseThread:
+    """
+    Readings of the sentences of a discourse, one per sentence. A thread made by
+    ``extend_thread`` only keeps the resolved DRS of its last sentence and the
+    thread it extends, its DRS and reading ids are put together when they are read.
+    """
+
+    __slots__ = ("previous", "reading_id", "sentence_drs", "unresolved", "_referents", "_reading_ids", "_drs", "_refs")
+
+    def __init__(self, reading_ids=(), drs=None, refs=None, unresolved=None):
+        """
+        A thread of already combined readings, as built by ``iter_threads``
+
+        :param reading_ids: 's0-r0', 's1-r2', ... one per sentence
+        :param drs: simplified, anaphora resolved DRS of the whole thread
+        :param refs: every referent of ``drs``, including the nested ones,
+            computed from ``drs`` if ``None``
+        :param unresolved: ``drs`` before its anaphora was resolved
+        """
+        self.previous = None
+        self.reading_id = reading_ids[-1] if reading_ids else None
+        self.sentence_drs = drs
+        self.unresolved = unresolved
+        self._referents = None
+        self._reading_ids = tuple(reading_ids)
+        self._drs = drs
+        self._refs = refs
+
+    @classmethod
+    def _extended(cls, previous: "DiscourseThread", reading_id: str, sentence_drs) -> "DiscourseThread":
+        thread = cls.__new__(cls)
+        thread.previous = previous if previous.reading_id is not None else None
+        thread.reading_id = reading_id
+        thread.sentence_drs = sentence_drs
+        thread.unresolved = None
+        thread._referents = ReferentLayer.push(previous.referents, sentence_drs)
+        thread._reading_ids = thread._drs = thread._refs = None
+        return thread
+
+    @property
+    def referents(self) -> tp.Optional[ReferentLayer]:
+        """Referents accessible from the next sentence"""
+        if self._referents is None and self._drs is not None:
+            self._referents = ReferentLayer.push(None, self._drs)
+        return self._referents
+
+    @property
+    def reading_ids(self) -> tp.Tuple[str, ...]:
+        if self._reading_ids is not None:
+            return self._reading_ids
+        return tuple(thread.reading_id for thread in self._threads())
+
+    @property
+    def drs(self):
+        """Simplified, anaphora resolved DRS of the whole thread"""
+        if self._drs is not None or self.sentence_drs is None:
+            return self._drs
+        return _merge_sentences([thread.sentence_drs for thread in self._threads()])
+
+    @property
+    def refs(self) -> tp.FrozenSet:
+        """Every referent of ``drs``, including the nested ones"""
+        if self._refs is not None:
+            return self._refs
+        return frozenset(_get_all_refs(self.drs)) if self.sentence_drs is not None else frozenset()
+
+    def _threads(self) -> tp.List["DiscourseThread"]:
+        """The threads this one extends and itself, the shortest first"""
+        threads = []
+        thread = self
+        while thread is not None:
+            threads.append(thread)
+            thread = thread.previous
+        threads.reverse()
+        return threads
+
+    def __repr__(self):
+        return "DiscourseThread(%r, %s)" % (self.reading_ids, self.drs)
+
+
+def _merge_sentences(sentence_drss):
+    """
+    The DRSs of the sentences of a thread in one: the referents and conditions
+    are collected while they are plain DRSs, anything else is concatenated
+    """
+    refs = []
+    conds = []
+    merged = 0  # leading plain DRSs collected in refs and conds
+    drs = None
+    for sentence_drs in sentence_drss:
+        if drs is None and isinstance(sentence_drs, DRS) and not sentence_drs.consequent:
+            refs.extend(sentence_drs.refs)
+            conds.extend(sentence_drs.conds)
+            merged += 1
+        elif drs is None:
+            drs = DRS(refs, conds) + sentence_drs if merged else sentence_drs
+        else:
+            drs = drs + sentence_drs
+    return DRS(refs, conds) if drs is None else drs
+
+
+class DiscourseSession:
+    """
+    Alternative to ``nltk.DiscourseTester`` for discourses growing sentence by
+    sentence. The result of extending a thread is an alphabetic variant of
+    ``RuLamGlueReadingCommand.combine_readings`` of all its readings, except
+    that a pronoun is resolved when its sentence is added, so it never refers
+    to a referent introduced later (no cataphora).
+    """
+
+    def __init__(self, reading_command=None, depparser=None, match_gender=False, max_threads=DEFAULT_MAX_THREADS):
+        """
+        :param reading_command: a ``RuLamGlueReadingCommand``, made with the given
+            ``depparser`` if ``None``
+        :param match_gender: see ``resolve_anaphora``
+        :param max_threads: threads kept after every sentence, the first ones in the
+            order of their reading ids; all of them if ``None``
+        """
+        if reading_command is None:
+            reading_command = RuLamGlueReadingCommand(depparser=depparser)
+        self._reading_command = reading_command
+        self.match_gender = match_gender
+        self.max_threads = max_threads
+        self.sentences = []
+        self.readings = []  # readings of every sentence
+        self._threads = [DiscourseThread()]
+        self._refs = set()  # referents of the readings of every sentence
+
+    def add_sentence(self, sentence: str) -> tp.List[DiscourseThread]:
+        return self.add_readings(self._reading_command.parse_to_readings(sentence), sentence)
+
+    def add_readings(self, readings, sentence: tp.Optional[str] = None) -> tp.List[DiscourseThread]:
+        """
+        Extend every thread with every one of the readings of a new sentence.
+        Extensions whose anaphora can't be resolved are dropped, if none of them
+        is left the session is not changed and ``AnaphoraResolutionException`` is raised.
+
+        :return: the threads after the sentence is added
+        """
+        sid = "s%s" % len(self.sentences)
+        # renamed apart from the referents of the earlier sentences once, for all the threads
+        readings = [
+            rename_apart(reading.simplify(), self._refs) for reading in sorted(readings, key=str)
+        ]
+
+        threads = []
+        error = None
+        with stage("threads") as counts:
+            for thread, (rid, reading) in itertools.product(self._threads, enumerate(readings)):
+                if len(threads) == self.max_threads:
+                    break
+                try:
+                    threads.append(
+                        extend_thread(thread, "%s-r%s" % (sid, rid), reading, self.match_gender)
+                    )
+                except AnaphoraResolutionException as e:
+                    error = e
+            if counts is not None:
+                counts["readings"] = len(readings)
+                counts["threads"] = len(threads)
+        if not threads:
+            raise error or AnaphoraResolutionException("Sentence has no readings.")
+
+        self.sentences.append(sentence)
+        self.readings.append(readings)
+        self._threads = threads
+        for reading in readings:
+            self._refs.update(_get_all_refs(reading))
+        return self.threads
+
+    @property
+    def threads(self) -> tp.List[DiscourseThread]:
+        if not self.sentences:
+            return []
+        return list(self._threads)
+
+
+def rename_apart(reading, refs: tp.Collection):
+    """
+    The reading with its referents that are in ``refs`` renamed, the same alpha
+    conversion as in ``DrtConcatenation.simplify``
+    """
+    reading_refs = _get_all_refs(reading)
+    for ref in set(reading_refs).intersection(refs):
+        reading = reading.replace(ref, DrtVariableExpression(unique_variable(ref, ignore=refs)), True)
+    return reading
+
+
+def extend_thread(thread: DiscourseThread, reading_id: str, reading, match_gender=False) -> DiscourseThread:
+    """
+    Thread with one more sentence, whose reading is already simplified and whose
+    referents are apart from those of the thread (see ``rename_apart``). Only the
+    referents of the new reading are indexed, nothing of the thread is copied.
+
+    :raise AnaphoraResolutionException: if a pronoun of the reading has no antecedent
+    """
+    # the referents of the thread are accessible from the new sentence
+    resolved = resolve_anaphora(reading, match_gender=match_gender, referents=thread.referents)
+    return DiscourseThread._extended(thread, reading_id, resolved)
+
+
+def iter_threads(
+    sentence_readings: tp.Sequence[tp.Mapping[str, tp.Any]],
+    max_threads: tp.Optional[int] = None,
+    is_consistent: tp.Optional[tp.Callable[[tp.Any], bool]] = None,
+    match_gender=False,
+    max_steps: tp.Optional[int] = None,
+    deadline: tp.Optional[float] = None,
+) -> tp.Iterator[DiscourseThread]:
+    """
+    Threads of the discourse in the order of ``nltk.DiscourseTester``
+    (by reading ids), built one at a time. The DRS of a thread is the same as
+    ``RuLamGlueReadingCommand.combine_readings`` of its readings: the pronouns
+    are resolved against the whole thread, so, unlike in ``DiscourseSession``,
+    they may refer to a referent of a later sentence (cataphora). Threads whose
+    anaphora can't be resolved are skipped.
+
+    :param sentence_readings: simplified readings of every sentence by reading id,
+        as in ``DiscourseTester._readings``
+    :param max_threads: stop after so many threads, all of them if ``None``
+    :param is_consistent: check of a DRS (e.g. with a model builder). It is called
+        for the merged DRS of every thread prefix, whose pronouns are not resolved
+        yet, and a rejected prefix is dropped together with all of its continuations;
+        then for the resolved DRS of every whole thread.
+    :param max_steps: stop after trying so many readings as continuations of
+        a prefix, a bound on the work however few threads are found
+    :param deadline: stop once ``time.monotonic()`` passes it
+    """
+    if not sentence_readings or (max_threads is not None and max_threads <= 0):
+        return
+    readings = [sorted(readings.items()) for readings in sentence_readings]
+
+    found = 0
+    steps = 0
+    # depth-first: continuations of the prefix at stack[i] are readings[i],
+    # the merged DRS of a prefix is only built for is_consistent
+    stack = [((), None, iter(readings[0]))]
+    while stack:
+        prefix, prefix_drs, continuations = stack[-1]
+        continuation = next(continuations, None)
+        if continuation is None:
+            stack.pop()
+            continue
+        steps += 1
+        if max_steps is not None and steps > max_steps:
+            return
+        if deadline is not None and time.monotonic() >= deadline:
+            return
+
+        extended = prefix + (continuation,)
+        if len(extended) < len(readings):
+            drs = None
+            if is_consistent is not None:
+                reading = continuation[1]
+                drs = reading if prefix_drs is None else merge_readings([prefix_drs, reading])
+                if not is_consistent(drs):
+                    continue
+            stack.append((extended, drs, iter(readings[len(extended)])))
+            continue
+
+        thread = _resolve_thread(extended, match_gender)
+        if thread is None or (is_consistent is not None and not is_consistent(thread.drs)):
+            continue
+        yield thread
+        found += 1
+        if found == max_threads:
+            return
+
+
+# one reading command per process, so that the grammar is not reloaded for every document
+_reading_commands = {}
+
+
+def get_reading_command(semtype_file: tp.Optional[str] = None) -> RuLamGlueReadingCommand:
+    """The reading command of the process for the semtype file, made on first use"""
+    if semtype_file not in _reading_commands:
+        _reading_commands[semtype_file] = RuLamGlueReadingCommand(semtype_file)
+    return _reading_commands[semtype_file]
+
+
+def read_document(
+    conllu_sentences: tp.List[str],
+    semtype_file: tp.Optional[str] = None,
+    max_threads: tp.Optional[int] = None,
+) -> tp.Tuple[tp.List[tp.List[tp.Any]], tp.List[tp.Any]]:
+    """
+    Run the glue, DRS and anaphora stages on an already parsed document.
+
+    :param max_threads: threads built at most, all of them if ``None``
+    :return: readings of every sentence and readings of every thread
+        whose anaphora could be resolved, see ``iter_threads``
+    """
+    reading_command = get_reading_command(semtype_file)
+    sentence_readings = [
+        [
+            reading.simplify()
+            for reading in reading_command.depgraph_to_readings(CompactSentence.from_conllu(conllu))
+        ]
+        for conllu in conllu_sentences
+    ]
+
+    threads = iter_threads(
+        [
+            {"s%s-r%s" % (sid, rid): reading for rid, reading in enumerate(readings)}
+            for sid, readings in enumerate(sentence_readings)
+        ],
+        max_threads,
+    )
+    return sentence_readings, [thread.drs for thread in threads]
+
+
+def _resolve_thread(readings, match_gender) -> tp.Optional[DiscourseThread]:
+    """The thread of ``(reading_id, reading)`` pairs, ``None`` if its anaphora can't be resolved"""
+    unresolved = merge_readings([reading for _, reading in readings])
+    try:
+        resolved = resolve_anaphora(unresolved, match_gender=match_gender)
+    except AnaphoraResolutionException:
+        return None
+    return DiscourseThread(tuple(reading_id for reading_id, _ in readings), resolved, unresolved=unresolved)
+
+
+def _get_all_refs(expression) -> tp.List:
+    try:
+        return expression.get_refs(True)
+    except NotImplementedError:
+        return []
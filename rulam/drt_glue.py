@@ -1,20 +1,29 @@
 import nltk
 from nltk.sem import drt, linearlogic
-from nltk.parse.dependencygraph import DependencyGraph
-from .web_udpipe_processor import web_udpipe_process_text_conllu
-from .glue import RuLamGlueDict, GlueFormula
+from .canonical import alpha_normal_key
+from .dependency_parser import WebUDPipeDependencyParser
+from .glue import RuLamGlueDict, GlueFormula, MeaningTemplate, make_glue_indices
+from .glue_proof import prove
+from .instrumentation import stage
+
+
+def _count_parsed(counts, depgraphs):
+    counts["sentences"] = len(depgraphs)
+    counts["tokens"] = sum(len(depgraph.nodes) - 1 for depgraph in depgraphs)
 
 
 class DrtRuLamGlueDict(RuLamGlueDict):
+    def compile_meaning(self, meaning):
+        return MeaningTemplate(meaning, drt.DrtExpression.fromstring, drt.DrtVariableExpression)
+
     def get_GlueFormula_factory(self):
         return DrtGlueFormula
 
 
 class DrtGlueFormula(GlueFormula):
-    def __init__(self, meaning, glue, indices=None):
-        if not indices:
-            indices = set()
+    __slots__ = ()
 
+    def __init__(self, meaning, glue, indices=None):
         if isinstance(meaning, str):
             self.meaning = drt.DrtExpression.fromstring(meaning)
         elif isinstance(meaning, drt.DrtExpression):
@@ -35,7 +44,8 @@ class DrtGlueFormula(GlueFormula):
                 % (glue, glue.__class__)
             )
 
-        self.indices = indices
+        self.indices = make_glue_indices(indices)
+        self._key = self._str = self._sort_key = None
 
     def make_VariableExpression(self, name):
         return drt.DrtVariableExpression(name)
@@ -51,7 +61,7 @@ class RuLamDrtGlue(nltk.sem.glue.Glue):
         nltk.sem.glue.Glue.__init__(self, semtype_file, remove_duplicates, depparser, verbose)
 
     def get_glue_dict(self):
-        return DrtRuLamGlueDict(self.semtype_file)
+        return DrtRuLamGlueDict.load(self.semtype_file)
     
     def dep_parse(self, sentence):
         """
@@ -61,8 +71,56 @@ class RuLamDrtGlue(nltk.sem.glue.Glue):
         :type sentence: list(str)
         :rtype: DependencyGraph
         """
+        with stage("dep_parse") as counts:
+            depgraphs = self.get_depparser().parse(sentence)
+            if counts is not None:
+                _count_parsed(counts, depgraphs)
+        return depgraphs
+
+    def dep_parse_sents(self, sentences):
+        """
+        Return a dependency graph for every sentence, all parsed at once.
 
-        # TODO(sfedia): make better udpipe integration
-        web_result = web_udpipe_process_text_conllu(sentence)
-        depgraph = DependencyGraph(web_result)
-        return [depgraph]
+        :param sentences: the sentences to be parsed
+        :type sentences: list(str)
+        :rtype: list(DependencyGraph)
+        """
+        with stage("dep_parse") as counts:
+            depgraphs = self.get_depparser().parse_sents(sentences)
+            if counts is not None:
+                _count_parsed(counts, depgraphs)
+        return depgraphs
+
+    def get_depparser(self):
+        if self.depparser is None:
+            self.depparser = WebUDPipeDependencyParser()
+        return self.depparser
+
+    def depgraph_to_meaning(self, depgraph):
+        """
+        Same as ``parse_to_meaning``, but for an already parsed sentence
+        """
+        return self.get_readings(self.gfl_to_compiled(self.depgraph_to_glue(depgraph)))
+
+    def get_readings(self, agenda):
+        """
+        Same readings as ``nltk.sem.glue.Glue.get_readings``, found with
+        the indexed proof engine of ``rulam.glue_proof``. Readings that only
+        differ in the names of their variables are kept once, in the order they
+        were found (a set of ``alpha_normal_key``, not a pairwise ``equiv``).
+        """
+        with stage("glue_proof") as counts:
+            readings = []
+            seen = set()
+            duplicates = 0
+            for glueformula in prove(agenda, counts):
+                key = alpha_normal_key(glueformula.meaning.simplify())
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                self._add_to_reading_list(glueformula, readings)
+            if counts is not None:
+                counts["readings"] = len(readings)
+                counts["duplicate_readings"] = duplicates
+        return readings
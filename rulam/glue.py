@@ -1,14 +1,28 @@
+import hashlib
+import importlib.resources
 import os
+import pickle
+import sys
+import tempfile
+import threading
+import typing as tp
+from collections.abc import Mapping, Set
+from functools import lru_cache
 from itertools import chain
+import nltk
 from nltk.internals import Counter
 from nltk.sem import linearlogic
 from nltk.sem.logic import (
     AbstractVariableExpression,
     Expression,
     LambdaExpression,
+    LogicalExpressionException,
     Variable,
     VariableExpression,
 )
+from .canonical import sortable_key, structural_key
+from .compact_conllu import CompactNode
+from .instrumentation import stage
 from .symbolizer import SimplestSymbolizer
 import re
 
@@ -16,21 +30,213 @@ import re
 OPTIONAL_RELATIONSHIPS = ["nmod", "vmod", "punct"]
 
 
+WORD_PLACEHOLDER = "<word>"
+FEATURE_PLACEHOLDER = re.compile(r"<word::([A-Z][a-z]+)>")
+
+LABEL_LETTERS = "fghijklmnopqrstuvwxyzabcde"
+
+
+def _dependents(node) -> tp.Iterable[int]:
+    """Addresses of the dependents of a ``DependencyGraph`` node or a ``CompactNode``"""
+    if isinstance(node, CompactNode):
+        return node.dependents()
+    return chain.from_iterable(node["deps"].values())
+
+
+@lru_cache(maxsize=1024)
+def _get_label(address: int) -> str:
+    letter = LABEL_LETTERS[(address - 1) % len(LABEL_LETTERS)]
+    num = int(address) // 26
+    if num > 0:
+        return letter + str(num)
+    else:
+        return letter
+
+
+def _add_dependency(node, relation, address):
+    if isinstance(node, CompactNode):
+        node.sentence.add_dependency(node.address, relation, address)
+    else:
+        node["deps"].setdefault(relation, [])
+        node["deps"][relation].append(address)
+
+
+class MeaningTemplate:
+    """
+    Meaning term of a semtype entry parsed ahead of time. The ``<word>`` and
+    ``<word::Feature>`` placeholders are parsed as constants, which are replaced
+    by the node's symbols in ``instantiate`` without re-parsing the term.
+    """
+
+    __slots__ = ("source", "expression", "has_word", "features", "make_VariableExpression")
+
+    WORD_CONSTANT = Variable("RULAM_WORD")
+
+    def __init__(self, source, parse_expression, make_VariableExpression):
+        self.source = source
+        self.make_VariableExpression = make_VariableExpression
+        self.has_word = WORD_PLACEHOLDER in source
+        self.features = tuple(dict.fromkeys(FEATURE_PLACEHOLDER.findall(source)))
+        self.expression = parse_expression(
+            FEATURE_PLACEHOLDER.sub(
+                lambda m: self.feature_constant(m.group(1)).name, source
+            ).replace(WORD_PLACEHOLDER, self.WORD_CONSTANT.name)
+        )
+
+    @staticmethod
+    def feature_constant(feature_name):
+        return Variable(f"RULAM_FEATURE_{feature_name}")
+
+    def instantiate(self, word_symbol, node_symbolizer):
+        expression = self.expression
+        if self.has_word:
+            if not word_symbol:
+                # substituted into the source, an empty symbol leaves a malformed term
+                raise LogicalExpressionException(
+                    None, "No symbol to replace %s with in '%s'" % (WORD_PLACEHOLDER, self.source)
+                )
+            expression = expression.replace(
+                self.WORD_CONSTANT, self.make_VariableExpression(Variable(word_symbol))
+            )
+        for feature_name in self.features:
+            expression = expression.replace(
+                self.feature_constant(feature_name),
+                self.make_VariableExpression(
+                    Variable(node_symbolizer.symbolize_feature(feature_name))
+                ),
+            )
+        return expression
+
+    def __str__(self):
+        return self.source
+
+
+def get_grammar_path(filename):
+    """
+    Absolute path of a grammar file: a relative name is looked up among the
+    grammars of the package (wherever it is installed), an absolute one is kept
+    """
+    if os.path.isabs(filename):
+        return filename
+    return os.fspath(importlib.resources.files(__package__).joinpath("grammars", filename))
+
+
+COMPILED_GRAMMAR_VERSION = 2
+
+_compiled_grammars_enabled = os.environ.get("RULAM_COMPILED_GRAMMARS", "0") != "0"
+_compiled_grammars_dir = os.environ.get("RULAM_COMPILED_GRAMMARS_DIR") or None
+
+
+def get_compiled_grammars_dir() -> str:
+    """
+    Directory of the pickles of the parsed grammars: ``RULAM_COMPILED_GRAMMARS_DIR``
+    or ``rulam/grammars`` in the user cache directory (``XDG_CACHE_HOME``, ``~/.cache``)
+    """
+    if _compiled_grammars_dir is not None:
+        return _compiled_grammars_dir
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "rulam", "grammars")
+
+
+def get_compiled_grammar_path(path, glue_dict_class) -> str:
+    """
+    The parsed entries of a grammar file are pickled in the cache directory, e.g.
+    ``basic_rules.semtype.<hash of its path>.DrtRuLamGlueDict.pickle``, never next to
+    the grammar. The pickle is only trusted as much as the grammar itself: the file
+    starts with a plain text header line with the format version, the versions of
+    Python and NLTK and the sha256 of the grammar, and the rest is only unpickled if
+    the header matches.
+    """
+    path = os.path.abspath(path)
+    path_hash = hashlib.sha256(path.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(
+        get_compiled_grammars_dir(),
+        "%s.%s.%s.pickle" % (os.path.basename(path), path_hash, glue_dict_class.__name__),
+    )
+
+
+def set_compiled_grammars(enabled: bool, directory: tp.Optional[str] = None):
+    """
+    Turn the pickles of the parsed grammars on or off. They are off unless the
+    ``RULAM_COMPILED_GRAMMARS`` environment variable is set to something else than ``0``.
+
+    :param directory: where to keep the pickles instead of the user cache directory
+    """
+    global _compiled_grammars_enabled, _compiled_grammars_dir
+    _compiled_grammars_enabled = enabled
+    if directory is not None:
+        _compiled_grammars_dir = os.fspath(directory)
+
+
+class LoadedGlueDict(tp.NamedTuple):
+    glue_dict: "RuLamGlueDict"
+    mtime: int
+    contents_hash: str
+
+
+_loaded_glue_dicts = {}
+_loaded_glue_dicts_lock = threading.Lock()
+
+
 class RuLamGlueDict(dict):
+    """
+    Semtype grammar: ``{semtype: {relationship set: ((meaning, glue), ...)}}``.
+    The dict is read-only once loaded, meaning and glue terms are parsed ahead
+    of time, so a single instance is safely shared by all sentences and threads (see ``load``).
+    """
+
     def __init__(self, filename, encoding=None):
         self.filename = filename
         self.file_encoding = encoding
         self.read_file()
 
+    @classmethod
+    def load(cls, filename, encoding=None):
+        """
+        Return the shared instance for the grammar file, which is re-read only
+        when the file's modification time and content change.
+        """
+        path = get_grammar_path(filename)
+        key = (cls, path, encoding)
+        with _loaded_glue_dicts_lock:
+            mtime = os.stat(path).st_mtime_ns
+            loaded = _loaded_glue_dicts.get(key)
+            if loaded is not None and loaded.mtime == mtime:
+                return loaded.glue_dict
+
+            with open(path, "rb") as grammar_file:
+                contents_hash = hashlib.sha256(grammar_file.read()).hexdigest()
+            if loaded is None or loaded.contents_hash != contents_hash:
+                loaded = LoadedGlueDict(cls(filename, encoding), mtime, contents_hash)
+            else:
+                loaded = loaded._replace(mtime=mtime)
+            _loaded_glue_dicts[key] = loaded
+            return loaded.glue_dict
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"'{self.__class__.__name__}' object is read-only")
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
     def read_file(self, empty_first=True):
+        path = get_grammar_path(self.filename)
+        with open(path, "rb") as grammar_file:
+            source = grammar_file.read()
+
         if empty_first:
-            self.clear()
-        
-        contents = open(
-            os.path.abspath(os.path.join("rulam", "grammars", self.filename)),
-            encoding=self.file_encoding
-        ).read()
+            compiled = self._read_compiled_grammar(path, source)
+            if compiled is not None:
+                dict.clear(self)
+                dict.update(self, {sem: SemtypeOptions(options) for (sem, options) in compiled.items()})
+                return
+            entries = {}
+        else:
+            entries = {
+                sem: {rels: list(glue) for (rels, glue) in self[sem].items()} for sem in self
+            }
 
+        contents = source.decode(self.file_encoding or "utf-8")
         lines = contents.splitlines()
 
         for line in lines:  # example: 'n : (\\x.(<word> x), (v-or))'
@@ -66,7 +272,10 @@ class RuLamGlueDict(dict):
                             ]  # '\\x.(<word> x)'
                             glue_term = parts[1][tuple_comma + 1 : i]  # '(v-r)'
                             glue_formulas.append(
-                                [meaning_term, glue_term]
+                                (
+                                    self.compile_meaning(meaning_term),
+                                    self.compile_glue(glue_term),
+                                )
                             )  # add the GlueFormula to the list
                     elif c == ",":
                         if (
@@ -101,37 +310,99 @@ class RuLamGlueDict(dict):
                 sem = parts[0].strip()
                 supertype = None
 
-            if sem not in self:
-                self[sem] = {}
+            if sem not in entries:
+                entries[sem] = {}
 
             if (
                 relationships is None
             ):  # if not specified for a specific relationship set
                 # add all relationship entries for parents
                 if supertype:
-                    for rels in self[supertype]:
-                        if rels not in self[sem]:
-                            self[sem][rels] = []
-                        glue = self[supertype][rels]
-                        self[sem][rels].extend(glue)
-                        self[sem][rels].extend(
+                    for rels in entries[supertype]:
+                        if rels not in entries[sem]:
+                            entries[sem][rels] = []
+                        glue = entries[supertype][rels]
+                        entries[sem][rels].extend(glue)
+                        entries[sem][rels].extend(
                             glue_formulas
                         )  # add the glue formulas to every rel entry
                 else:
-                    if None not in self[sem]:
-                        self[sem][None] = []
-                    self[sem][None].extend(
+                    if None not in entries[sem]:
+                        entries[sem][None] = []
+                    entries[sem][None].extend(
                         glue_formulas
                     )  # add the glue formulas to every rel entry
             else:
-                if relationships not in self[sem]:
-                    self[sem][relationships] = []
+                if relationships not in entries[sem]:
+                    entries[sem][relationships] = []
                 if supertype:
-                    self[sem][relationships].extend(self[supertype][relationships])
-                self[sem][relationships].extend(
+                    entries[sem][relationships].extend(entries[supertype][relationships])
+                entries[sem][relationships].extend(
                     glue_formulas
                 )  # add the glue entry to the dictionary
 
+        compiled = {
+            sem: {rels: tuple(glue) for (rels, glue) in options.items()}
+            for (sem, options) in entries.items()
+        }
+        if empty_first:
+            self._write_compiled_grammar(path, source, compiled)
+        dict.clear(self)
+        dict.update(self, {sem: SemtypeOptions(options) for (sem, options) in compiled.items()})
+
+    def _compiled_grammar_header(self, source: bytes) -> bytes:
+        # anything that changes the compiled entries invalidates them
+        return (
+            "rulam-compiled-grammar %s %s.%s python-%s.%s nltk-%s %s sha256-%s\n" % (
+                COMPILED_GRAMMAR_VERSION,
+                self.__class__.__module__, self.__class__.__qualname__,
+                *sys.version_info[:2],
+                nltk.__version__,
+                self.file_encoding,
+                hashlib.sha256(source).hexdigest(),
+            )
+        ).encode("ascii", "backslashreplace")
+
+    def _read_compiled_grammar(self, path: str, source: bytes) -> tp.Optional[tp.Dict]:
+        if not _compiled_grammars_enabled:
+            return None
+        header = self._compiled_grammar_header(source)
+        try:
+            with open(get_compiled_grammar_path(path, self.__class__), "rb") as compiled_file:
+                # nothing is unpickled from a file that wasn't written for this grammar
+                if compiled_file.readline(len(header) + 1) != header:
+                    return None
+                return pickle.load(compiled_file)
+        except Exception:
+            return None  # missing or unreadable
+
+    def _write_compiled_grammar(self, path: str, source: bytes, compiled: tp.Dict):
+        if not _compiled_grammars_enabled:
+            return
+        compiled_path = get_compiled_grammar_path(path, self.__class__)
+        try:
+            os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+            # written under another name and renamed, so that a reader never sees half of it
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(compiled_path), suffix=".tmp")
+        except OSError:
+            return  # e.g. no writable cache directory: the grammar is parsed every time
+        try:
+            with os.fdopen(fd, "wb") as compiled_file:
+                compiled_file.write(self._compiled_grammar_header(source))
+                pickle.dump(compiled, compiled_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, compiled_path)
+        except (OSError, pickle.PicklingError, AttributeError, TypeError):
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def compile_meaning(self, meaning):
+        return MeaningTemplate(meaning, Expression.fromstring, VariableExpression)
+
+    def compile_glue(self, glue):
+        return linearlogic.LinearLogicParser().parse(glue)
+
     def __str__(self):
         accum = ""
         for pos in self:
@@ -143,7 +414,7 @@ class RuLamGlueDict(dict):
                         accum += str_pos + ": "
                     else:
                         accum += " " * (len(str_pos) + 2)
-                    accum += "%s" % gf
+                    accum += "(%s, %s)" % gf
                     if relset and i == len(self[pos][relset]):
                         accum += " : %s" % relset
                     accum += "\n"
@@ -154,17 +425,24 @@ class RuLamGlueDict(dict):
         if node is None:
             # TODO: should it be depgraph.root? Is this code tested?
             top = depgraph.nodes[0]
-            depList = list(chain.from_iterable(top["deps"].values()))
+            depList = list(_dependents(top))
             root = depgraph.nodes[depList[0]]
 
-            return self.to_glueformula_list(depgraph, root, Counter(), verbose)
+            with stage("glue_lookup") as counts:
+                glueformulas = self.to_glueformula_list(depgraph, root, Counter(), verbose)
+                if counts is not None:
+                    counts["tokens"] = len(depgraph.nodes) - 1
+                    counts["glue_formulas"] = len(glueformulas)
+            return glueformulas
 
-        glueformulas = self.lookup(node, depgraph, counter)
-        for dep_idx in chain.from_iterable(node["deps"].values()):
-            dep = depgraph.nodes[dep_idx]
-            glueformulas.extend(
-                self.to_glueformula_list(depgraph, dep, counter, verbose)
-            )
+        # pre-order walk with an explicit stack: a node's dependents are
+        # looked up after the node, since the lookup may add dependents
+        glueformulas = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            glueformulas.extend(self.lookup(node, depgraph, counter))
+            stack.extend(depgraph.nodes[dep_idx] for dep_idx in reversed(list(_dependents(node))))
         return glueformulas
 
     def lookup(self, node, depgraph, counter):
@@ -202,40 +480,17 @@ class RuLamGlueDict(dict):
             headnode = depgraph.nodes[node["head"]]
             subj = self.lookup_unique("subj", headnode, depgraph)
             relation = subj["rel"]
-            node["deps"].setdefault(relation, [])
-            node["deps"][relation].append(subj["address"])
+            _add_dependency(node, relation, subj["address"])
             # node['deps'].append(subj['address'])
 
     def _lookup_semtype_option(self, semtype, node, depgraph):
         # TODO(sfedia): OPTIONAL_RELATIONSHIPS
         relationships = frozenset(
-            depgraph.nodes[dep]["rel"].lower()
-            for dep in chain.from_iterable(node["deps"].values())
-            if depgraph.nodes[dep]["rel"].lower() not in OPTIONAL_RELATIONSHIPS
+            rel
+            for rel in (depgraph.nodes[dep]["rel"].lower() for dep in _dependents(node))
+            if rel not in OPTIONAL_RELATIONSHIPS
         )
-
-        try:
-            lookup = semtype[relationships]
-        except KeyError:
-            # An exact match is not found, so find the best match where
-            # 'best' is defined as the glue entry whose relationship set has the
-            # most relations of any possible relationship set that is a subset
-            # of the actual depgraph
-            best_match = frozenset()
-            for relset_option in set(semtype) - {None}:
-                if (
-                    len(relset_option) > len(best_match)
-                    and relset_option < relationships
-                ):
-                    best_match = relset_option
-            if not best_match:
-                if None in semtype:
-                    best_match = None
-                else:
-                    return None
-            lookup = semtype[best_match]
-
-        return lookup
+        return semtype.best_match(relationships)
 
     def get_semtypes(self, node):
         """
@@ -257,122 +512,81 @@ class RuLamGlueDict(dict):
         glueformulas = []
 
         node_symb = SimplestSymbolizer(node)
+        word = node_symb.symb()
 
         glueFormulaFactory = self.get_GlueFormula_factory()
         for meaning, glue in lookup:
-            gf = glueFormulaFactory(self.get_meaning_formula(meaning, node, node_symb), glue)
+            gf = glueFormulaFactory(self.get_meaning_formula(meaning, word, node_symb), glue)
             if not len(glueformulas):
-                gf.word = node_symb.symb()
+                gf.word = word
             else:
-                gf.word = f"{node_symb.symb()}{len(glueformulas) + 1}"
+                gf.word = f"{word}{len(glueformulas) + 1}"
 
             gf.glue = self.initialize_labels(gf.glue, node, depgraph, counter.get())
 
             glueformulas.append(gf)
         return glueformulas
 
-    # TODO(sfedia): get rid of unused argument
-    def get_meaning_formula(self, generic, node, node_symbolizer):
-        node_symb = node_symbolizer.symb().replace(".", "")
-        generic = generic.replace("<word>", node_symb)
-        generic = re.sub(
-            r"<word::([A-Z][a-z]+)>",
-            lambda m: node_symbolizer.symbolize_feature(m.group(1)),
-            generic
-        )
-        return generic
+    def get_meaning_formula(self, template, word, node_symbolizer):
+        return template.instantiate(word.replace(".", ""), node_symbolizer)
 
     def initialize_labels(self, expr, node, depgraph, unique_index):
-        if isinstance(expr, linearlogic.AtomicExpression):
-            name = self.find_label_name(expr.name.lower(), node, depgraph, unique_index)
-            if name[0].isupper():
-                return linearlogic.VariableExpression(name)
+        labels = {}  # atom name -> label, the same atom occurs many times in a glue term
+        results = []
+        # post-order walk: an implication is built once both of its sides are
+        stack = [(expr, False)]
+        while stack:
+            expr, sides_done = stack.pop()
+            if isinstance(expr, linearlogic.AtomicExpression):
+                name = expr.name.lower()
+                if name not in labels:
+                    labels[name] = self.find_label_name(name, node, depgraph, unique_index)
+                name = labels[name]
+                if name[0].isupper():
+                    results.append(linearlogic.VariableExpression(name))
+                else:
+                    results.append(linearlogic.ConstantExpression(name))
+            elif sides_done:
+                consequent = results.pop()
+                results[-1] = linearlogic.ImpExpression(results[-1], consequent)
             else:
-                return linearlogic.ConstantExpression(name)
-        else:
-            return linearlogic.ImpExpression(
-                self.initialize_labels(expr.antecedent, node, depgraph, unique_index),
-                self.initialize_labels(expr.consequent, node, depgraph, unique_index),
-            )
+                stack.append((expr, True))
+                stack.append((expr.consequent, False))
+                stack.append((expr.antecedent, False))
+        return results[0]
 
     def find_label_name(self, name, node, depgraph, unique_index):
-        try:
-            dot = name.index(".")
-
-            before_dot = name[:dot]
-            after_dot = name[dot + 1 :]
+        while "." in name:
+            before_dot, name = name.split(".", 1)
             if before_dot == "super":
-                return self.find_label_name(
-                    after_dot, depgraph.nodes[node["head"]], depgraph, unique_index
-                )
+                node = depgraph.nodes[node["head"]]
             else:
-                return self.find_label_name(
-                    after_dot,
-                    self.lookup_unique(before_dot, node, depgraph),
-                    depgraph,
-                    unique_index,
-                )
-        except ValueError:
-            lbl = self.get_label(node)
-            if name == "f":
-                return lbl
-            elif name == "v":
-                return "%sv" % lbl
-            elif name == "r":
-                return "%sr" % lbl
-            elif name == "super":
-                return self.get_label(depgraph.nodes[node["head"]])
-            elif name == "var":
-                return f"{lbl.upper()}{unique_index}"
-            elif name == "a":
-                return self.get_label(self.lookup_unique("conja", node, depgraph))
-            elif name == "b":
-                return self.get_label(self.lookup_unique("conjb", node, depgraph))
-            else:
-                return self.get_label(self.lookup_unique(name, node, depgraph))
+                node = self.lookup_unique(before_dot, node, depgraph)
+
+        lbl = self.get_label(node)
+        if name == "f":
+            return lbl
+        elif name == "v":
+            return "%sv" % lbl
+        elif name == "r":
+            return "%sr" % lbl
+        elif name == "super":
+            return self.get_label(depgraph.nodes[node["head"]])
+        elif name == "var":
+            return f"{lbl.upper()}{unique_index}"
+        elif name == "a":
+            return self.get_label(self.lookup_unique("conja", node, depgraph))
+        elif name == "b":
+            return self.get_label(self.lookup_unique("conjb", node, depgraph))
+        else:
+            return self.get_label(self.lookup_unique(name, node, depgraph))
 
     def get_label(self, node):
         """
-        Pick an alphabetic character as identifier for an entity in the model.
-
-        :param value: where to index into the list of characters
-        :type value: int
+        Pick an alphabetic character as identifier for an entity in the model:
+        'f' for the node at address 1, ..., 'e1' at 26, 'f1' at 27, ...
         """
-        value = node["address"]
-
-        letter = [
-            "f",
-            "g",
-            "h",
-            "i",
-            "j",
-            "k",
-            "l",
-            "m",
-            "n",
-            "o",
-            "p",
-            "q",
-            "r",
-            "s",
-            "t",
-            "u",
-            "v",
-            "w",
-            "x",
-            "y",
-            "z",
-            "a",
-            "b",
-            "c",
-            "d",
-            "e",
-        ][value - 1]
-        num = int(value) // 26
-        if num > 0:
-            return letter + str(num)
-        else:
-            return letter
+        return _get_label(node["address"])
 
     def lookup_unique(self, rel, node, depgraph):
         """
@@ -380,7 +594,7 @@ class RuLamGlueDict(dict):
         """
         deps = [
             depgraph.nodes[dep]
-            for dep in chain.from_iterable(node["deps"].values())
+            for dep in _dependents(node)
             if depgraph.nodes[dep]["rel"].lower() == rel.lower()
         ]
 
@@ -399,11 +613,147 @@ class RuLamGlueDict(dict):
         return GlueFormula
 
 
+class SemtypeOptions(Mapping):
+    """
+    Read-only glue entries of a semtype by relationship set, ``None`` is the entry
+    for any set. The sets are indexed by size when the grammar is loaded, and the
+    best match of every relationship set met so far is cached.
+    """
+
+    __slots__ = ("_options", "_by_size", "_best_matches")
+
+    MAX_CACHED_MATCHES = 4096
+
+    def __init__(self, options):
+        self._options = dict(options)
+        # the non-empty sets, biggest first, in the order of the grammar file for equal sizes
+        self._by_size = sorted((rels for rels in self._options if rels), key=len, reverse=True)
+        self._best_matches = {}
+
+    def __getitem__(self, relationships):
+        return self._options[relationships]
+
+    def __iter__(self):
+        return iter(self._options)
+
+    def __len__(self):
+        return len(self._options)
+
+    def best_match(self, relationships: tp.FrozenSet[str]) -> tp.Optional[tuple]:
+        """
+        The entry of ``relationships`` or, if there is none, of the biggest
+        set that is a proper subset of it (the first one of the grammar file
+        among those of the same size), or the entry for any set; ``None`` if
+        none of them exists
+        """
+        try:
+            return self._best_matches[relationships]
+        except KeyError:
+            pass
+
+        lookup = self._options.get(relationships)
+        if lookup is None:
+            for relset_option in self._by_size:
+                if len(relset_option) < len(relationships) and relset_option < relationships:
+                    lookup = self._options[relset_option]
+                    break
+            else:
+                lookup = self._options.get(None)
+
+        if len(self._best_matches) < self.MAX_CACHED_MATCHES:
+            self._best_matches[relationships] = lookup
+        return lookup
+
+
+class GlueIndices(Set):
+    """
+    Immutable set of the (non-negative int) indices of a glue formula,
+    stored as a bitset
+    """
+
+    __slots__ = ("bits",)
+
+    def __init__(self, indices=()):
+        bits = 0
+        for index in indices:
+            bits |= 1 << index
+        self.bits = bits
+
+    @classmethod
+    def from_bits(cls, bits: int) -> "GlueIndices":
+        indices = cls.__new__(cls)
+        indices.bits = bits
+        return indices
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return cls(iterable)
+
+    def __contains__(self, index):
+        return isinstance(index, int) and index >= 0 and bool(self.bits >> index & 1)
+
+    def __iter__(self):
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def __len__(self):
+        return bin(self.bits).count("1")
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __and__(self, other):
+        if isinstance(other, GlueIndices):
+            return GlueIndices.from_bits(self.bits & other.bits)
+        return super().__and__(other)
+
+    def __or__(self, other):
+        if isinstance(other, GlueIndices):
+            return GlueIndices.from_bits(self.bits | other.bits)
+        return super().__or__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, GlueIndices):
+            return GlueIndices.from_bits(self.bits & ~other.bits)
+        return super().__sub__(other)
+
+    def __eq__(self, other):
+        if isinstance(other, GlueIndices):
+            return self.bits == other.bits
+        return super().__eq__(other)
+
+    def __le__(self, other):
+        if isinstance(other, GlueIndices):
+            return self.bits & ~other.bits == 0
+        return super().__le__(other)
+
+    def __lt__(self, other):
+        if isinstance(other, GlueIndices):
+            return self.bits != other.bits and self.bits & ~other.bits == 0
+        return super().__lt__(other)
+
+    def isdisjoint(self, other):
+        if isinstance(other, GlueIndices):
+            return not self.bits & other.bits
+        return super().isdisjoint(other)
+
+    def __repr__(self):
+        return "GlueIndices({%s})" % ", ".join(str(index) for index in self)
+
+
+def make_glue_indices(indices) -> GlueIndices:
+    if isinstance(indices, GlueIndices):
+        return indices
+    return GlueIndices(indices or ())
+
+
 class GlueFormula:
-    def __init__(self, meaning, glue, indices=None):
-        if not indices:
-            indices = set()
+    __slots__ = ("meaning", "glue", "indices", "word", "_key", "_str", "_sort_key")
 
+    def __init__(self, meaning, glue, indices=None):
         if isinstance(meaning, str):
             self.meaning = Expression.fromstring(meaning)
         elif isinstance(meaning, Expression):
@@ -424,19 +774,20 @@ class GlueFormula:
                 % (glue, glue.__class__)
             )
 
-        self.indices = indices
+        self.indices = make_glue_indices(indices)
+        self._key = self._str = self._sort_key = None
 
     def applyto(self, arg):
         """self = (\\x.(walk x), (subj -o f))
         arg  = (john        ,  subj)
         returns ((walk john),          f)
         """
-        if self.indices & arg.indices:  # if the sets are NOT disjoint
+        if self.indices.bits & arg.indices.bits:  # if the sets are NOT disjoint
             raise linearlogic.LinearLogicApplicationException(
                 f"'{self}' applied to '{arg}'.  Indices are not disjoint."
             )
         else:  # if the sets ARE disjoint
-            return_indices = self.indices | arg.indices
+            return_indices = GlueIndices.from_bits(self.indices.bits | arg.indices.bits)
 
         try:
             return_glue = linearlogic.ApplicationExpression(
@@ -457,7 +808,15 @@ class GlueFormula:
                 )
         return_meaning = self.meaning.applyto(arg_meaning_abstracted)
 
-        return self.__class__(return_meaning, return_glue, return_indices)
+        result = self.__class__(return_meaning, return_glue, return_indices)
+        if getattr(return_meaning, "function", None) is self.meaning:
+            # the key of the meaning is only computed if it's needed
+            result._key = (
+                return_meaning,
+                None,
+                (self, arg if arg_meaning_abstracted is arg.meaning else None),
+            )
+        return result
 
     def make_VariableExpression(self, name):
         return VariableExpression(name)
@@ -489,28 +848,74 @@ class GlueFormula:
             self.meaning.simplify(), self.glue.simplify(), self.indices
         )
 
+    def meaning_key(self) -> tuple:
+        """
+        Structural key of the meaning, the same for meanings that only differ
+        in the names of bound variables. Computed once unless the meaning is
+        replaced, the key of a formula made by ``applyto`` is made of the keys
+        of the formulas it was made of.
+        """
+        key = self._key
+        if key is not None and key[0] is self.meaning:
+            if key[1] is not None:
+                return key[1]
+            function, argument = key[2]
+            meaning_key = (self.meaning.__class__,) + function.meaning_key() + (
+                argument.meaning_key() if argument is not None
+                else structural_key(self.meaning.argument, bound_variables=True)
+            )
+        else:
+            meaning_key = structural_key(self.meaning, bound_variables=True)
+        self._key = (self.meaning, meaning_key, None)
+        return meaning_key
+
     def __eq__(self, other):
-        return (
-            self.__class__ == other.__class__
-            and self.meaning == other.meaning
-            and self.glue == other.glue
-        )
+        if self.__class__ != other.__class__ or self.glue != other.glue:
+            return False
+        if self.meaning_key() == other.meaning_key():
+            return True
+        # alphabetic variants over the referents of a DRS
+        return self.meaning == other.meaning
 
     def __ne__(self, other):
         return not self == other
 
     # sorting for use in doctests which must be deterministic
     def __lt__(self, other):
-        return str(self) < str(other)
+        return self.sort_key() < other.sort_key()
 
-    def __str__(self):
-        assert isinstance(self.indices, set)
-        accum = f"{self.meaning} : {self.glue}"
-        if self.indices:
-            accum += (
-                " : {" + ", ".join(str(index) for index in sorted(self.indices)) + "}"
+    def sort_key(self) -> tuple:
+        """
+        Order of the formulas by their meaning key, glue and indices, computed once
+        unless one of them is replaced
+        """
+        cached = self._sort_key
+        if not self._is_current(cached):
+            key = (
+                sortable_key(self.meaning_key()),
+                sortable_key(structural_key(self.glue)),
+                tuple(sorted(self.indices)),
             )
-        return accum
+            cached = self._sort_key = (self.meaning, self.glue, self.indices, key)
+        return cached[3]
+
+    def _is_current(self, cached: tp.Optional[tuple]) -> bool:
+        """Whether a cached value was computed for the current meaning, glue and indices"""
+        return (
+            cached is not None
+            and cached[0] is self.meaning and cached[1] is self.glue and cached[2] is self.indices
+        )
+
+    def __str__(self):
+        cached = self._str
+        if not self._is_current(cached):
+            accum = f"{self.meaning} : {self.glue}"
+            if self.indices:
+                accum += (
+                    " : {" + ", ".join(str(index) for index in self.indices) + "}"
+                )
+            cached = self._str = (self.meaning, self.glue, self.indices, accum)
+        return cached[3]
 
     def __repr__(self):
         return "%s" % self
@@ -0,0 +1,200 @@
+import typing as tp
+from nltk.sem import linearlogic
+from .canonical import structural_key
+from .glue import GlueFormula, make_glue_indices
+
+"""
+Glue proof engine with indexed premises, a drop-in replacement of the agenda
+loop of ``nltk.sem.glue.Glue.get_readings``.
+
+NLTK tries every new formula against every stored formula. Here the stored
+formulas are grouped by the atom they are looked up with (the glue of an atomic
+formula, the antecedent of an implication), every group has a bit in
+a per-atom bitset and only the groups whose atom can unify are tried. Formula
+indices are compared as bitsets too, and a formula derived twice (same glue,
+indices and meaning up to the names of bound variables) is only kept once.
+"""
+
+
+class _Premises:
+    """
+    Formulas grouped by an atom, groups are numbered in the order their atom
+    was first seen (the order NLTK's dicts iterate in)
+    """
+
+    def __init__(self):
+        self.atoms = {}  # atom -> group number
+        self.group_atoms = []  # group number -> atom
+        self.groups = []  # group number -> [(formula, indices bitset)]
+        self.by_constant = {}  # constant name -> bitset of groups
+        self.variables = 0  # bitset of the groups of variables
+        self.all = 0  # bitset of all the groups
+
+    def add(self, atom, formula, indices: int):
+        group = self.atoms.get(atom)
+        if group is None:
+            group = self.atoms[atom] = len(self.groups)
+            self.group_atoms.append(atom)
+            self.groups.append([])
+            bit = 1 << group
+            if isinstance(atom, linearlogic.ConstantExpression):
+                self.by_constant[atom.name] = self.by_constant.get(atom.name, 0) | bit
+            elif isinstance(atom, linearlogic.VariableExpression):
+                self.variables |= bit
+            self.all |= bit
+        self.groups[group].append((formula, indices))
+
+    def candidates(self, atom) -> tp.Iterator[tp.Tuple[tp.Any, tp.List]]:
+        """
+        Groups whose atom may unify with ``atom``: a constant only unifies with
+        the same constant or with a variable, anything else is tried against all
+        """
+        if isinstance(atom, linearlogic.ConstantExpression):
+            groups = self.by_constant.get(atom.name, 0) | self.variables
+        else:
+            groups = self.all
+        while groups:
+            lowest = groups & -groups
+            group = lowest.bit_length() - 1
+            groups ^= lowest
+            yield self.group_atoms[group], self.groups[group]
+
+    def formulas(self) -> tp.Iterator[tp.Tuple[tp.Any, int]]:
+        for group in self.groups:
+            yield from group
+
+
+def _glue_key(glue, glue_simp, indices: int) -> tuple:
+    """
+    Key of a formula's glue, its bindings and indices, from the structure of the
+    glue simplified once by the caller (no further ``simplify()``, no strings)
+    """
+    bindings = frozenset()
+    if isinstance(glue, linearlogic.ApplicationExpression):
+        bindings = frozenset(
+            (variable.name, structural_key(value)) for variable, value in glue.bindings.d.items()
+        )
+    return structural_key(glue_simp), bindings, indices
+
+
+def _meaning_key(formula) -> tuple:
+    if isinstance(formula, GlueFormula):
+        return formula.meaning_key()
+    return structural_key(formula.meaning, bound_variables=True)
+
+
+class _Derivations:
+    """
+    Derived formulas by their glue and indices. The keys of the meanings, which
+    are costly to compute for big meanings, are only computed for the formulas
+    whose glue and indices match another formula's.
+    """
+
+    def __init__(self):
+        self.by_glue = {}  # glue key -> the formula, or the keys of the meanings
+
+    def add(self, formula, glue_key) -> bool:
+        """``False`` if the formula has already been derived"""
+        derived = self.by_glue.get(glue_key)
+        if derived is None:
+            self.by_glue[glue_key] = formula
+            return True
+        if not isinstance(derived, set):
+            derived = self.by_glue[glue_key] = {_meaning_key(derived)}
+        meaning_key = _meaning_key(formula)
+        if meaning_key in derived:
+            return False
+        derived.add(meaning_key)
+        return True
+
+
+def _same_constant(first, second) -> bool:
+    """Equal constants unify whatever the bindings are"""
+    return (
+        isinstance(first, linearlogic.ConstantExpression)
+        and isinstance(second, linearlogic.ConstantExpression)
+        and first.name == second.name
+    )
+
+
+def _unifies(first, second, bindings) -> bool:
+    if _same_constant(first, second):
+        return True
+    try:
+        first.unify(second, bindings)
+    except linearlogic.UnificationException:
+        return False
+    return True
+
+
+def prove(agenda: tp.List, stats: tp.Optional[tp.Dict[str, int]] = None) -> tp.List:
+    """
+    Formulas derivable from the compiled premises in ``agenda`` that use all of them,
+    in the order ``nltk.sem.glue.Glue.get_readings`` finds their meanings.
+    The agenda is consumed.
+
+    :param stats: gets the number of 'premises' and of 'proof_steps' (applications tried)
+    """
+    agenda_length = len(agenda)
+    steps = 0
+    # the glue of every formula is simplified once, when it is put on the agenda
+    agenda = [
+        (formula, make_glue_indices(formula.indices).bits, formula.glue.simplify())
+        for formula in agenda
+    ]
+    atomics = _Premises()
+    nonatomics = _Premises()
+    derivations = _Derivations()
+
+    def derive(function, function_indices, argument, argument_indices):
+        nonlocal steps
+        steps += 1
+        try:
+            derived = function.applyto(argument)
+        except linearlogic.LinearLogicApplicationException:
+            return
+        indices = function_indices | argument_indices
+        glue_simp = derived.glue.simplify()
+        if derivations.add(derived, _glue_key(derived.glue, glue_simp, indices)):
+            agenda.append((derived, indices, glue_simp))
+
+    while agenda:
+        cur, cur_indices, glue_simp = agenda.pop()
+        if isinstance(glue_simp, linearlogic.ImpExpression):
+            if isinstance(cur.glue, linearlogic.ApplicationExpression):
+                bindings = cur.glue.bindings
+            else:
+                bindings = linearlogic.BindingDict()
+            for atom, group in atomics.candidates(glue_simp.antecedent):
+                if not _unifies(glue_simp.antecedent, atom, bindings):
+                    continue
+                for atomic, atomic_indices in group:
+                    if not cur_indices & atomic_indices:
+                        derive(cur, cur_indices, atomic, atomic_indices)
+            nonatomics.add(glue_simp.antecedent, cur, cur_indices)
+
+        else:
+            for atom, group in nonatomics.candidates(glue_simp):
+                same_constant = _same_constant(glue_simp, atom)
+                for nonatomic, nonatomic_indices in group:
+                    if cur_indices & nonatomic_indices:
+                        continue
+                    if not same_constant:
+                        if isinstance(nonatomic.glue, linearlogic.ApplicationExpression):
+                            bindings = nonatomic.glue.bindings
+                        else:
+                            bindings = linearlogic.BindingDict()
+                        if not _unifies(glue_simp, atom, bindings):
+                            continue
+                    derive(nonatomic, nonatomic_indices, cur, cur_indices)
+            atomics.add(glue_simp, cur, cur_indices)
+
+    if stats is not None:
+        stats["premises"] = agenda_length
+        stats["proof_steps"] = steps
+    return [
+        formula
+        for premises in (atomics, nonatomics)
+        for formula, indices in premises.formulas()
+        if bin(indices).count("1") == agenda_length
+    ]
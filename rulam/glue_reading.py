@@ -1,18 +1,54 @@
 import nltk
 from functools import reduce
 from operator import add
+from nltk.sem.drt import DRS, DrtVariableExpression
+from nltk.sem.logic import unique_variable
 from .drt_glue import RuLamDrtGlue
 from .anaphora_resolution import resolve_anaphora
+from .instrumentation import stage
 
 
 BASIC_GRAMMAR_FILENAME = "basic_rules.semtype"
 
 
+def merge_readings(readings):
+    """
+    The simplified concatenation of the readings, ``reduce(add, readings).simplify()``,
+    built in one pass: the referents and conditions of all the DRSs are collected
+    into one DRS, and a referent is renamed only if an earlier reading already has it.
+    ``DrtConcatenation.simplify`` instead re-simplifies and re-collects the referents
+    of the whole left part at every step, which is quadratic in the number of readings.
+
+    Readings that don't simplify to a DRS, or DRSs with a consequent, are concatenated
+    by ``reduce`` as before.
+    """
+    drss = [reading.simplify() for reading in readings]
+    if not drss or not all(isinstance(drs, DRS) and drs.consequent is None for drs in drss):
+        return reduce(add, readings).simplify()
+
+    refs = []
+    conds = []
+    seen_refs = set()
+    for drs in drss:
+        drs_refs = set(drs.get_refs(True))
+        clashes = seen_refs & drs_refs
+        if clashes:
+            # the same alpha conversion as in DrtConcatenation.simplify
+            for ref in clashes:
+                drs = drs.replace(ref, DrtVariableExpression(unique_variable(ref)), True)
+            drs_refs = drs.get_refs(True)
+        seen_refs.update(drs_refs)
+        refs.extend(drs.refs)
+        conds.extend(drs.conds)
+    return DRS(refs, conds)
+
+
 class RuLamGlueReadingCommand(nltk.inference.discourse.ReadingCommand):
     def __init__(self, semtype_file=None, remove_duplicates=False, depparser=None):
         """
         :param semtype_file: name of file where grammar can be loaded
-        :param remove_duplicates: should duplicates be removed?
+        :param remove_duplicates: should logically equivalent readings be removed
+            too (with a theorem prover)? Alphabetic variants are always removed
         :param depparser: the dependency parser
         """
         if semtype_file is None:
@@ -27,6 +63,20 @@ class RuLamGlueReadingCommand(nltk.inference.discourse.ReadingCommand):
         """:see: ReadingCommand.parse_to_readings()"""
         return self._glue.parse_to_meaning(sentence)
 
+    def parse_sents_to_readings(self, sentences):
+        """
+        Readings of every sentence, with all the sentences sent to the dependency
+        parser at once; ``result[i]`` holds the readings of ``sentences[i]``
+        """
+        return [
+            self.depgraph_to_readings(depgraph)
+            for depgraph in self._glue.dep_parse_sents(sentences)
+        ]
+
+    def depgraph_to_readings(self, depgraph):
+        """Readings of an already dependency parsed sentence"""
+        return self._glue.depgraph_to_meaning(depgraph)
+
     def process_thread(self, sentence_readings):
         """:see: ReadingCommand.process_thread()"""
         return [self.combine_readings(sentence_readings)]
@@ -37,8 +87,10 @@ class RuLamGlueReadingCommand(nltk.inference.discourse.ReadingCommand):
 
     def combine_readings(self, readings):
         """:see: ReadingCommand.combine_readings()"""
-        thread_reading = reduce(add, readings)
-        return resolve_anaphora(thread_reading.simplify())
+        with stage("combine_readings") as counts:
+            if counts is not None:
+                counts["readings"] = len(readings)
+            return resolve_anaphora(merge_readings(readings))
 
     def to_fol(self, expression):
         """:see: ReadingCommand.to_fol()"""
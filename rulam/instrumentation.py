@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+import typing as tp
+from contextlib import contextmanager
+
+"""
+Optional per-stage instrumentation: wall time and counts of every stage of the
+pipeline (UDPipe requests, dependency parsing, glue lookup, glue proof,
+combining readings, anaphora resolution, threads) go to pluggable sinks.
+
+Nothing is measured while there is no sink: ``stage`` returns a shared
+do-nothing context manager whose counts are ``None``, so the instrumented code
+also skips computing them.
+
+    sink = rulam.instrumentation.PrometheusSink()
+    rulam.instrumentation.add_sink(sink)
+    ...
+    print(sink.render())
+"""
+
+
+class StageEvent(tp.NamedTuple):
+    stage: str  # 'udpipe_request', 'dep_parse', 'glue_lookup', 'glue_proof', ...
+    seconds: float
+    counts: tp.Mapping[str, float]  # 'tokens', 'glue_formulas', 'proof_steps', 'readings', ...
+
+
+_sinks = ()  # replaced, never mutated, so that it is read without a lock
+_sinks_lock = threading.Lock()
+
+
+def add_sink(sink: "Sink"):
+    global _sinks
+    with _sinks_lock:
+        _sinks = _sinks + (sink,)
+
+
+def remove_sink(sink: "Sink"):
+    global _sinks
+    with _sinks_lock:
+        _sinks = tuple(added for added in _sinks if added is not sink)
+
+
+def is_enabled() -> bool:
+    return bool(_sinks)
+
+
+class _Disabled:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_DISABLED = _Disabled()
+
+
+class _Stage:
+    __slots__ = ("name", "counts", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts = {}
+
+    def __enter__(self) -> tp.Dict[str, float]:
+        self.start = time.perf_counter()
+        return self.counts
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.counts["errors"] = 1
+        emit(StageEvent(self.name, seconds, self.counts))
+        return False
+
+
+def stage(name: str):
+    """
+    Context manager timing a stage. It gives the dict of the counts of the stage
+    to fill in, or ``None`` if instrumentation is disabled:
+
+        with stage("glue_proof") as counts:
+            readings = ...
+            if counts is not None:
+                counts["readings"] = len(readings)
+    """
+    if not _sinks:
+        return _DISABLED
+    return _Stage(name)
+
+
+def emit(event: StageEvent):
+    for sink in _sinks:
+        try:
+            sink.record(event)
+        except Exception:
+            logging.getLogger(__name__).exception("Instrumentation sink %r failed", sink)
+
+
+def cache_stats() -> tp.Dict[str, tp.Dict[str, tp.Any]]:
+    """Hit rates of the caches: symbols and features of the symbolizer, UDPipe output"""
+    from .conllu_cache import get_default_cache
+    from .symbolizer import symbolizer_cache_stats
+
+    stats = dict(symbolizer_cache_stats())
+    conllu_cache = get_default_cache()
+    if conllu_cache is not None:
+        stats["conllu"] = conllu_cache.stats()
+    return stats
+
+
+class Sink:
+    """Receives the event of every finished stage, maybe from several threads at once"""
+
+    def record(self, event: StageEvent):
+        raise NotImplementedError()
+
+
+class CallbackSink(Sink):
+    def __init__(self, callback: tp.Callable[[StageEvent], tp.Any]):
+        self.callback = callback
+
+    def record(self, event: StageEvent):
+        self.callback(event)
+
+
+class LoggingSink(Sink):
+    def __init__(self, logger: tp.Optional[logging.Logger] = None, level: int = logging.DEBUG):
+        self.logger = logger if logger is not None else logging.getLogger("rulam.stages")
+        self.level = level
+
+    def record(self, event: StageEvent):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(
+                self.level, "%s %.6fs %s", event.stage, event.seconds,
+                " ".join("%s=%s" % item for item in sorted(event.counts.items())),
+            )
+
+
+class PrometheusSink(Sink):
+    """
+    Totals of the events by stage, rendered in the Prometheus text exposition format
+    (e.g. served on ``/metrics``) together with the hit rates of the caches
+    """
+
+    def __init__(self, prefix: str = "rulam"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._calls = {}  # stage -> number of events
+        self._seconds = {}  # stage -> total time
+        self._counts = {}  # (count name, stage) -> total
+
+    def record(self, event: StageEvent):
+        with self._lock:
+            self._calls[event.stage] = self._calls.get(event.stage, 0) + 1
+            self._seconds[event.stage] = self._seconds.get(event.stage, 0.0) + event.seconds
+            for name, value in event.counts.items():
+                key = (name, event.stage)
+                self._counts[key] = self._counts.get(key, 0) + value
+
+    def render(self) -> str:
+        with self._lock:
+            calls = dict(self._calls)
+            seconds = dict(self._seconds)
+            counts = dict(self._counts)
+
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            name = "%s_%s" % (self.prefix, name)
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s %s" % (name, metric_type))
+            for labels, value in samples:
+                label_text = ",".join('%s="%s"' % (key, _escape(value)) for key, value in labels)
+                lines.append("%s{%s} %s" % (name, label_text, _format_value(value)))
+
+        metric("stage_calls_total", "counter", "Number of times the stage ran.", [
+            ((("stage", stage),), value) for stage, value in sorted(calls.items())
+        ])
+        metric("stage_seconds_total", "counter", "Wall time spent in the stage.", [
+            ((("stage", stage),), value) for stage, value in sorted(seconds.items())
+        ])
+        for count_name in sorted({name for name, _ in counts}):
+            metric("%s_total" % count_name, "counter", "Total %s counted by the stage." % count_name, [
+                ((("stage", stage),), value)
+                for (name, stage), value in sorted(counts.items()) if name == count_name
+            ])
+        metric("cache_hit_rate", "gauge", "Share of the cache lookups that were hits.", [
+            ((("cache", cache),), stats["hit_rate"]) for cache, stats in sorted(cache_stats().items())
+        ])
+        return "\n".join(lines) + "\n"
+
+
+def _escape(label_value: str) -> str:
+    return label_value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+@contextmanager
+def instrumented(*sinks: Sink) -> tp.Iterator[tp.Tuple[Sink, ...]]:
+    """Send the events to the sinks inside the ``with`` block only"""
+    for sink in sinks:
+        add_sink(sink)
+    try:
+        yield sinks
+    finally:
+        for sink in sinks:
+            remove_sink(sink)
@@ -0,0 +1,134 @@
+import os
+import threading
+import typing as tp
+from .conllu_cache import get_default_cache, make_key
+from .instrumentation import stage
+from .web_udpipe_processor import (
+    SENTENCE_CACHE_OPTIONS,
+    join_presegmented_sentences,
+    split_conllu_sentences,
+    strip_conllu_comments,
+)
+
+"""
+Fast in-process interaction with UDPipe through its Python bindings
+UDPipe Python bindings: https://pypi.org/project/ufal.udpipe/
+Russian UDPipe models: https://lindat.mff.cuni.cz/repository/xmlui/handle/11234/1-3131
+"""
+
+class LocalUDPipeProcessorError(Exception):
+    pass
+
+
+MODEL_PATH_ENV_VAR = "RULAM_UDPIPE_MODEL"
+
+_loaded_models = {}
+_loaded_models_lock = threading.Lock()
+
+
+def resolve_model_path(model_path: tp.Optional[str] = None) -> str:
+    if model_path is None:
+        model_path = os.environ.get(MODEL_PATH_ENV_VAR)
+    if not model_path:
+        raise LocalUDPipeProcessorError(
+            f"No UDPipe model provided, pass a model path or set {MODEL_PATH_ENV_VAR}."
+        )
+    return os.path.abspath(model_path)
+
+
+def load_model(model_path: tp.Optional[str] = None):
+    """
+    Load the UDPipe model from disk, each model file is loaded only once per process.
+    """
+    model_path = resolve_model_path(model_path)
+
+    with _loaded_models_lock:
+        if model_path in _loaded_models:
+            return _loaded_models[model_path]
+
+        try:
+            from ufal.udpipe import Model
+        except ImportError:
+            raise LocalUDPipeProcessorError(
+                "Local UDPipe integration requires the 'ufal.udpipe' package."
+            )
+
+        if not os.path.isfile(model_path):
+            raise LocalUDPipeProcessorError(f"UDPipe model file not found: {model_path}")
+
+        model = Model.load(model_path)
+        if model is None:
+            raise LocalUDPipeProcessorError(f"Failed to load UDPipe model: {model_path}")
+
+        _loaded_models[model_path] = model
+        return model
+
+
+def local_udpipe_process_text_conllu(
+    text: str, model_path: tp.Optional[str] = None, tokenizer: str = "tokenize", cache: bool = True
+) -> str:
+    """:param cache: see ``web_udpipe_process_text_conllu``"""
+    cache = get_default_cache() if cache else None
+    if cache is None:
+        return _local_udpipe_process_text_conllu(text, model_path, tokenizer)
+
+    key = make_key(text, resolve_model_path(model_path), tokenizer)
+    return cache.get_or_compute(
+        key, lambda: _local_udpipe_process_text_conllu(text, model_path, tokenizer)
+    )
+
+
+def _local_udpipe_process_text_conllu(
+    text: str, model_path: tp.Optional[str], tokenizer: str
+) -> str:
+    from ufal.udpipe import Pipeline, ProcessingError
+
+    model = load_model(model_path)
+    # pipelines are cheap, unlike models, and are not safe to share between threads
+    pipeline = Pipeline(model, tokenizer, Pipeline.DEFAULT, Pipeline.DEFAULT, "conllu")
+    error = ProcessingError()
+    with stage("udpipe_local") as counts:
+        if counts is not None:
+            counts["characters"] = len(text)
+        text_with_comments = pipeline.process(text, error)
+    if error.occurred():
+        raise LocalUDPipeProcessorError(f"UDPipe has failed to process text: {error.message}")
+
+    return strip_conllu_comments(text_with_comments)
+
+
+def local_udpipe_process_sentences_conllu(
+    sentences: tp.List[str], model_path: tp.Optional[str] = None
+) -> tp.List[str]:
+    """
+    Parse all the sentences with a single pipeline run, one CoNLL-U sentence per input sentence.
+    Every sentence is cached on its own, only the ones not seen before are parsed.
+    """
+    try:
+        join_presegmented_sentences(sentences)
+    except ValueError as e:
+        raise LocalUDPipeProcessorError(str(e))
+
+    cache = get_default_cache()
+    if cache is None:
+        return _local_udpipe_process_sentences_conllu(sentences, model_path)
+    model = resolve_model_path(model_path)
+    keys = [make_key(sentence, model, SENTENCE_CACHE_OPTIONS) for sentence in sentences]
+
+    def parse_missing(missing):
+        return _local_udpipe_process_sentences_conllu([sentences[index] for index in missing], model_path)
+
+    return cache.get_or_compute_many(keys, parse_missing)
+
+
+def _local_udpipe_process_sentences_conllu(
+    sentences: tp.List[str], model_path: tp.Optional[str]
+) -> tp.List[str]:
+    text = join_presegmented_sentences(sentences)
+    conllu = _local_udpipe_process_text_conllu(text, model_path, "tokenizer=presegmented")
+    conllu_sentences = split_conllu_sentences(conllu)
+    if len(conllu_sentences) != len(sentences):
+        raise LocalUDPipeProcessorError(
+            f"UDPipe has produced {len(conllu_sentences)} sentences instead of {len(sentences)}."
+        )
+    return conllu_sentences
@@ -1,17 +1,26 @@
 from enum import Enum
 from .udpipe_glue_connector import make_discourse_tester
+from .dependency_parser import LocalUDPipeDependencyParser
 import nltk
 
 
 class IntegrationTypes(Enum):
     WEB_UDPIPE_GLUE = 1
-    LOCAL_UDPIPE_GLUE = 2  # not ready yet
+    LOCAL_UDPIPE_GLUE = 2
 
 
-def get_parser(sentences, integration_type: IntegrationTypes = IntegrationTypes.WEB_UDPIPE_GLUE):
+def get_parser(
+    sentences,
+    integration_type: IntegrationTypes = IntegrationTypes.WEB_UDPIPE_GLUE,
+    model_path: str = None
+):
+    """
+    :param model_path: UDPipe model file for the local integration,
+        defaults to the ``RULAM_UDPIPE_MODEL`` environment variable
+    """
     if integration_type == IntegrationTypes.LOCAL_UDPIPE_GLUE:
-        raise NotImplementedError("Local UDPipe integration is not yet available.")
-    
+        return make_discourse_tester(sentences, LocalUDPipeDependencyParser(model_path))
+
     if integration_type == IntegrationTypes.WEB_UDPIPE_GLUE:
         return make_discourse_tester(sentences)
 
@@ -0,0 +1,383 @@
+import argparse
+import json
+import sys
+import threading
+import time
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from . import instrumentation
+from .anaphora_resolution import anaphora_links
+from .compact_conllu import CompactSentence
+from .conllu_stream import iter_conllu_sentences
+from .dependency_parser import (
+    LocalUDPipeDependencyParser,
+    StaticDependencyParser,
+    UDPipeDependencyParser,
+    WebUDPipeDependencyParser,
+)
+from .discourse import iter_threads
+from .glue_reading import RuLamGlueReadingCommand
+
+"""
+Long-running HTTP/JSON service: ``python -m rulam.serve --port 8080``
+The grammar, the caches of the symbolizer and the connection to UDPipe (or the
+local model) stay loaded between requests. Documents are read by a bounded pool of
+worker threads; at most ``queue_size`` more wait for a free worker, and requests
+beyond that are refused with ``503`` right away instead of piling up. A document
+stops being read after ``--timeout`` seconds (``504``) or after trying
+``--max-steps`` readings for its threads, so a slow request frees its worker.
+
+The threads are those of ``rulam.discourse.iter_threads``: the pronouns are resolved
+against the whole thread, so they may refer to a referent of a later sentence
+(cataphora), the same as ``RuLamGlueReadingCommand.combine_readings`` and the batch runner.
+
+    POST /parse   {"text": "..."} or {"sentences": [...]} or {"conllu": "..."}
+    GET  /health
+    GET  /metrics (with --metrics)
+
+The workers share one process, so the CPU bound stages of the requests don't
+run in parallel; run several services to use more cores. ``--model`` (a local
+UDPipe model), ``--recorded`` (CoNLL-U replayed by ``StaticDependencyParser``)
+or requests with CoNLL-U input need no network.
+"""
+
+DEFAULT_MAX_THREADS = 100  # threads of a document returned at most
+DEFAULT_MAX_STEPS = 10000  # readings tried for the threads of a document at most
+
+
+class ServiceBusy(Exception):
+    """All the workers are busy and the queue is full"""
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class DocumentTimeout(Exception):
+    """The document was not read before the timeout of the service"""
+
+
+class ReadingService:
+    """
+    The readings of documents with warm state: one reading command and one
+    dependency parser shared by the worker threads
+    """
+
+    def __init__(
+        self,
+        depparser: tp.Optional[UDPipeDependencyParser] = None,
+        semtype_file: tp.Optional[str] = None,
+        workers: int = 4,
+        queue_size: int = 16,
+        max_threads: int = DEFAULT_MAX_THREADS,
+        max_steps: tp.Optional[int] = DEFAULT_MAX_STEPS,
+        timeout: tp.Optional[float] = None,
+    ):
+        """
+        :param depparser: parser of the text inputs, a ``WebUDPipeDependencyParser`` if ``None``
+        :param workers: documents read at once
+        :param queue_size: documents waiting for a worker at most, the rest are refused
+        :param max_threads: discourse threads of a document returned at most
+        :param max_steps: readings tried for the threads of a document at most, see ``iter_threads``
+        :param timeout: seconds from ``submit`` after which a document is given up with
+            ``DocumentTimeout``, checked between the stages and while building the threads
+        """
+        self.depparser = depparser if depparser is not None else WebUDPipeDependencyParser()
+        self.reading_command = RuLamGlueReadingCommand(semtype_file, depparser=self.depparser)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_threads = max_threads
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="rulam-serve")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        # load the grammar now rather than with the first request
+        self.reading_command._glue.get_glue_dict()
+
+    @property
+    def pending(self) -> int:
+        """Documents being read or waiting for a worker"""
+        return self._pending
+
+    def submit(self, request: tp.Mapping[str, tp.Any]):
+        """
+        Future of ``read(request)``, with the deadline of the service's timeout
+
+        :raise ServiceBusy: if the queue is full
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy()
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        with self._pending_lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(self.read, request, deadline)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._pending_lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def parse_request(self, request: tp.Mapping[str, tp.Any]) -> tp.List[str]:
+        """CoNLL-U of every sentence of the request"""
+        if "conllu" in request:
+            return list(iter_conllu_sentences([_string(request, "conllu")]))
+        if "sentences" in request:
+            sentences = request["sentences"]
+            if not isinstance(sentences, list) or not all(isinstance(sentence, str) for sentence in sentences):
+                raise BadRequest("'sentences' must be a list of strings")
+            return [conllu.strip("\n") for conllu in self.depparser.process_sentences_conllu(sentences)]
+        if "text" in request:
+            return list(iter_conllu_sentences([self.depparser.process_text_conllu(_string(request, "text"))]))
+        raise BadRequest("The request has neither 'text', 'sentences' nor 'conllu'")
+
+    def read(self, request: tp.Mapping[str, tp.Any], deadline: tp.Optional[float] = None) -> tp.Dict[str, tp.Any]:
+        """
+        JSON response of a request: the readings of every sentence and the DRS,
+        FOL and anaphora links of every discourse thread whose pronouns could be resolved
+
+        :param deadline: ``time.monotonic()`` after which the document is given up
+        :raise BadRequest: if the request is malformed
+        :raise DocumentTimeout: if the deadline passes
+        """
+        if not isinstance(request, dict):
+            raise BadRequest("The request must be a JSON object")
+        max_threads = request.get("max_threads", self.max_threads)
+        # bool is a subclass of int, but "max_threads": true is a mistake
+        if isinstance(max_threads, bool) or not isinstance(max_threads, int) or max_threads < 0:
+            raise BadRequest("'max_threads' must be a non-negative integer")
+
+        _check_deadline(deadline)
+        conllu_sentences = self.parse_request(request)
+        sentence_readings = []
+        for conllu in conllu_sentences:
+            _check_deadline(deadline)
+            sentence_readings.append([
+                reading.simplify()
+                for reading in self.reading_command.depgraph_to_readings(CompactSentence.from_conllu(conllu))
+            ])
+        return {
+            "sentences": [
+                {"conllu": conllu, "readings": [str(reading) for reading in readings]}
+                for conllu, readings in zip(conllu_sentences, sentence_readings)
+            ],
+            "threads": self.read_threads(sentence_readings, min(max_threads, self.max_threads), deadline),
+        }
+
+    def read_threads(
+        self,
+        sentence_readings: tp.List[tp.List[tp.Any]],
+        max_threads: int,
+        deadline: tp.Optional[float] = None,
+    ) -> tp.List[tp.Dict]:
+        """
+        Threads of ``rulam.discourse.iter_threads`` in the order of their reading ids,
+        like ``DiscourseTester``; a pronoun may refer to a later sentence (cataphora).
+        At most ``max_steps`` readings are tried, however few threads are found.
+        """
+        threads = iter_threads(
+            [
+                {"s%s-r%s" % (sid, rid): reading for rid, reading in enumerate(readings)}
+                for sid, readings in enumerate(sentence_readings)
+            ],
+            max_threads,
+            max_steps=self.max_steps,
+            deadline=deadline,
+        )
+        response = [
+            {
+                "readings": list(thread.reading_ids),
+                "drs": str(thread.drs),
+                "fol": _fol(thread.drs),
+                "anaphora": [
+                    {
+                        "pronoun": str(link.pronoun),
+                        "antecedents": [str(antecedent) for antecedent in link.antecedents],
+                    }
+                    for link in anaphora_links(thread.unresolved, thread.drs)
+                ],
+            }
+            for thread in threads
+        ]
+        # iter_threads stops quietly at the deadline, a partial answer would look complete
+        _check_deadline(deadline)
+        return response
+
+
+def _check_deadline(deadline: tp.Optional[float]):
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DocumentTimeout()
+
+
+def _string(request, key) -> str:
+    if not isinstance(request[key], str):
+        raise BadRequest("'%s' must be a string" % key)
+    return request[key]
+
+
+def _fol(drs) -> tp.Optional[str]:
+    """``None`` if the DRS has no FOL translation (e.g. an ambiguous pronoun)"""
+    try:
+        return str(drs.fol())
+    except Exception:
+        return None
+
+
+class ReadingRequestHandler(BaseHTTPRequestHandler):
+    server_version = "RuLAM"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/health":
+            service = self.server.service
+            self.send_json(200, {
+                "status": "ok", "workers": service.workers,
+                "queue_size": service.queue_size, "pending": service.pending,
+            })
+        elif self.path == "/metrics" and self.server.metrics is not None:
+            self.send_body(200, self.server.metrics.render().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/parse":
+            self.send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 < length <= self.server.max_request_size:
+            self.send_json(413 if length > 0 else 411, {"error": "Bad or missing Content-Length"})
+            return
+        try:
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError as e:
+            self.send_json(400, {"error": "Invalid JSON: %s" % e})
+            return
+
+        try:
+            future = self.server.service.submit(request)
+        except ServiceBusy:
+            self.send_json(503, {"error": "The service is busy"}, {"Retry-After": "1"})
+            return
+        try:
+            response = future.result(self.server.request_timeout)
+        except (FutureTimeoutError, DocumentTimeout):
+            # a document still waiting for a worker is dropped, a running one stops at its deadline
+            future.cancel()
+            self.send_json(504, {"error": "The document took too long"})
+        except BadRequest as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.send_json(422, {"error": "%s: %s" % (type(e).__name__, e)})
+        else:
+            self.send_json(200, response)
+
+    def send_json(self, status: int, body: tp.Any, headers: tp.Mapping[str, str] = {}):
+        self.send_body(status, json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json", headers)
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: tp.Mapping[str, str] = {}):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type + ("; charset=utf-8" if "charset" not in content_type else ""))
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class ReadingServer(ThreadingHTTPServer):
+    """HTTP server of a ``ReadingService``, every connection is handled by its own thread"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tp.Tuple[str, int],
+        service: ReadingService,
+        request_timeout: tp.Optional[float] = None,
+        max_request_size: int = 1 << 20,
+        metrics: tp.Optional[instrumentation.PrometheusSink] = None,
+        quiet: bool = False,
+    ):
+        """
+        :param request_timeout: seconds to wait for a document before answering ``504``;
+            the worker only stops reading it at the ``timeout`` of the service
+        :param max_request_size: bytes of a request body at most
+        :param metrics: sink served on ``/metrics``, it has to be added with ``instrumentation.add_sink``
+        """
+        super().__init__(address, ReadingRequestHandler)
+        self.service = service
+        self.request_timeout = request_timeout
+        self.max_request_size = max_request_size
+        self.metrics = metrics
+        self.quiet = quiet
+
+
+def main(argv: tp.Optional[tp.List[str]] = None):
+    argparser = argparse.ArgumentParser(
+        prog="python -m rulam.serve", description="HTTP/JSON service building the DRS of documents"
+    )
+    argparser.add_argument("--host", default="127.0.0.1")
+    argparser.add_argument("--port", type=int, default=8080)
+    argparser.add_argument("-j", "--workers", type=int, default=4, help="documents read at once")
+    argparser.add_argument(
+        "--queue-size", type=int, default=16, help="documents waiting for a worker, the rest get 503"
+    )
+    argparser.add_argument("--timeout", type=float, default=None, help="seconds before answering 504")
+    argparser.add_argument("--max-threads", type=int, default=DEFAULT_MAX_THREADS)
+    argparser.add_argument(
+        "--max-steps", type=int, default=DEFAULT_MAX_STEPS, help="readings tried for the threads of a document"
+    )
+    parsers = argparser.add_mutually_exclusive_group()
+    parsers.add_argument("--model", help="local UDPipe model, the web service is used if omitted")
+    parsers.add_argument("--recorded", help="CoNLL-U file of recorded parses to replay instead of UDPipe")
+    argparser.add_argument("--semtype-file", help="glue semtype file instead of the default grammar")
+    argparser.add_argument("--metrics", action="store_true", help="serve stage metrics on /metrics")
+    argparser.add_argument("--quiet", action="store_true", help="don't log every request")
+    args = argparser.parse_args(argv)
+
+    if args.model:
+        depparser = LocalUDPipeDependencyParser(args.model)
+    elif args.recorded:
+        depparser = StaticDependencyParser.from_conllu_file(args.recorded)
+    else:
+        depparser = None
+    metrics = None
+    if args.metrics:
+        metrics = instrumentation.PrometheusSink()
+        instrumentation.add_sink(metrics)
+
+    service = ReadingService(
+        depparser, args.semtype_file, args.workers, args.queue_size, args.max_threads, args.max_steps, args.timeout
+    )
+    server = ReadingServer((args.host, args.port), service, args.timeout, metrics=metrics, quiet=args.quiet)
+    print("Serving on http://%s:%s" % server.server_address[:2], file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
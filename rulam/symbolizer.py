@@ -1,34 +1,120 @@
-from transliterate import translit
-import re
+import typing as tp
+from functools import lru_cache
+from types import MappingProxyType
 
 
 class CannotProcessFeatureException(Exception):
     pass
 
 
+DEFAULT_SYMBOL_CACHE_SIZE = 65536
+DEFAULT_FEATURES_CACHE_SIZE = 4096
+
+
+class _SymbolTable(dict):
+    """
+    ``str.translate`` table: Cyrillic letters are transliterated, Latin lowercase
+    letters are kept, and everything else is dropped
+    """
+
+    def __missing__(self, code):
+        return None
+
+
+_symbol_table = None
+
+
+def _get_symbol_table() -> _SymbolTable:
+    global _symbol_table
+    if _symbol_table is None:
+        # every transliteration rule of the 'ru' pack maps a single Cyrillic letter,
+        # so applying them letter by letter is the same as transliterating the word
+        from transliterate import translit
+
+        table = _SymbolTable()
+        for code in range(0x0400, 0x0530):
+            table[code] = "".join(
+                c for c in translit(chr(code), "ru", reversed=True) if "a" <= c <= "z"
+            )
+        for code in range(ord("a"), ord("z") + 1):
+            table[code] = chr(code)
+        _symbol_table = table
+    return _symbol_table
+
+
+def _lemma_to_symbol(lemma: str) -> str:
+    return lemma.translate(_get_symbol_table())
+
+
+def _parse_features(feats: str) -> tp.Mapping[str, str]:
+    return MappingProxyType(
+        dict(feat.split("=", 1) for feat in feats.split("|") if "=" in feat)
+    )
+
+
+_cached_lemma_to_symbol = lru_cache(DEFAULT_SYMBOL_CACHE_SIZE)(_lemma_to_symbol)
+_cached_parse_features = lru_cache(DEFAULT_FEATURES_CACHE_SIZE)(_parse_features)
+
+
+def lemma_to_symbol(lemma: str) -> str:
+    """Predicate symbol for the lemma: 'заяц' -> 'zajats'"""
+    return _cached_lemma_to_symbol(lemma)
+
+
+def parse_features(feats: str) -> tp.Mapping[str, str]:
+    """Read-only dict of the CoNLL-U FEATS field: 'Case=Nom|Gender=Masc'"""
+    return _cached_parse_features(feats)
+
+
+def configure_symbolizer_caches(
+    symbol_cache_size: tp.Optional[int] = DEFAULT_SYMBOL_CACHE_SIZE,
+    features_cache_size: tp.Optional[int] = DEFAULT_FEATURES_CACHE_SIZE,
+):
+    """
+    Resize (and empty) the caches, ``None`` lets a cache grow without limit
+    """
+    global _cached_lemma_to_symbol, _cached_parse_features
+    _cached_lemma_to_symbol = lru_cache(symbol_cache_size)(_lemma_to_symbol)
+    _cached_parse_features = lru_cache(features_cache_size)(_parse_features)
+
+
+def symbolizer_cache_stats() -> tp.Dict[str, tp.Dict[str, tp.Any]]:
+    stats = {}
+    for name, cached in [
+        ("symbols", _cached_lemma_to_symbol), ("features", _cached_parse_features)
+    ]:
+        info = cached.cache_info()
+        requests = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": info.hits / requests if requests else 0.0,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+        }
+    return stats
+
+
 class SimplestSymbolizer:
     def __init__(self, node):
         self.node = node
         self.features = None
-    
+
     def symb(self):
-        result = translit(self.node["lemma"], "ru", reversed=True)
-        # TODO(sfedia): ???
-        result = re.sub('[^a-z]', '', result)
-        return result
-    
+        return lemma_to_symbol(self.node["lemma"])
+
     def symbolize_feature(self, feature_name):
         if self.features is None:
             self.features = self._process_features()
 
         if feature_name == "Gender":
             return self._gender_symbolize()
-        
+
         raise CannotProcessFeatureException
-    
+
     def _process_features(self):
-        return dict(feat.split("=") for feat in self.node["feats"].split("|"))
-    
+        return parse_features(self.node["feats"])
+
     def _gender_symbolize(self):
         if self.features["Gender"] == "Masc":
             return "MALE"
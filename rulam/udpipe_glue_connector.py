@@ -1,8 +1,89 @@
 import nltk
 from .glue_reading import RuLamGlueReadingCommand
+from .discourse import DEFAULT_MAX_THREADS, iter_threads
+from .instrumentation import stage
 
 
-def make_discourse_tester(sentences) -> nltk.DiscourseTester:
-    rc = RuLamGlueReadingCommand()
-    dt = nltk.DiscourseTester(sentences, rc)
+class RuLamDiscourseTester(nltk.DiscourseTester):
+    def __init__(
+        self, input, reading_command=None, background=None, max_threads=DEFAULT_MAX_THREADS, model_builder=None
+    ):
+        """
+        :param max_threads: how many threads are kept, all of them if ``None``
+        :param model_builder: whether a list of FOL formulas has a model, Mace4 as in
+            ``nltk.DiscourseTester`` if ``None``
+        """
+        super().__init__(input, reading_command, background)
+        self.max_threads = max_threads
+        self._model_builder = model_builder if model_builder is not None else _mace_model_found
+
+    def _construct_readings(self):
+        """
+        Same as ``nltk.DiscourseTester._construct_readings``, but the whole
+        discourse is dependency parsed in a single batch.
+        """
+        self._readings = {}
+        batch_readings = self._reading_command.parse_sents_to_readings(self._input)
+        # self._sentences are indexed by the position of a sentence in self._input
+        for index, readings in enumerate(batch_readings):
+            sid = "s%s" % index
+            self._readings[sid] = {
+                f"{sid}-r{rid}": reading.simplify()
+                for rid, reading in enumerate(sorted(readings, key=str))
+            }
+
+    def iter_threads(self, max_threads=None, is_consistent=None, max_steps=None):
+        """
+        Lazily built threads of the discourse, see ``rulam.discourse.iter_threads``
+        """
+        # in the order of the discourse, not of the ids as strings ('s10' < 's2')
+        return iter_threads(
+            [self._readings[sid] for sid in sorted(self._readings, key=lambda sid: int(sid[1:]))],
+            max_threads,
+            is_consistent,
+            max_steps=max_steps,
+        )
+
+    def is_consistent(self, drs) -> bool:
+        """
+        Whether the DRS has a model together with the background assumptions.
+        A DRS without a FOL translation (e.g. with an ambiguous pronoun) can't be
+        checked and is taken as consistent.
+        """
+        try:
+            assumption = self._reading_command.to_fol(drs)
+        except Exception:
+            return True
+        return self._model_builder([assumption] + list(self._background))
+
+    def _construct_threads(self):
+        """
+        Same as ``nltk.DiscourseTester._construct_threads``, but the threads are
+        built one at a time, those whose anaphora can't be resolved (over the
+        whole thread, as ``combine_readings`` does) are skipped, and at most
+        ``self.max_threads`` are kept. The model builder is run while the threads
+        are built, so a prefix without a model is never extended: ``self._threads``
+        only has the consistent threads and is the same as ``self._filtered_threads``.
+        """
+        with stage("threads") as counts:
+            self._threads = {
+                "d%s" % tid: list(thread.reading_ids)
+                for tid, thread in enumerate(self.iter_threads(self.max_threads, self.is_consistent))
+            }
+            if counts is not None:
+                counts["threads"] = len(self._threads)
+        # every thread has already been checked by the model builder
+        self._filtered_threads = dict(self._threads)
+
+
+def _mace_model_found(assumptions) -> bool:
+    # if Mace4 finds a model, it always seems to find it quickly
+    return nltk.MaceCommand(None, assumptions, max_models=20).build_model()
+
+
+def make_discourse_tester(
+    sentences, depparser=None, max_threads=DEFAULT_MAX_THREADS, model_builder=None
+) -> nltk.DiscourseTester:
+    rc = RuLamGlueReadingCommand(depparser=depparser)
+    dt = RuLamDiscourseTester(sentences, rc, max_threads=max_threads, model_builder=model_builder)
     return dt
@@ -1,11 +1,17 @@
-import requests
+import random
+import threading
+import time
 import typing as tp
 import re
+from .conllu_cache import get_default_cache, make_key
+from .instrumentation import stage
 
 """
 Simple but slow web-interaction to UDPipe REST API
 UDPipe REST API Reference: https://lindat.mff.cuni.cz/services/udpipe/api-reference.php
 CoNLL-U Format: http://universaldependencies.org/docs/format.html
+``requests`` is imported with the first client, so that the CoNLL-U helpers
+(``postprocess_conllu`` etc.) don't pay for it.
 """
 
 class WebUDPipeProcessorError(Exception):
@@ -13,12 +19,108 @@ class WebUDPipeProcessorError(Exception):
 
 
 REST_API_URL = "http://lindat.mff.cuni.cz/services/udpipe/api/process"
+MODEL = "russian"
+PRESEGMENTED_TOKENIZER = "presegmented"
+# cache options of a single sentence parsed as a part of a presegmented batch
+SENTENCE_CACHE_OPTIONS = "tokenizer=%s;sentence" % PRESEGMENTED_TOKENIZER
 
 
-def request_udpipe_processing(text: str) -> tp.Dict[str, tp.Any]:
-    req = requests.post(REST_API_URL, data = {
-        "model": "russian",
-        "tokenizer": 1,
+# responses worth another attempt: rate limiting and temporary server failures
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class WebUDPipeClient:
+    """
+    Keep-alive connection pool to the UDPipe REST API with timeouts, retries
+    and a cap on the number of simultaneous requests
+    """
+
+    def __init__(
+        self,
+        url: str = REST_API_URL,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 10.0,
+        max_concurrency: int = 4,
+    ):
+        """
+        :param retries: how many times a failed request is repeated
+        :param backoff_factor: the n-th retry waits for a random time up to
+            ``backoff_factor * 2 ** n`` seconds (but no longer than ``max_backoff``)
+        :param max_concurrency: how many requests may be in flight at once,
+            the rest of them wait for a free connection
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    def post(self, data: tp.Dict[str, tp.Any]) -> "requests.Response":
+        import requests
+
+        attempt = 0
+        while True:
+            try:
+                with self._slots:
+                    response = self.session.post(self.url, data=data, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.retries:
+                    raise
+            time.sleep(self.backoff(attempt))
+            attempt += 1
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> WebUDPipeClient:
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = WebUDPipeClient()
+        return _default_client
+
+
+def set_default_client(client: tp.Optional[WebUDPipeClient]):
+    """
+    Replace the client used when none is passed explicitly,
+    ``None`` makes a new one with the default settings on the next request
+    """
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
+
+
+def request_udpipe_processing(
+    text: str, tokenizer: tp.Any = 1, client: tp.Optional[WebUDPipeClient] = None
+) -> tp.Dict[str, tp.Any]:
+    import requests
+
+    if client is None:
+        client = get_default_client()
+    req = client.post({
+        "model": MODEL,
+        "tokenizer": tokenizer,
         "tagger": 1,
         "parser": 1,
         "data": text
@@ -30,16 +132,101 @@ def request_udpipe_processing(text: str) -> tp.Dict[str, tp.Any]:
     return result
 
 
-def web_udpipe_process_text_conllu(text: str) -> str:
-    try:
-        json_result = request_udpipe_processing(text)
-    except requests.exceptions.ConnectionError:
-        raise WebUDPipeProcessorError("Failed to establish connection to the server.")
+def web_udpipe_process_text_conllu(
+    text: str, tokenizer: tp.Any = 1, client: tp.Optional[WebUDPipeClient] = None, cache: bool = True
+) -> str:
+    """
+    :param cache: look the text up in the default cache and store it there; texts
+        that won't be seen again (e.g. chunks of a stream) are better not cached
+    """
+    if client is None:
+        client = get_default_client()
+
+    cache = get_default_cache() if cache else None
+    if cache is None:
+        return _web_udpipe_process_text_conllu(text, tokenizer, client)
+
+    key = make_key(text, f"{client.url}#{MODEL}", f"tokenizer={tokenizer}")
+    return cache.get_or_compute(
+        key, lambda: _web_udpipe_process_text_conllu(text, tokenizer, client)
+    )
+
+
+def _web_udpipe_process_text_conllu(
+    text: str, tokenizer: tp.Any, client: WebUDPipeClient
+) -> str:
+    import requests
+
+    with stage("udpipe_request") as counts:
+        if counts is not None:
+            counts["characters"] = len(text)
+        try:
+            json_result = request_udpipe_processing(text, tokenizer, client)
+        except requests.exceptions.ConnectionError:
+            raise WebUDPipeProcessorError("Failed to establish connection to the server.")
+        except requests.exceptions.Timeout:
+            raise WebUDPipeProcessorError("Server has not responded in time.")
 
     if "result" not in json_result:
         raise WebUDPipeProcessorError("Server has produced invalid JSON value.")
     text_with_comments = json_result["result"]
 
+    return strip_conllu_comments(text_with_comments)
+
+
+def web_udpipe_process_sentences_conllu(
+    sentences: tp.List[str], client: tp.Optional[WebUDPipeClient] = None
+) -> tp.List[str]:
+    """
+    Parse all the sentences with a single request, one CoNLL-U sentence per input sentence.
+    Every sentence is cached on its own, only the ones not seen before are sent.
+    """
+    if client is None:
+        client = get_default_client()
+    try:
+        join_presegmented_sentences(sentences)
+    except ValueError as e:
+        raise WebUDPipeProcessorError(str(e))
+
+    cache = get_default_cache()
+    if cache is None:
+        return _web_udpipe_process_sentences_conllu(sentences, client)
+    keys = [make_key(sentence, f"{client.url}#{MODEL}", SENTENCE_CACHE_OPTIONS) for sentence in sentences]
+
+    def parse_missing(missing):
+        return _web_udpipe_process_sentences_conllu([sentences[index] for index in missing], client)
+
+    return cache.get_or_compute_many(keys, parse_missing)
+
+
+def _web_udpipe_process_sentences_conllu(sentences: tp.List[str], client: WebUDPipeClient) -> tp.List[str]:
+    text = join_presegmented_sentences(sentences)
+    conllu = _web_udpipe_process_text_conllu(text, PRESEGMENTED_TOKENIZER, client)
+    conllu_sentences = split_conllu_sentences(conllu)
+    if len(conllu_sentences) != len(sentences):
+        raise WebUDPipeProcessorError(
+            f"Server has produced {len(conllu_sentences)} sentences instead of {len(sentences)}."
+        )
+    return conllu_sentences
+
+
+def join_presegmented_sentences(sentences: tp.List[str]) -> str:
+    """
+    UDPipe treats every line of the presegmented input as a separate sentence
+    """
+    lines = [" ".join(sentence.split()) for sentence in sentences]
+    if not all(lines):
+        raise ValueError("Empty value")
+    return "\n".join(lines)
+
+
+def split_conllu_sentences(conllu: str) -> tp.List[str]:
+    return [
+        sentence.strip("\n") for sentence in re.split(r"\n\s*\n", conllu) if sentence.strip()
+    ]
+
+
+def strip_conllu_comments(text_with_comments: str) -> str:
     return "\n".join(
         line for line in text_with_comments.splitlines() if not line.startswith("#")
     )
@@ -48,10 +235,12 @@ def web_udpipe_process_text_conllu(text: str) -> str:
 # TODO: type description should be more obvious
 DictParsedConllu = tp.List[tp.Dict[str, str]]
 
+CONLLU_FIELDS = "ID FORM LEMMA UPOSTAG XPOSTAG FEATS HEAD DEPREL DEPS MISC".split()
+
 
 # TODO: list and dict comprehensions are unreadable
 def postprocess_conllu(conllu: str) -> DictParsedConllu:
-    fields = "ID FORM LEMMA UPOSTAG XPOSTAG FEATS HEAD DEPREL DEPS MISC".split()
+    fields = CONLLU_FIELDS
     sentences = [[]]
     for line in conllu.splitlines():
         if line == "":
@@ -0,0 +1,30 @@
+import pytest
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from rulam.dependency_parser import StaticDependencyParser
+
+
+# recorded UDPipe output of the sentences of the offline tests
+CONLLU = {
+    "Заяц бежит": "1\tЗаяц\tзаяц\tNOUN\t_\tAnimacy=Anim|Case=Nom|Gender=Masc|Number=Sing\t2\tnsubj\t_\t_\n"
+                  "2\tбежит\tбежать\tVERB\t_\tAspect=Imp|Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin|Voice=Act\t0\troot\t_\t_\n\n",
+    "Он серый": "1\tОн\tон\tPRON\t_\tCase=Nom|Gender=Masc|Number=Sing|Person=3\t2\tnsubj\t_\t_\n"
+                "2\tсерый\tсерый\tADJ\t_\tCase=Nom|Degree=Pos|Gender=Masc|Number=Sing\t0\troot\t_\t_\n\n",
+}
+
+
+@pytest.fixture
+def conllu_by_text():
+    """CoNLL-U of every recorded sentence by its text, ending with an empty line"""
+    return dict(CONLLU)
+
+
+@pytest.fixture
+def depparser(conllu_by_text):
+    """Parser of the recorded sentences, every line of a text is a sentence"""
+    return StaticDependencyParser(conllu_by_text)
@@ -0,0 +1,52 @@
+import pytest
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from nltk.sem.drt import DrtExpression
+from rulam.anaphora_resolution import AnaphoraResolutionException, resolve_anaphora
+
+
+@pytest.mark.parametrize(
+    "drs, resolved",
+    [
+        ("([x,y],[man(x), PRO(y)])", "([x,y],[man(x), (y = x)])"),
+        ("([x],[man(x), -([y],[PRO(y), walk(y)])])", "([x],[man(x), -([y],[(y = x), walk(y)])])"),
+        ("(([x],[man(x)]) + ([y],[PRO(y)]))", "(([x],[man(x)]) + ([y],[(y = x)]))"),
+        (
+            "([x],[man(x), (([y],[dog(y)]) -> ([z],[PRO(z), bite(z,y)]))])",
+            "([x],[man(x), (([y],[dog(y)]) -> ([z],[(z = [x,y]), bite(z,y)]))])",
+        ),
+        (
+            "(([x],[man(x)]) + ([y],[PRO(y)]) + ([z],[PRO(z)]))",
+            "(([x],[man(x)]) + ([y],[(y = [x,z,x])]) + ([z],[(z = [x,y])]))",
+        ),
+        ("([x,y],[MALE(x), FEMALE(y), PRO(z)])", "([x,y],[MALE(x), FEMALE(y), (z = [x,y])])"),
+    ]
+)
+def test_resolve_anaphora(drs, resolved):
+    assert str(resolve_anaphora(DrtExpression.fromstring(drs))) == resolved
+
+
+@pytest.mark.parametrize("drs", ["([x],[PRO(x)])", "\\P.([x],[PRO(x), P(x)])", "([x,e],[man(x), PRO(e)])"])
+def test_resolve_anaphora_without_antecedents(drs):
+    with pytest.raises(AnaphoraResolutionException):
+        resolve_anaphora(DrtExpression.fromstring(drs))
+
+
+def test_resolve_anaphora_matching_gender():
+    drs = DrtExpression.fromstring("([x,y,z],[MALE(x), FEMALE(y), PRO(z), FEMALE(z)])")
+    assert str(resolve_anaphora(drs, match_gender=True)) == "([x,y,z],[MALE(x), FEMALE(y), (z = y), FEMALE(z)])"
+
+
+def test_resolve_anaphora_deep_concatenation():
+    drs = DrtExpression.fromstring("([x],[man(x)])")
+    for i in range(sys.getrecursionlimit()):
+        drs = drs + DrtExpression.fromstring("([y%s],[walk(y%s)])" % (i, i))
+    drs = drs + DrtExpression.fromstring("([z],[PRO(z)])")
+    assert str(resolve_anaphora(drs).second) == "([z],[(z = [x,%s])])" % ",".join(
+        "y%s" % i for i in range(sys.getrecursionlimit())
+    )
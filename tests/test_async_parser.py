@@ -0,0 +1,98 @@
+import asyncio
+import re
+import threading
+import time
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from rulam import async_parser
+from rulam.dependency_parser import StaticDependencyParser
+
+
+class SlowDependencyParser(StaticDependencyParser):
+    def __init__(self, conllu_by_text, delays):
+        super().__init__(conllu_by_text)
+        self.delays = delays
+        self.lock = threading.Lock()
+        self.in_flight = self.max_in_flight = 0
+
+    def process_text_conllu(self, text):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delays.get(text, 0))
+        with self.lock:
+            self.in_flight -= 1
+        return super().process_text_conllu(text)
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_fetch_conllu_is_bounded(conllu_by_text):
+    depparser = SlowDependencyParser(conllu_by_text, {"Заяц бежит": 0.05})
+    documents = [["Заяц бежит"]] * 6
+    results = asyncio.run(collect(async_parser.fetch_conllu(documents, depparser, concurrency=2)))
+    assert sorted(index for index, _ in results) == list(range(6))
+    assert depparser.max_in_flight == 2
+
+
+def test_iter_readings_yields_as_completed(conllu_by_text):
+    depparser = SlowDependencyParser(conllu_by_text, {"Заяц бежит": 0.3})
+    documents = [["Заяц бежит", "Он серый"], ["Он серый"]]
+    results = asyncio.run(collect(async_parser.iter_readings(documents, depparser)))
+
+    assert [result.index for result in results] == [1, 0]
+    slow = results[1]
+    assert slow.error is None
+    assert [[str(r) for r in readings] for readings in slow.sentence_readings] == [
+        ["([x],[zajats(x), MALE(x), bezhat(x)])"],
+        ["([x],[PRO(x), seryj(x), MALE(x)])"],
+    ]
+    # the fresh referent name depends on how many have been generated before
+    [thread_reading] = slow.thread_readings
+    assert re.fullmatch(
+        r"\(\[x,(z\d+)\],\[zajats\(x\), MALE\(x\), bezhat\(x\), \(\1 = x\), seryj\(\1\), MALE\(\1\)\]\)",
+        str(thread_reading)
+    )
+
+
+def test_iter_readings_reports_errors(conllu_by_text):
+    documents = [["Неизвестное предложение"]]
+    results = asyncio.run(collect(async_parser.iter_readings(documents, SlowDependencyParser(conllu_by_text, {}))))
+    assert isinstance(results[0].error, KeyError)
+
+
+def test_iter_readings_bounds_the_threads(depparser):
+    documents = [["Заяц бежит", "Он серый"]]
+    [result] = asyncio.run(collect(async_parser.iter_readings(documents, depparser, max_threads=0)))
+    assert result.error is None
+    assert len(result.sentence_readings) == 2
+    assert result.thread_readings == []
+
+
+def test_documents_are_taken_in_a_window(conllu_by_text):
+    depparser = SlowDependencyParser(conllu_by_text, {"Заяц бежит": 0.01})
+    taken = []
+
+    def documents():
+        for index in range(8):
+            taken.append(index)
+            yield ["Заяц бежит"]
+
+    async def pending_counts():
+        counts = []
+        async for _ in async_parser.fetch_conllu(documents(), depparser, concurrency=2, max_pending=3):
+            counts.append(len(taken) - len(counts))
+        return counts
+
+    counts = asyncio.run(pending_counts())
+    assert len(counts) == 8
+    # the document just yielded was one of the 3 pending ones
+    assert max(counts) == 3
+    assert depparser.max_in_flight == 2
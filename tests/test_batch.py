@@ -0,0 +1,128 @@
+import io
+import json
+import re
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from rulam import batch
+from rulam.dependency_parser import StaticDependencyParser
+
+
+def rename_fresh_variables(drs):
+    return re.sub(r"\bz\d+\b", "z", drs)
+
+
+DOCUMENTS = [
+    batch.BatchDocument("a", sentences=["Заяц бежит", "Он серый"]),
+    batch.BatchDocument("b", text="Он серый"),
+    batch.BatchDocument("c", text="Заяц бежит"),
+]
+
+
+def test_read_documents():
+    jsonl = io.StringIO('{"id": "a", "sentences": ["Заяц бежит"]}\n\n{"text": "Он серый"}\n')
+    assert list(batch.read_jsonl_documents(jsonl)) == [
+        batch.BatchDocument("a", ["Заяц бежит"]), batch.BatchDocument(2, text="Он серый")
+    ]
+    text = io.StringIO("Заяц бежит\nОн серый\n\n\nЗаяц бежит\n")
+    assert list(batch.read_text_documents(text)) == [
+        batch.BatchDocument(0, text="Заяц бежит\nОн серый"), batch.BatchDocument(1, text="Заяц бежит")
+    ]
+
+
+def test_run_batch_keeps_input_order(depparser):
+    output = io.StringIO()
+    stats = batch.run_batch(DOCUMENTS, output, workers=2, depparser=depparser)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert [record["id"] for record in records] == ["a", "b", "c"]
+    assert [rename_fresh_variables(drs) for drs in records[0]["drs"]] == [
+        "([x,z],[zajats(x), MALE(x), bezhat(x), (z = x), seryj(z), MALE(z)])"
+    ]
+    assert records[0]["fol"] and records[0]["error"] is None
+    # the pronoun of the second document has no antecedent
+    assert records[1]["drs"] == [] and records[1]["error"] is None
+    assert records[2]["sentences"] == 1
+    assert (stats.documents, stats.sentences, stats.errors, stats.skipped) == (3, 4, 0, 0)
+    assert stats.documents_per_second > 0
+
+
+def test_run_batch_reports_errors(depparser):
+    output = io.StringIO()
+    documents = [batch.BatchDocument(0, sentences=["Кот спит"]), DOCUMENTS[2]]
+    stats = batch.run_batch(documents, output, workers=0, depparser=depparser)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records[0]["error"].startswith("KeyError") and records[1]["error"] is None
+    assert stats.errors == 1
+
+
+def test_resume(tmp_path, depparser):
+    path = str(tmp_path / "output.jsonl")
+    with open(path, "w", encoding="utf-8") as output:
+        batch.run_batch(DOCUMENTS[:1], output, workers=0, depparser=depparser)
+        # a crash in the middle of a line
+        output.write('{"id": "b", "sen')
+
+    finished = batch.read_finished_ids(path)
+    assert finished == {"a"}
+    with open(path, "a", encoding="utf-8") as output:
+        stats = batch.run_batch(
+            DOCUMENTS, output, workers=0, depparser=depparser, finished_ids=finished
+        )
+    assert (stats.documents, stats.skipped) == (2, 1)
+    with open(path, encoding="utf-8") as output:
+        assert [json.loads(line)["id"] for line in output] == ["a", "b", "c"]
+
+
+def test_run_batch_reads_the_input_in_windows(depparser):
+    read = []
+
+    def documents():
+        for index in range(7):
+            read.append(index)
+            yield batch.BatchDocument(index, text="Заяц бежит")
+
+    def progress(stats):
+        # the input is never more than max_pending documents ahead of the output
+        assert len(read) - stats.documents < 3
+
+    output = io.StringIO()
+    stats = batch.run_batch(
+        documents(), output, workers=2, depparser=depparser, progress=progress, max_pending=3
+    )
+    assert stats.documents == 7
+    assert [json.loads(line)["id"] for line in output.getvalue().splitlines()] == list(range(7))
+
+
+def test_workers_load_the_parser(conllu_by_text):
+    class LoadingDependencyParser(StaticDependencyParser):
+        loaded = 0
+
+        def load(self):
+            self.loaded += 1
+
+    depparser = LoadingDependencyParser(conllu_by_text)
+    batch.run_batch(DOCUMENTS[2:], io.StringIO(), workers=0, depparser=depparser)
+    assert depparser.loaded == 1
+
+
+def test_main_leaves_the_model_to_the_workers(tmp_path, conllu_by_text, monkeypatch):
+    class LocalDependencyParser(StaticDependencyParser):
+        model_paths = []
+
+        def __init__(self, model_path):
+            super().__init__(conllu_by_text)
+            self.model_paths.append(model_path)
+
+    monkeypatch.setattr(batch, "LocalUDPipeDependencyParser", LocalDependencyParser)
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("Заяц бежит\n", encoding="utf-8")
+    output = tmp_path / "readings.jsonl"
+    stats = batch.main([str(corpus), "-o", str(output), "--model", "model.udpipe", "--workers", "0"])
+    assert stats.documents == 1 and stats.errors == 0
+    # built once, by the initializer of the (only) worker
+    assert LocalDependencyParser.model_paths == ["model.udpipe"]
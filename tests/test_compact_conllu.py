@@ -0,0 +1,93 @@
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from itertools import chain
+
+import pytest
+from nltk.parse.dependencygraph import DependencyGraph
+
+from rulam.compact_conllu import CompactNode, CompactSentence
+from rulam.glue_reading import RuLamGlueReadingCommand
+
+
+SENTENCES = [
+    "1\tЗаяц\tзаяц\tNOUN\t_\tAnimacy=Anim|Case=Nom|Gender=Masc|Number=Sing\t2\tnsubj\t_\t_\n"
+    "2\tбежит\tбежать\tVERB\t_\tAspect=Imp|Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin|Voice=Act\t0\troot\t_\t_",
+    "1\tОн\tон\tPRON\t_\tCase=Nom|Gender=Masc|Number=Sing|Person=3\t2\tnsubj\t_\t_\n"
+    "2\tсерый\tсерый\tADJ\t_\tCase=Nom|Degree=Pos|Gender=Masc|Number=Sing\t0\troot\t_\t_",
+]
+
+# both objects of 'видит' go to the same 'obj' group; the multiword token is skipped
+BUSHY = (
+    "# text = Вчера кот видит мышь и сыр\n"
+    "1\tВчера\tвчера\tADV\t_\tDegree=Pos\t3\tadvmod\t_\t_\n"
+    "2\tкот\tкот\tNOUN\t_\tCase=Nom|Gender=Masc\t3\tnsubj\t_\t_\n"
+    "3\tвидит\tвидеть\tVERB\t_\tTense=Pres\t0\troot\t_\t_\n"
+    "4-5\tмышьи\t_\t_\t_\t_\t_\t_\t_\t_\n"
+    "4\tмышь\tмышь\tNOUN\t_\tCase=Acc|Gender=Fem\t3\tobj\t_\t_\n"
+    "5\tи\tи\tCCONJ\t_\t_\t6\tcc\t_\t_\n"
+    "6\tсыр\tсыр\tNOUN\t_\tCase=Acc|Gender=Masc\t3\tobj\t_\t_"
+)
+
+
+def _graph(conllu):
+    return DependencyGraph("\n".join(line for line in conllu.splitlines() if not line.startswith("#")))
+
+
+def test_nodes_match_dependency_graph():
+    sentence = CompactSentence.from_conllu(BUSHY)
+    graph = _graph(BUSHY)
+    assert len(sentence) == 6
+    for address in range(len(sentence) + 1):
+        node = sentence.nodes[address]
+        expected = graph.nodes[address]
+        for key in CompactNode.KEYS:
+            if key == "deps":
+                # DependencyGraph adds an empty 'ROOT' group while looking for the root
+                assert dict(node[key]) == {rel: deps for rel, deps in expected[key].items() if deps}
+            else:
+                assert node[key] == expected[key], (address, key)
+        assert list(node.dependents()) == list(chain.from_iterable(expected["deps"].values()))
+    assert sentence.root["word"] == "видит"
+    with pytest.raises(KeyError):
+        sentence.nodes[7]
+
+
+def test_strings_are_interned():
+    first, second = (CompactSentence.from_conllu(conllu) for conllu in SENTENCES)
+    assert first.upos[1] is CompactSentence.from_conllu(SENTENCES[0]).upos[1]
+    assert first.rels[0] is second.rels[0]
+    assert first.rels[1] is second.rels[1]
+
+
+def test_add_dependency():
+    sentence = CompactSentence.from_conllu(BUSHY)
+    graph = _graph(BUSHY)
+    sentence.add_dependency(6, "nsubj", 2)
+    graph.nodes[6]["deps"].setdefault("nsubj", []).append(2)
+    sentence.add_dependency(3, "obj", 5)
+    graph.nodes[3]["deps"].setdefault("obj", []).append(5)
+    for address in (3, 6):
+        assert list(sentence.dependents(address)) == list(
+            chain.from_iterable(graph.nodes[address]["deps"].values())
+        )
+
+
+def test_to_conllu():
+    assert CompactSentence.from_conllu(SENTENCES[1]).to_conllu() == SENTENCES[1]
+
+
+@pytest.mark.parametrize("conllu", SENTENCES)
+def test_same_glue_formulas_and_readings(conllu):
+    reading_command = RuLamGlueReadingCommand()
+    glue_dict = reading_command._glue.get_glue_dict()
+    sentence = CompactSentence.from_conllu(conllu)
+    assert [str(formula) for formula in glue_dict.to_glueformula_list(sentence)] == [
+        str(formula) for formula in glue_dict.to_glueformula_list(_graph(conllu))
+    ]
+    assert [str(reading.simplify()) for reading in reading_command.depgraph_to_readings(sentence)] == [
+        str(reading.simplify()) for reading in reading_command.depgraph_to_readings(_graph(conllu))
+    ]
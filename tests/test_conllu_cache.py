@@ -0,0 +1,103 @@
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from rulam.conllu_cache import ConlluCache, make_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_make_key_normalizes_whitespace():
+    assert make_key("Заяц  бежит ", "russian") == make_key("Заяц бежит", "russian")
+    assert make_key("Заяц\nбежит", "russian") != make_key("Заяц бежит", "russian")
+
+
+def test_make_key_depends_on_model_and_options():
+    assert make_key("Заяц бежит", "russian") != make_key("Заяц бежит", "russian-gsd")
+    assert make_key("Заяц бежит", "russian", "tokenizer=1") != make_key("Заяц бежит", "russian")
+
+
+def test_lru_eviction():
+    cache = ConlluCache(max_size=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats() == {"hits": 3, "misses": 1, "hit_rate": 0.75, "size": 2, "bytes": 2}
+
+
+def test_byte_bound():
+    cache = ConlluCache(max_bytes=10)
+    cache.set("a", "заяц")  # 8 bytes
+    cache.set("b", "12")
+    assert len(cache) == 2
+    cache.set("c", "3")
+    assert cache.get("a") is None and cache.get("b") == "12" and cache.get("c") == "3"
+    cache.set("d", "12345678901")
+    assert cache.get("d") is None and cache.stats()["bytes"] == 3
+
+
+def test_ttl():
+    clock = FakeClock()
+    cache = ConlluCache(ttl=10, clock=clock)
+    cache.set("a", "1")
+    clock.now += 5
+    assert cache.get("a") == "1"
+    clock.now += 10
+    assert cache.get("a") is None
+
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / "conllu.sqlite")
+    cache = ConlluCache(path=path)
+    cache.set("a", "1")
+    cache.close()
+
+    cache = ConlluCache(path=path)
+    assert cache.get("a") == "1"
+    assert cache.stats()["hits"] == 1
+
+
+def test_persistence_max_disk_size(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "conllu.sqlite")
+    cache = ConlluCache(max_size=1, path=path, max_disk_size=2, clock=clock)
+    for key in "abc":
+        clock.now += 1
+        cache.set(key, key)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+
+
+def test_get_or_compute():
+    cache = ConlluCache()
+    computed = []
+    for _ in range(3):
+        assert cache.get_or_compute("a", lambda: computed.append(1) or "1") == "1"
+    assert len(computed) == 1
+
+
+def test_get_or_compute_many():
+    cache = ConlluCache()
+    cache.set("b", "2")
+    computed = []
+
+    def compute(missing):
+        computed.append(missing)
+        return [str(index) for index in missing]
+
+    assert cache.get_or_compute_many(["a", "b", "c"], compute) == ["0", "2", "2"]
+    assert cache.get_or_compute_many(["c", "a"], compute) == ["2", "0"]
+    assert computed == [[0, 2]]
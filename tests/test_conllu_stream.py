@@ -0,0 +1,85 @@
+import io
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from rulam import conllu_cache, conllu_stream
+from rulam.dependency_parser import StaticDependencyParser, WebUDPipeDependencyParser
+
+
+class ParagraphDependencyParser(StaticDependencyParser):
+    """Every line of the text is a sentence, like in the presegmented mode of UDPipe"""
+
+    def __init__(self, conllu_by_text):
+        super().__init__(conllu_by_text)
+        self.parsed = []
+
+    def process_text_conllu(self, text):
+        self.parsed.append(text)
+        return "# newdoc\n" + super().process_text_conllu(text)
+
+
+def test_iter_text_chunks():
+    text = io.StringIO("Заяц бежит\nОн серый\n\nЗаяц бежит\n\n\nОн серый\n")
+    assert list(conllu_stream.iter_text_chunks(text, chunk_size=10)) == [
+        "Заяц бежит\nОн серый", "Заяц бежит", "Он серый"
+    ]
+    text.seek(0)
+    assert list(conllu_stream.iter_text_chunks(text)) == [
+        "Заяц бежит\nОн серый\n\nЗаяц бежит\n\n\nОн серый"
+    ]
+    assert list(conllu_stream.iter_text_chunks(["a" * 5] * 5, chunk_size=5)) == ["a" * 5 + "\n" + "a" * 5] * 2 + ["a" * 5]
+
+
+def test_iter_conllu_sentences(conllu_by_text):
+    hare, grey = conllu_by_text["Заяц бежит"].strip("\n"), conllu_by_text["Он серый"].strip("\n")
+    first_line, second_line = grey.split("\n")
+    chunks = ["# sent_id = 1\n" + hare + "\n\n\n# sent_id = 2\n" + first_line, second_line + "\n"]
+    assert list(conllu_stream.iter_conllu_sentences(chunks)) == [hare, grey]
+
+
+def test_iter_sentence_readings_is_lazy(conllu_by_text):
+    depparser = ParagraphDependencyParser(conllu_by_text)
+    lines = iter(["Заяц бежит\n", "\n", "Он серый\n", "\n", "Заяц бежит\n"])
+    readings = conllu_stream.iter_sentence_readings(lines, depparser, chunk_size=1)
+
+    first = next(readings)
+    assert first.index == 0 and first.error is None
+    assert [str(reading) for reading in first.readings] == ["([x],[zajats(x), MALE(x), bezhat(x)])"]
+    assert depparser.parsed == ["Заяц бежит"]
+
+    assert [str(reading) for reading in next(readings).readings] == ["([x],[PRO(x), seryj(x), MALE(x)])"]
+    assert [sentence.index for sentence in readings] == [2]
+    assert depparser.parsed == ["Заяц бежит", "Он серый", "Заяц бежит"]
+
+
+def test_iter_sentence_readings_reports_errors(conllu_by_text):
+    class BrokenDependencyParser(ParagraphDependencyParser):
+        def process_text_conllu(self, text):
+            return "1\tзаяц\tзаяц\tNOUN\t_\t_\t0\n\n" + super().process_text_conllu(text)
+
+    sentences = list(conllu_stream.iter_sentence_readings(["Он серый"], BrokenDependencyParser(conllu_by_text)))
+    assert [sentence.index for sentence in sentences] == [0, 1]
+    assert sentences[0].error is not None and sentences[0].readings == []
+    assert sentences[1].error is None
+
+
+def test_iter_conllu_chunks_bypasses_the_cache(mocker):
+    request = mocker.patch(
+        "rulam.web_udpipe_processor.request_udpipe_processing",
+        return_value={"result": "1\tЗаяц\n2\tбежит\n\n"}
+    )
+    default_cache = conllu_cache.get_default_cache()
+    conllu_cache.set_default_cache(conllu_cache.ConlluCache())
+    try:
+        chunks = ["Заяц бежит", "Заяц бежит"]
+        assert list(conllu_stream.iter_conllu_chunks(chunks, WebUDPipeDependencyParser())) == [
+            "1\tЗаяц\n2\tбежит\n"
+        ] * 2
+        assert request.call_count == 2
+        assert len(conllu_cache.get_default_cache()) == 0
+    finally:
+        conllu_cache.set_default_cache(default_cache)
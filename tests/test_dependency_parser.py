@@ -0,0 +1,47 @@
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import pytest
+
+from rulam.dependency_parser import StaticDependencyParser
+from rulam.glue_reading import RuLamGlueReadingCommand
+
+
+RECORDED = (
+    "# newdoc\n"
+    "# sent_id = 1\n"
+    "# text = Заяц бежит\n"
+    "1\tЗаяц\tзаяц\tNOUN\t_\tAnimacy=Anim|Case=Nom|Gender=Masc|Number=Sing\t2\tnsubj\t_\t_\n"
+    "2\tбежит\tбежать\tVERB\t_\tAspect=Imp|Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin|Voice=Act\t0\troot\t_\t_\n"
+    "\n"
+    "# sent_id = 2\n"
+    "# text = Он  серый\n"
+    "1\tОн\tон\tPRON\t_\tCase=Nom|Gender=Masc|Number=Sing|Person=3\t2\tnsubj\t_\t_\n"
+    "2\tсерый\tсерый\tADJ\t_\tCase=Nom|Degree=Pos|Gender=Masc|Number=Sing\t0\troot\t_\t_\n"
+    "\n"
+)
+
+
+def test_static_dependency_parser():
+    depparser = StaticDependencyParser.from_conllu(RECORDED)
+    assert sorted(depparser.conllu_by_text) == ["Заяц бежит", "Он серый"]
+    conllu = depparser.process_text_conllu("Заяц бежит\nОн серый")
+    assert "#" not in conllu
+    assert conllu.count("\n\n") == 2
+    assert depparser.process_sentences_conllu(["Он серый"]) == [depparser.conllu_by_text["Он серый"]]
+
+    reading_command = RuLamGlueReadingCommand(depparser=depparser)
+    assert [str(reading.simplify()) for reading in reading_command.parse_to_readings("Заяц бежит")] == [
+        "([x],[zajats(x), MALE(x), bezhat(x)])"
+    ]
+
+    with pytest.raises(KeyError):
+        depparser.process_text_conllu("Кот спит")
+
+
+def test_static_dependency_parser_needs_text_comments():
+    with pytest.raises(ValueError):
+        StaticDependencyParser.from_conllu(RECORDED.replace("# text = Заяц бежит\n", ""))
@@ -0,0 +1,239 @@
+import re
+import pytest
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from functools import reduce
+from operator import add
+from nltk.inference.tableau import TableauProver
+from nltk.sem import Expression
+from nltk.sem.drt import DRS, DrtExpression
+from rulam.anaphora_resolution import AnaphoraResolutionException
+from rulam.discourse import DiscourseSession, iter_threads
+from rulam.canonical import alpha_normal_key
+from rulam.glue_reading import RuLamGlueReadingCommand, merge_readings
+from rulam.udpipe_glue_connector import make_discourse_tester
+
+
+def rename_fresh_variables(drs):
+    """Fresh variables are numbered by a global counter, number them by their order"""
+    names = {}
+    return re.sub(r"z\d+", lambda m: names.setdefault(m.group(), "z'%s" % len(names)), str(drs))
+
+
+def drs_list(*drss):
+    return [DrtExpression.fromstring(drs) for drs in drss]
+
+
+def test_add_sentence(depparser):
+    session = DiscourseSession(depparser=depparser)
+    session.add_sentence("Заяц бежит")
+    threads = session.add_sentence("Он серый")
+    assert [thread.reading_ids for thread in threads] == [("s0-r0", "s1-r0")]
+    assert re.fullmatch(
+        r"\(\[x,(z\d+)\],\[zajats\(x\), MALE\(x\), bezhat\(x\), \(\1 = x\), seryj\(\1\), MALE\(\1\)\]\)",
+        str(threads[0].drs)
+    )
+
+
+@pytest.mark.parametrize(
+    "sentences",
+    [
+        [["([x],[man(x)])"], ["([y],[PRO(y), walk(y)])"]],
+        [["([x],[man(x)])"], ["([x],[dog(x), bite(x,y)])"], ["([z],[PRO(z), run(z)])"]],
+        [["([x],[man(x)])", "([x],[woman(x)])"], ["([y],[PRO(y)])", "([y],[dog(y), PRO(w)])"]],
+    ]
+)
+def test_same_as_combine_readings(sentences, depparser):
+    reading_command = RuLamGlueReadingCommand(depparser=depparser)
+    session = DiscourseSession(reading_command)
+    for readings in sentences:
+        session.add_readings(drs_list(*readings))
+
+    readings = [sorted(drs_list(*readings), key=str) for readings in sentences]
+    for thread in session.threads:
+        thread_readings = [
+            readings[sid][int(reading_id.split("-r")[1])]
+            for sid, reading_id in enumerate(thread.reading_ids)
+        ]
+        expected = reading_command.combine_readings(thread_readings)
+        assert rename_fresh_variables(thread.drs) == rename_fresh_variables(expected)
+
+
+@pytest.mark.parametrize(
+    "readings",
+    [
+        ["([x],[man(x)])", "([y],[PRO(y), walk(y)])"],
+        ["([x],[man(x)])", "([x],[dog(x), -([y],[bite(x,y)])])", "([y],[cat(y), see(x,y)])"],
+        ["([x],[man(x)])", "(\\P.([],[P(x)]))(\\y.([],[walk(y)]))"],
+        ["([x],[man(x)])", "([x],[dog(x)]) + ([y],[cat(y)])"],
+        # not a DRS or a DRS with a consequent: concatenated by reduce
+        ["([x],[man(x)])", "\\y.([],[walk(y)])"],
+        ["([x],[man(x)])", "(([y],[dog(y)]) -> ([],[bark(y)]))"],
+    ]
+)
+def test_merge_readings_same_as_reduce(readings):
+    merged = merge_readings(drs_list(*readings))
+    expected = reduce(add, drs_list(*readings)).simplify()
+    assert isinstance(merged, DRS) == isinstance(expected, DRS)
+    assert alpha_normal_key(merged) == alpha_normal_key(expected)
+
+
+def test_renames_clashing_referents():
+    session = DiscourseSession(RuLamGlueReadingCommand())
+    session.add_readings(drs_list("([x],[man(x)])"))
+    thread, = session.add_readings(drs_list("([x],[dog(x), PRO(y)])"))
+    first, second = thread.drs.refs
+    assert first.name == "x" and second.name != "x"
+    assert str(thread.drs.conds[1]) == "dog(%s)" % second
+    assert str(thread.drs.conds[2]) == "(y = [x,%s])" % second
+
+
+def test_unresolved_sentence_keeps_session():
+    session = DiscourseSession(RuLamGlueReadingCommand())
+    with pytest.raises(AnaphoraResolutionException):
+        session.add_readings(drs_list("([x],[PRO(x)])"))
+    assert session.threads == []
+
+    session.add_readings(drs_list("([x],[man(x)])", "([x],[PRO(x)])"))
+    assert [thread.reading_ids for thread in session.threads] == [("s0-r1",)]
+
+
+def readings_by_id(*sentences):
+    return [
+        {"s%s-r%s" % (sid, rid): reading for rid, reading in enumerate(drs_list(*readings))}
+        for sid, readings in enumerate(sentences)
+    ]
+
+
+def test_iter_threads_order_and_limit():
+    sentence_readings = readings_by_id(["([x],[man(x)])", "([x],[dog(x)])"], ["([y],[walk(y)])", "([y],[run(y)])"])
+    assert [thread.reading_ids for thread in iter_threads(sentence_readings)] == [
+        ("s0-r0", "s1-r0"), ("s0-r0", "s1-r1"), ("s0-r1", "s1-r0"), ("s0-r1", "s1-r1")
+    ]
+    assert [thread.reading_ids for thread in iter_threads(sentence_readings, max_threads=3)] == [
+        ("s0-r0", "s1-r0"), ("s0-r0", "s1-r1"), ("s0-r1", "s1-r0")
+    ]
+
+
+def test_iter_threads_prunes_inconsistent_prefixes():
+    checked = []
+
+    def is_consistent(drs):
+        checked.append(str(drs))
+        return "dog" not in str(drs)
+
+    sentence_readings = readings_by_id(
+        ["([x],[dog(x)])", "([x],[PRO(x)])", "([x],[man(x)])"],
+        *[["([y],[walk(y)])", "([y],[run(y)])"]] * 20
+    )
+    thread, = iter_threads(sentence_readings, max_threads=1, is_consistent=is_consistent)
+    # the pronoun refers to the referent of a later sentence
+    assert thread.reading_ids == ("s0-r1",) + tuple("s%s-r0" % sid for sid in range(1, 21))
+    # the inconsistent first reading is never extended: 20 prefixes and the whole thread are checked
+    assert checked[0] == "([x],[dog(x)])" and len(checked) == 22
+    assert "PRO" in str(thread.unresolved) and "PRO" not in str(thread.drs)
+
+
+def test_iter_threads_bounds_the_work():
+    # no thread resolves, 2 ** 30 of them would be tried without the bound
+    sentence_readings = readings_by_id(*[["([],[PRO(y)])", "([],[PRO(w)])"]] * 30)
+    assert list(iter_threads(sentence_readings, max_threads=1, max_steps=1000)) == []
+
+
+@pytest.mark.parametrize("sentences", [
+    [["([x],[man(x)])", "([x],[woman(x)])"], ["([y],[PRO(y)])", "([y],[dog(y), PRO(w)])"]],
+    [["([y],[PRO(y), walk(y)])"], ["([x],[man(x)])"]],
+])
+def test_iter_threads_same_as_combine_readings(sentences):
+    reading_command = RuLamGlueReadingCommand()
+    sentence_readings = readings_by_id(*sentences)
+    threads = list(iter_threads(sentence_readings))
+    for thread in threads:
+        readings = [sentence_readings[sid][reading_id] for sid, reading_id in enumerate(thread.reading_ids)]
+        expected = reading_command.combine_readings(readings)
+        assert alpha_normal_key(thread.drs) == alpha_normal_key(expected)
+    assert threads
+
+
+def test_iter_threads_is_lazy():
+    sentence_readings = readings_by_id(*[["([y],[walk(y)])", "([y],[run(y)])", "([y],[sit(y)])"]] * 20)
+    threads = iter_threads(sentence_readings)
+    assert len(next(threads).reading_ids) == 20
+    assert next(threads).reading_ids[-1] == "s19-r1"
+
+
+def tableau_model_builder(calls):
+    """Model builder without Mace4: a model exists unless the tableau prover finds a contradiction"""
+    def model_found(assumptions):
+        calls.append(assumptions)
+        return not TableauProver().prove(None, assumptions)
+    return model_found
+
+
+def test_discourse_tester_threads_allow_cataphora(depparser):
+    # the same threads as nltk.DiscourseTester, whose combine_readings resolves the whole thread
+    tester = make_discourse_tester(["Он серый", "Заяц бежит"], depparser, model_builder=tableau_model_builder([]))
+    tester._construct_readings()
+    tester._construct_threads()
+    assert tester._threads == {"d0": ["s0-r0", "s1-r0"]}
+    readings = [tester._readings["s0"]["s0-r0"], tester._readings["s1"]["s1-r0"]]
+    thread, = tester.iter_threads()
+    assert alpha_normal_key(tester._reading_command.combine_readings(readings)) == alpha_normal_key(thread.drs)
+
+
+def test_discourse_tester_threads(depparser):
+    calls = []
+    tester = make_discourse_tester(["Заяц бежит", "Он серый"], depparser, model_builder=tableau_model_builder(calls))
+    tester._construct_readings()
+    tester._construct_threads()
+    assert tester._threads == {"d0": ["s0-r0", "s1-r0"]}
+    assert tester._filtered_threads == tester._threads
+    # the prefix and the whole thread, each checked once
+    assert len(calls) == 2
+
+
+def test_discourse_tester_prunes_inconsistent_prefixes(depparser):
+    calls = []
+    tester = make_discourse_tester(
+        ["Заяц бежит", "Он серый", "Он серый"], depparser, model_builder=tableau_model_builder(calls)
+    )
+    tester._background = [Expression.fromstring("-exists x.zajats(x)")]
+    tester._construct_readings()
+    tester._construct_threads()
+    assert tester._threads == tester._filtered_threads == {}
+    # the first sentence contradicts the background and is never extended
+    assert len(calls) == 1
+
+
+def test_threads_share_their_beginning():
+    session = DiscourseSession(RuLamGlueReadingCommand())
+    first, = session.add_readings(drs_list("([x],[man(x)])"))
+    threads = session.add_readings(drs_list("([y],[dog(y), PRO(z)])", "([y],[cat(y)])"))
+    # a thread keeps the sentence it adds and the thread it extends, not a copy of it
+    assert [thread.previous for thread in threads] == [first, first]
+    assert [thread.reading_ids for thread in threads] == [("s0-r0", "s1-r0"), ("s0-r0", "s1-r1")]
+    assert [str(thread.sentence_drs) for thread in threads] == ["([y],[cat(y)])", "([y],[dog(y), (z = [x,y])])"]
+    assert str(threads[0].drs) == "([x,y],[man(x), cat(y)])"
+    assert [str(refex) for refex in threads[1].referents.refexes] == ["y"]
+    assert threads[1].referents.previous is first.referents
+
+
+def test_session_bounds_the_threads():
+    session = DiscourseSession(RuLamGlueReadingCommand(), max_threads=3)
+    for _ in range(4):
+        threads = session.add_readings(drs_list("([x],[man(x)])", "([x],[dog(x)])"))
+    assert [thread.reading_ids[-1] for thread in threads] == ["s3-r0", "s3-r1", "s3-r0"]
+    assert len(session.threads) == 3
+
+
+def test_gender_of_earlier_sentences():
+    session = DiscourseSession(RuLamGlueReadingCommand(), match_gender=True)
+    session.add_readings(drs_list("([x],[man(x), MALE(x)])"))
+    session.add_readings(drs_list("([y],[woman(y), FEMALE(y)])"))
+    thread, = session.add_readings(drs_list("([z],[PRO(z), MALE(z), walk(z)])"))
+    assert "(z = x)" in str(thread.drs)
@@ -0,0 +1,322 @@
+import os
+import pytest
+
+import sys
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from nltk.sem.drt import DrtExpression
+from rulam import drt_glue
+from rulam.canonical import alpha_normal_key, structural_key
+from rulam.drt_glue import DrtGlueFormula, DrtRuLamGlueDict, RuLamDrtGlue
+from rulam.glue import GlueIndices
+
+
+GRAMMAR = "VERB : (\\x.([],[<word>(x)]), (nsubj -o f)) : [nsubj]\n"
+
+
+@pytest.fixture
+def grammar_file(tmp_path):
+    path = tmp_path / "test.semtype"
+    path.write_text(GRAMMAR, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def compiled_grammars(tmp_path, monkeypatch):
+    """Pickles of the parsed grammars turned on, in a directory of the test"""
+    monkeypatch.setattr("rulam.glue._compiled_grammars_enabled", True)
+    monkeypatch.setattr("rulam.glue._compiled_grammars_dir", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+def test_load_is_shared(grammar_file):
+    glue_dict = DrtRuLamGlueDict.load(str(grammar_file))
+    assert DrtRuLamGlueDict.load(str(grammar_file)) is glue_dict
+    [(meaning, glue)] = glue_dict["VERB"][frozenset(["nsubj"])]
+    assert str(meaning) == "\\x.([],[<word>(x)])"
+    assert str(glue) == "(nsubj -o f)"
+
+
+def test_load_after_touch_keeps_instance(grammar_file):
+    glue_dict = DrtRuLamGlueDict.load(str(grammar_file))
+    stat = os.stat(grammar_file)
+    os.utime(grammar_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert DrtRuLamGlueDict.load(str(grammar_file)) is glue_dict
+
+
+def test_load_after_change_rereads_file(grammar_file):
+    glue_dict = DrtRuLamGlueDict.load(str(grammar_file))
+    stat = os.stat(grammar_file)
+    grammar_file.write_text(GRAMMAR + "NOUN : (\\x.([],[<word>(x)]), f)\n", encoding="utf-8")
+    os.utime(grammar_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    reloaded = DrtRuLamGlueDict.load(str(grammar_file))
+    assert reloaded is not glue_dict
+    assert set(reloaded) == {"VERB", "NOUN"}
+    assert set(glue_dict) == {"VERB"}
+
+
+def test_glue_dict_is_read_only(grammar_file):
+    glue_dict = DrtRuLamGlueDict.load(str(grammar_file))
+    with pytest.raises(TypeError):
+        glue_dict["NOUN"] = {}
+    with pytest.raises(TypeError):
+        glue_dict.clear()
+    with pytest.raises(TypeError):
+        glue_dict["VERB"][None] = ()
+
+
+def test_meaning_template_matches_string_substitution():
+    from nltk.sem import drt
+    from rulam.glue import MeaningTemplate
+    from rulam.symbolizer import SimplestSymbolizer
+
+    source = "\\Q.(([x],[<word>(x), <word::Gender>(x)])+Q(x))"
+    template = MeaningTemplate(source, drt.DrtExpression.fromstring, drt.DrtVariableExpression)
+    node_symbolizer = SimplestSymbolizer({"lemma": "заяц", "feats": "Case=Nom|Gender=Masc"})
+
+    assert template.instantiate("zajats", node_symbolizer) == drt.DrtExpression.fromstring(
+        "\\Q.(([x],[zajats(x), MALE(x)])+Q(x))"
+    )
+
+
+def test_meaning_template_needs_a_word_symbol():
+    from nltk.sem import drt
+    from nltk.sem.logic import LogicalExpressionException
+    from rulam.glue import MeaningTemplate
+    from rulam.symbolizer import SimplestSymbolizer
+
+    template = MeaningTemplate("\\x.([],[<word>(x)])", drt.DrtExpression.fromstring, drt.DrtVariableExpression)
+    with pytest.raises(LogicalExpressionException):
+        template.instantiate("", SimplestSymbolizer({"lemma": "...", "feats": "_"}))
+    # a term without the placeholder needs no symbol
+    template = MeaningTemplate("\\x.([],[PRO(x)])", drt.DrtExpression.fromstring, drt.DrtVariableExpression)
+    assert str(template.instantiate("", SimplestSymbolizer({"lemma": "...", "feats": "_"}))) == "\\x.([],[PRO(x)])"
+
+
+def test_empty_lemma_symbol_is_an_error():
+    from nltk.sem.logic import LogicalExpressionException
+    from rulam.compact_conllu import CompactSentence
+
+    conllu = (
+        "1\tЗаяц\tзаяц\tNOUN\t_\tGender=Masc\t2\tnsubj\t_\t_\n"
+        "2\t...\t...\tVERB\t_\t_\t0\troot\t_\t_\n"
+    )
+    glue_dict = DrtRuLamGlueDict.load("basic_rules.semtype")
+    with pytest.raises(LogicalExpressionException):
+        glue_dict.to_glueformula_list(CompactSentence.from_conllu(conllu))
+
+
+def test_glue_indices_is_a_set():
+    indices = GlueIndices([3, 1])
+    assert indices == {1, 3} and {1, 3} == indices
+    assert list(indices) == [1, 3] and len(indices) == 2 and 3 in indices and 2 not in indices
+    assert indices & GlueIndices([3]) == {3} and indices | {2} == {1, 2, 3}
+    assert {1} < indices and not indices.isdisjoint({3})
+    assert not GlueIndices() and GlueIndices.from_bits(0b1010) == {1, 3}
+
+
+def test_glue_formula():
+    formula = DrtGlueFormula("\\x.([],[walk(x)])", "(g -o f)", {2})
+    argument = DrtGlueFormula("([x],[man(x)])", "g", {1})
+    assert not hasattr(formula, "__dict__")
+    assert isinstance(formula.indices, GlueIndices)
+    assert str(formula) == "\\x.([],[walk(x)]) : (g -o f) : {2}"
+
+    applied = formula.applyto(argument)
+    assert applied.indices == {1, 2}
+    assert applied.meaning_key() == structural_key(applied.meaning, bound_variables=True)
+    assert DrtGlueFormula("\\y.([],[walk(y)])", "(g -o f)") == formula
+    assert DrtGlueFormula("\\y.([],[run(y)])", "(g -o f)") != formula
+
+
+def test_glue_formula_string_follows_the_indices():
+    formula = DrtGlueFormula("([x],[man(x)])", "g", {1})
+    assert str(formula) == "([x],[man(x)]) : g : {1}"
+    formula.indices = GlueIndices({1, 3})
+    assert str(formula) == "([x],[man(x)]) : g : {1, 3}"
+
+
+def test_glue_formulas_sort_by_their_keys():
+    formulas = [
+        DrtGlueFormula("\\x.([],[walk(x)])", "(g -o f)", {2}),
+        DrtGlueFormula("([x],[man(x)])", "g", {1}),
+        DrtGlueFormula("([x],[man(x)])", "g", {0}),
+        DrtGlueFormula("([y],[man(y)])", "h"),
+    ]
+    assert sorted(formulas) == sorted(reversed(formulas))
+    # alphabetic variants are ordered by their glue and indices
+    assert [str(formula) for formula in sorted(formulas[1:])] == [
+        "([x],[man(x)]) : g : {0}", "([x],[man(x)]) : g : {1}", "([y],[man(y)]) : h"
+    ]
+
+
+@pytest.mark.parametrize("first, second, variants", [
+    ("([x,z1],[zajats(x), (z1 = x), seryj(z1)])", "([z4,z5],[zajats(z4), (z5 = z4), seryj(z5)])", True),
+    ("([x,y],[zajats(x), (y = x), seryj(y)])", "([x,y],[zajats(y), (y = x), seryj(y)])", False),
+    ("([x],[P(x), -([y],[Q(y,x)])])", "([y],[P(y), -([x],[Q(x,y)])])", True),
+    ("([x],[P(x), -([y],[Q(y,x)])])", "([y],[P(y), -([x],[Q(y,x)])])", False),
+    ("\\x.([],[P(x)])", "\\y.([],[P(y)])", True),
+    ("([],[P(x)])", "([],[P(y)])", False),  # free variables keep their names
+])
+def test_alpha_normal_key(first, second, variants):
+    first, second = DrtExpression.fromstring(first), DrtExpression.fromstring(second)
+    assert (alpha_normal_key(first) == alpha_normal_key(second)) == variants
+
+
+def test_alphabetic_variants_are_one_reading(monkeypatch):
+    meanings = [
+        "([x,z1],[zajats(x), (z1 = x), seryj(z1)])",
+        "([x,z2],[zajats(x), (z2 = x), seryj(z2)])",
+        "([x,z1],[seryj(x), (z1 = x), zajats(z1)])",
+    ]
+    monkeypatch.setattr(
+        drt_glue, "prove", lambda agenda, stats=None: [DrtGlueFormula(meaning, "f") for meaning in meanings]
+    )
+    readings = RuLamDrtGlue().get_readings([])
+    assert [str(reading) for reading in readings] == [meanings[0], meanings[2]]
+
+
+def test_semtype_best_match(tmp_path):
+    path = tmp_path / "options.semtype"
+    path.write_text(
+        "VERB : (\\x.([],[<word>(x)]), (nsubj -o f)) : [nsubj]\n"
+        "VERB : (\\x.([],[<word>(x)]), (obl -o f)) : [nsubj, obl]\n"
+        "VERB : (\\x.([],[<word>(x)]), (obj -o f)) : [nsubj, obj]\n"
+        "VERB : (\\x.([],[<word>(x)]), f)\n"
+        "NOUN : (\\x.([],[<word>(x)]), f) : []\n",
+        encoding="utf-8",
+    )
+    glue_dict = DrtRuLamGlueDict.load(str(path))
+    verb, noun = glue_dict["VERB"], glue_dict["NOUN"]
+
+    def glue(lookup):
+        return [str(glue) for _, glue in lookup]
+
+    assert glue(verb.best_match(frozenset(["nsubj", "obj"]))) == ["(obj -o f)"]
+    assert glue(verb.best_match(frozenset(["nsubj", "obj", "advmod"]))) == ["(obj -o f)"]
+    # of the sets of the same size, the first one in the file
+    assert glue(verb.best_match(frozenset(["nsubj", "obj", "obl"]))) == ["(obl -o f)"]
+    assert glue(verb.best_match(frozenset(["nsubj", "advmod"]))) == ["(nsubj -o f)"]
+    assert glue(verb.best_match(frozenset(["advmod"]))) == ["f"]
+    assert glue(noun.best_match(frozenset())) == ["f"]
+    assert noun.best_match(frozenset(["case"])) is None
+    assert verb._best_matches[frozenset(["nsubj", "advmod"])] is verb[frozenset(["nsubj"])]
+
+
+def _nominal_chain(length):
+    # 'заяц зайца зайца ...': every noun is a nominal modifier of the previous one
+    lines = ["1\tбежит\tбежать\tVERB\t_\tTense=Pres\t0\troot\t_\t_"]
+    for address in range(2, length + 2):
+        head, rel = (1, "nsubj") if address == 2 else (address - 1, "nmod")
+        lines.append(
+            "%s\tзайца\tзаяц\tNOUN\t_\tCase=Gen|Gender=Masc|Number=Sing\t%s\t%s\t_\t_" % (address, head, rel)
+        )
+    return "\n".join(lines)
+
+
+def test_to_glueformula_list_keeps_the_order_of_the_recursive_walk():
+    from itertools import chain
+    from nltk.internals import Counter
+    from nltk.parse.dependencygraph import DependencyGraph
+
+    glue_dict = DrtRuLamGlueDict.load("basic_rules.semtype")
+    conllu = (
+        "1\tЗаяц\tзаяц\tNOUN\t_\tCase=Nom|Gender=Masc\t3\tnsubj\t_\t_\n"
+        "2\tочень\tочень\tADV\t_\tDegree=Pos\t3\tadvmod\t_\t_\n"
+        "3\tбежит\tбежать\tVERB\t_\tTense=Pres\t0\troot\t_\t_\n"
+        "4\tлисы\tлиса\tNOUN\t_\tCase=Gen|Gender=Fem\t1\tnmod\t_\t_\n"
+        "5\tволка\tволк\tNOUN\t_\tCase=Gen|Gender=Masc\t1\tnmod\t_\t_\n"
+        "6\tзайца\tзаяц\tNOUN\t_\tCase=Gen|Gender=Masc\t5\tnmod\t_\t_"
+    )
+
+    def recursive(depgraph, node, counter):
+        glueformulas = glue_dict.lookup(node, depgraph, counter)
+        for dep in chain.from_iterable(node["deps"].values()):
+            glueformulas.extend(recursive(depgraph, depgraph.nodes[dep], counter))
+        return glueformulas
+
+    depgraph = DependencyGraph(conllu)
+    expected = recursive(depgraph, depgraph.nodes[3], Counter())
+    assert [str(formula) for formula in glue_dict.to_glueformula_list(DependencyGraph(conllu))] == [
+        str(formula) for formula in expected
+    ]
+
+
+def test_to_glueformula_list_of_a_deep_tree():
+    from rulam.compact_conllu import CompactSentence
+
+    glue_dict = DrtRuLamGlueDict.load("basic_rules.semtype")
+    glueformulas = glue_dict.to_glueformula_list(CompactSentence.from_conllu(_nominal_chain(2000)))
+    assert len(glueformulas) == 2001
+    # labels stay unique past the 26th address
+    assert [str(glueformulas[i].glue) for i in (1, 25, 26)] == [
+        "((g -o G2) -o G2)", "((e1 -o E126) -o E126)", "((f1 -o F127) -o F127)"
+    ]
+
+
+class CountingGlueDict(DrtRuLamGlueDict):
+    compiled_meanings = 0
+
+    def compile_meaning(self, meaning):
+        CountingGlueDict.compiled_meanings += 1
+        return super().compile_meaning(meaning)
+
+
+def test_compiled_grammar_is_reused(grammar_file, compiled_grammars):
+    from rulam.glue import get_compiled_grammar_path
+
+    CountingGlueDict.compiled_meanings = 0
+    parsed = CountingGlueDict(str(grammar_file))
+    assert CountingGlueDict.compiled_meanings == 1
+    compiled_path = get_compiled_grammar_path(str(grammar_file), CountingGlueDict)
+    assert os.path.exists(compiled_path) and os.path.dirname(compiled_path) == str(compiled_grammars)
+
+    unpickled = CountingGlueDict(str(grammar_file))
+    assert CountingGlueDict.compiled_meanings == 1
+    [(meaning, glue)] = unpickled["VERB"][frozenset(["nsubj"])]
+    [(parsed_meaning, parsed_glue)] = parsed["VERB"][frozenset(["nsubj"])]
+    assert meaning.expression == parsed_meaning.expression and glue == parsed_glue
+
+    # a changed grammar is parsed again
+    grammar_file.write_text(GRAMMAR + "NOUN : (\\x.([],[<word>(x)]), f)\n", encoding="utf-8")
+    assert set(CountingGlueDict(str(grammar_file))) == {"VERB", "NOUN"}
+    assert CountingGlueDict.compiled_meanings == 3
+
+
+def test_broken_compiled_grammar_is_ignored(grammar_file, compiled_grammars):
+    from rulam.glue import get_compiled_grammar_path
+
+    compiled_grammars.mkdir()
+    with open(get_compiled_grammar_path(str(grammar_file), DrtRuLamGlueDict), "wb") as compiled_file:
+        compiled_file.write(b"not a pickle")
+    assert set(DrtRuLamGlueDict(str(grammar_file))) == {"VERB"}
+
+
+def test_grammars_are_not_compiled_by_default(grammar_file, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    CountingGlueDict.compiled_meanings = 0
+    CountingGlueDict(str(grammar_file))
+    CountingGlueDict(str(grammar_file))
+    assert CountingGlueDict.compiled_meanings == 2
+    assert os.listdir(tmp_path) == ["test.semtype"]
+
+
+def test_package_grammars_are_found_from_any_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert set(DrtRuLamGlueDict.load("basic_rules.semtype")) == {"NOUN", "PRON", "VERB", "ADJ"}
+
+
+def test_compiled_grammar_of_another_grammar_is_not_unpickled(grammar_file, compiled_grammars, monkeypatch):
+    from rulam.glue import get_compiled_grammar_path
+
+    DrtRuLamGlueDict(str(grammar_file))
+    with open(get_compiled_grammar_path(str(grammar_file), DrtRuLamGlueDict), "rb") as compiled_file:
+        header = compiled_file.readline()
+    assert header.startswith(b"rulam-compiled-grammar ") and b"sha256-" in header
+
+    grammar_file.write_text(GRAMMAR + "NOUN : (\\x.([],[<word>(x)]), f)\n", encoding="utf-8")
+    monkeypatch.setattr("rulam.glue.pickle.load", lambda _: pytest.fail("unpickled a stale grammar"))
+    assert set(DrtRuLamGlueDict(str(grammar_file))) == {"VERB", "NOUN"}
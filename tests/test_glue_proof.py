@@ -0,0 +1,52 @@
+import pytest
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from nltk.sem.glue import Glue, GlueFormula
+from rulam.drt_glue import DrtGlueFormula
+from rulam.glue_proof import prove
+
+
+QUANTIFIERS = [
+    (r"\P Q.all x.(P(x) -> Q(x))", "((gv -o gr) -o ((g -o G) -o G))"),
+    (r"\x.girl(x)", "(gv -o gr)"),
+    (r"\x y.chases(x,y)", "(g -o (h -o f))"),
+    (r"\P Q.exists x.(P(x) & Q(x))", "((hv -o hr) -o ((h -o H) -o H))"),
+    (r"\x.dog(x)", "(hv -o hr)"),
+]
+
+MODIFIERS = [
+    (r"\x.([],[zajats(x)])", "(gv -o gr)"),
+    (r"\P Q.(([x],[]) + P(x) + Q(x))", "((gv -o gr) -o ((g -o G) -o G))"),
+    (r"\x.([],[bezhat(x)])", "(g -o f)"),
+    (r"\P x.(([],[seryj(x)]) + P(x))", "((gv -o gr) -o (gv -o gr))"),
+    (r"\P x.(([],[bolshoj(x)]) + P(x))", "((gv -o gr) -o (gv -o gr))"),
+    (r"\P x.(([],[bystryj(x)]) + P(x))", "((gv -o gr) -o (gv -o gr))"),
+]
+
+
+def compile_agenda(premises, factory):
+    return Glue().gfl_to_compiled([factory(meaning, glue) for meaning, glue in premises])
+
+
+@pytest.mark.parametrize(
+    "premises, factory",
+    [(QUANTIFIERS, GlueFormula), (MODIFIERS, DrtGlueFormula), (MODIFIERS[:3], DrtGlueFormula)]
+)
+def test_same_readings_as_nltk(premises, factory):
+    expected = Glue().get_readings(compile_agenda(premises, factory))
+    readings = [formula.meaning for formula in prove(compile_agenda(premises, factory))]
+    assert [str(reading) for reading in readings] == [str(reading) for reading in expected]
+
+
+def test_duplicate_derivations_are_dropped():
+    premises = MODIFIERS[:3] + [MODIFIERS[3]] * 2
+    expected = Glue().get_readings(compile_agenda(premises, DrtGlueFormula))
+    readings = [formula.meaning for formula in prove(compile_agenda(premises, DrtGlueFormula))]
+    # the modifiers are applied in both orders, which only differ in the names of bound variables
+    assert len(expected) == 2 and expected[0] == expected[1]
+    assert [str(reading) for reading in readings] == [str(expected[0])]
@@ -0,0 +1,86 @@
+import logging
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import pytest
+
+from rulam import instrumentation
+from rulam.discourse import DiscourseSession
+
+
+def read_discourse(depparser):
+    session = DiscourseSession(depparser=depparser)
+    session.add_sentence("Заяц бежит")
+    session.add_sentence("Он серый")
+    session._reading_command.combine_readings([readings[0] for readings in session.readings])
+    return session
+
+
+def test_stage_is_disabled_without_sinks():
+    assert not instrumentation.is_enabled()
+    with instrumentation.stage("glue_proof") as counts:
+        assert counts is None
+
+
+def test_pipeline_stages(depparser):
+    events = []
+    with instrumentation.instrumented(instrumentation.CallbackSink(events.append)):
+        assert instrumentation.is_enabled()
+        read_discourse(depparser)
+    assert not instrumentation.is_enabled()
+
+    by_stage = {}
+    for event in events:
+        by_stage.setdefault(event.stage, []).append(event)
+    assert {
+        "dep_parse", "glue_lookup", "glue_proof", "threads", "combine_readings", "resolve_anaphora"
+    } <= set(by_stage)
+    assert all(event.seconds >= 0 for event in events)
+    assert [event.counts["tokens"] for event in by_stage["glue_lookup"]] == [2, 2]
+    assert [event.counts["glue_formulas"] for event in by_stage["glue_lookup"]] == [2, 3]
+    assert all(event.counts["readings"] == 1 for event in by_stage["glue_proof"])
+    assert all(event.counts["proof_steps"] > 0 for event in by_stage["glue_proof"])
+    assert [event.counts for event in by_stage["threads"]] == [{"readings": 1, "threads": 1}] * 2
+    assert by_stage["combine_readings"][0].counts == {"readings": 2}
+
+
+def test_failed_stage_is_counted():
+    events = []
+    with instrumentation.instrumented(instrumentation.CallbackSink(events.append)):
+        with pytest.raises(ValueError):
+            with instrumentation.stage("glue_proof"):
+                raise ValueError
+    assert events[0].counts == {"errors": 1}
+
+
+def test_logging_sink(caplog):
+    with caplog.at_level(logging.DEBUG, logger="rulam.stages"):
+        with instrumentation.instrumented(instrumentation.LoggingSink()):
+            with instrumentation.stage("glue_proof") as counts:
+                counts["readings"] = 2
+    assert caplog.records[0].getMessage().startswith("glue_proof ")
+    assert caplog.records[0].getMessage().endswith(" readings=2")
+
+
+def test_prometheus_sink(depparser):
+    sink = instrumentation.PrometheusSink()
+    with instrumentation.instrumented(sink):
+        read_discourse(depparser)
+        read_discourse(depparser)
+    text = sink.render()
+    assert '# TYPE rulam_stage_seconds_total counter' in text
+    assert 'rulam_stage_calls_total{stage="glue_lookup"} 4\n' in text
+    assert 'rulam_threads_total{stage="threads"} 4\n' in text
+    assert 'rulam_cache_hit_rate{cache="symbols"}' in text
+
+
+def test_failing_sink_does_not_break_the_pipeline(depparser):
+    def fail(event):
+        raise RuntimeError
+
+    with instrumentation.instrumented(instrumentation.CallbackSink(fail)):
+        assert len(read_discourse(depparser).threads) == 1
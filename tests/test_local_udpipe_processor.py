@@ -0,0 +1,87 @@
+import pytest
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import rulam
+from rulam import local_udpipe_processor
+
+
+TRAINING_CONLLU = """# text = Заяц бежит
+1\tЗаяц\tзаяц\tNOUN\t_\tAnimacy=Anim|Case=Nom|Gender=Masc|Number=Sing\t2\tnsubj\t_\t_
+2\tбежит\tбежать\tVERB\t_\tAspect=Imp|Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin|Voice=Act\t0\troot\t_\t_
+
+# text = Он серый
+1\tОн\tон\tPRON\t_\tCase=Nom|Gender=Masc|Number=Sing|Person=3\t2\tnsubj\t_\t_
+2\tсерый\tсерый\tADJ\t_\tCase=Nom|Degree=Pos|Gender=Masc|Number=Sing\t0\troot\t_\t_
+
+"""
+
+
+@pytest.fixture(scope="module")
+def tiny_model_path(tmp_path_factory):
+    """A toy UDPipe model overfitted on two sentences, so no real model has to be downloaded"""
+    udpipe = pytest.importorskip("ufal.udpipe")
+
+    input_format = udpipe.InputFormat.newConlluInputFormat()
+    input_format.setText(TRAINING_CONLLU * 30)
+    sentences = udpipe.Sentences()
+    sentence = udpipe.Sentence()
+    error = udpipe.ProcessingError()
+    while input_format.nextSentence(sentence, error):
+        sentences.push_back(sentence)
+        sentence = udpipe.Sentence()
+
+    model = udpipe.Trainer.train(
+        "morphodita_parsito", sentences, udpipe.Sentences(),
+        "epochs=2;dimension=16",
+        "iterations=2;guesser_suffix_rules=2",
+        "iterations=1;hidden_layer=20;embedding_form=8;embedding_lemma=0;embedding_upostag=4;"
+        "embedding_feats=4;embedding_xpostag=0;embedding_deprel=4;structured_interval=0",
+        error
+    )
+    assert not error.occurred(), error.message
+
+    path = tmp_path_factory.mktemp("udpipe") / "tiny.udpipe"
+    path.write_bytes(model)
+    return str(path)
+
+
+def test_load_model_without_path(monkeypatch):
+    monkeypatch.delenv(local_udpipe_processor.MODEL_PATH_ENV_VAR, raising=False)
+    with pytest.raises(local_udpipe_processor.LocalUDPipeProcessorError):
+        local_udpipe_processor.load_model()
+
+
+def test_load_model_missing_file(tmp_path):
+    pytest.importorskip("ufal.udpipe")
+    with pytest.raises(local_udpipe_processor.LocalUDPipeProcessorError):
+        local_udpipe_processor.load_model(str(tmp_path / "missing.udpipe"))
+
+
+def test_load_model_is_cached(tiny_model_path):
+    assert local_udpipe_processor.load_model(tiny_model_path) is local_udpipe_processor.load_model(tiny_model_path)
+
+
+def test_local_udpipe_process_text_conllu(tiny_model_path):
+    result = local_udpipe_processor.local_udpipe_process_text_conllu("Заяц бежит", tiny_model_path)
+    assert [line.split("\t")[2] for line in result.splitlines()] == ["заяц", "бежать"]
+
+
+def test_get_parser_local_udpipe_integration_type(tiny_model_path, monkeypatch):
+    monkeypatch.setenv(local_udpipe_processor.MODEL_PATH_ENV_VAR, tiny_model_path)
+    parser = rulam.parser.get_parser(["Заяц бежит", "Он серый"], rulam.parser.IntegrationTypes.LOCAL_UDPIPE_GLUE)
+    parser._construct_readings()
+    assert str(parser._readings["s0"]["s0-r0"]) == "([x],[zajats(x), MALE(x), bezhat(x)])"
+
+
+def test_local_udpipe_process_sentences_conllu(tiny_model_path):
+    result = local_udpipe_processor.local_udpipe_process_sentences_conllu(
+        ["Он серый", "Заяц бежит"], tiny_model_path
+    )
+    assert [[line.split("\t")[1] for line in s.splitlines()] for s in result] == [
+        ["Он", "серый"], ["Заяц", "бежит"]
+    ]
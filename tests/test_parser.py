@@ -20,7 +20,7 @@ def test_get_parser_web_udpipe_integration_type():
     parser.readings(show_thread_readings=True, filter=True)
 
 
-def test_get_parser_local_udpipe_integration_type():
-    with pytest.raises(NotImplementedError) as not_implemented_error:
+def test_get_parser_local_udpipe_integration_type_without_model(monkeypatch):
+    monkeypatch.delenv(rulam.local_udpipe_processor.MODEL_PATH_ENV_VAR, raising=False)
+    with pytest.raises(rulam.local_udpipe_processor.LocalUDPipeProcessorError):
         rulam.parser.get_parser(["Заяц бежит", "Он серый"], rulam.parser.IntegrationTypes.LOCAL_UDPIPE_GLUE)
-        assert str(not_implemented_error) == "Local UDPipe integration is not yet available."
@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import pytest
+
+from rulam.dependency_parser import StaticDependencyParser
+from rulam.serve import DocumentTimeout, ReadingServer, ReadingService, ServiceBusy
+
+
+class BlockingDependencyParser(StaticDependencyParser):
+    """Waits for ``release`` before every parse"""
+
+    def __init__(self, conllu_by_text):
+        super().__init__(conllu_by_text)
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def process_text_conllu(self, text):
+        self.started.release()
+        self.release.wait(5)
+        return super().process_text_conllu(text)
+
+
+@pytest.fixture
+def server(depparser):
+    service = ReadingService(depparser, workers=2, queue_size=2)
+    server = ReadingServer(("127.0.0.1", 0), service, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def post(server, body):
+    url = "http://127.0.0.1:%s/parse" % server.server_address[1]
+    request = urllib.request.Request(url, json.dumps(body).encode("utf-8"), {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode("utf-8"))
+
+
+def test_parse_text(server):
+    status, response = post(server, {"text": "Заяц бежит\nОн серый"})
+    assert status == 200
+    assert [sentence["readings"] for sentence in response["sentences"]] == [
+        ["([x],[zajats(x), MALE(x), bezhat(x)])"], ["([x],[PRO(x), seryj(x), MALE(x)])"]
+    ]
+    thread, = response["threads"]
+    assert thread["readings"] == ["s0-r0", "s1-r0"]
+    pronoun = thread["anaphora"][0]["pronoun"]
+    assert thread["anaphora"] == [{"pronoun": pronoun, "antecedents": ["x"]}]
+    assert "(%s = x)" % pronoun in thread["drs"]
+    assert thread["fol"].startswith("exists x %s." % pronoun)
+
+
+def test_parse_conllu_and_sentences(server, conllu_by_text):
+    _, from_text = post(server, {"text": "Заяц бежит\nОн серый"})
+    _, from_conllu = post(server, {"conllu": "# text = Заяц бежит\n" + "".join(conllu_by_text.values())})
+    _, from_sentences = post(server, {"sentences": ["Заяц бежит", "Он серый"], "max_threads": 1})
+    assert from_conllu["sentences"] == from_text["sentences"] == from_sentences["sentences"]
+    assert len(from_conllu["threads"]) == len(from_sentences["threads"]) == 1
+
+
+def test_errors(server, conllu_by_text):
+    assert post(server, {"txt": "Заяц бежит"})[0] == 400
+    assert post(server, {"text": "Заяц бежит", "max_threads": -1})[0] == 400
+    status, response = post(server, {"text": "Кот спит"})
+    assert status == 422 and response["error"].startswith("KeyError")
+    # the pronoun has no antecedent
+    assert post(server, {"text": "Он серый"}) == (200, {
+        "sentences": [{"conllu": conllu_by_text["Он серый"].strip(), "readings": ["([x],[PRO(x), seryj(x), MALE(x)])"]}],
+        "threads": [],
+    })
+
+
+def test_busy_service_refuses_requests(conllu_by_text):
+    depparser = BlockingDependencyParser(conllu_by_text)
+    service = ReadingService(depparser, workers=1, queue_size=1)
+    try:
+        running = service.submit({"text": "Заяц бежит"})
+        assert depparser.started.acquire(timeout=5)
+        queued = service.submit({"text": "Заяц бежит"})
+        assert service.pending == 2
+        with pytest.raises(ServiceBusy):
+            service.submit({"text": "Заяц бежит"})
+        depparser.release.set()
+        assert running.result(5)["sentences"] and queued.result(5)["sentences"]
+    finally:
+        depparser.release.set()
+        service.close()
+    assert service.pending == 0
+
+
+def test_max_threads_must_be_an_integer(server):
+    assert post(server, {"text": "Заяц бежит", "max_threads": True})[0] == 400
+    assert post(server, {"text": "Заяц бежит", "max_threads": 1.5})[0] == 400
+
+
+def test_cataphora(depparser):
+    service = ReadingService(depparser, workers=1, queue_size=0)
+    try:
+        thread, = service.read({"sentences": ["Он серый", "Заяц бежит"]})["threads"]
+    finally:
+        service.close()
+    # the pronoun of the first sentence refers to the hare of the second one
+    link, = thread["anaphora"]
+    antecedent, = link["antecedents"]
+    assert "zajats(%s)" % antecedent in thread["drs"]
+    assert "(%s = %s)" % (link["pronoun"], antecedent) in thread["drs"]
+
+
+def test_documents_are_given_up_at_the_timeout(conllu_by_text):
+    depparser = BlockingDependencyParser(conllu_by_text)
+    service = ReadingService(depparser, workers=1, queue_size=1, timeout=0.2)
+    try:
+        running = service.submit({"text": "Заяц бежит"})
+        queued = service.submit({"text": "Заяц бежит"})
+        assert depparser.started.acquire(timeout=5)
+        time.sleep(0.3)
+        depparser.release.set()
+        # the worker stops at the deadline instead of finishing both documents
+        with pytest.raises(DocumentTimeout):
+            running.result(5)
+        with pytest.raises(DocumentTimeout):
+            queued.result(5)
+    finally:
+        depparser.release.set()
+        service.close()
+    assert depparser.started.acquire(blocking=False) is False
+
+
+def test_threads_are_bounded_by_steps(depparser):
+    service = ReadingService(depparser, workers=1, queue_size=0, max_steps=1)
+    try:
+        response = service.read({"sentences": ["Заяц бежит", "Он серый"]})
+    finally:
+        service.close()
+    assert len(response["sentences"]) == 2
+    assert response["threads"] == []
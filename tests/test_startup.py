@@ -0,0 +1,35 @@
+import subprocess
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_modules(statement):
+    """Which of the heavy modules are loaded by ``statement`` in a fresh interpreter"""
+    script = "%s\nimport sys\nprint(' '.join(name for name in ('nltk', 'requests') if name in sys.modules))"
+    return subprocess.run(
+        [sys.executable, "-c", script % statement],
+        cwd=REPO, check=True, stdout=subprocess.PIPE, universal_newlines=True,
+    ).stdout.split()
+
+
+@pytest.mark.parametrize("statement", [
+    "import rulam",
+    "import rulam.symbolizer",
+    "import rulam.web_udpipe_processor",
+    "from rulam.dependency_parser import StaticDependencyParser",
+])
+def test_import_does_not_load_heavy_modules(statement):
+    assert loaded_modules(statement) == []
+
+
+def test_submodules_are_loaded_on_access():
+    assert loaded_modules("import rulam; rulam.parser.IntegrationTypes") == ["nltk"]
+    assert loaded_modules("from rulam import symbolizer") == []
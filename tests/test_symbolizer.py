@@ -0,0 +1,47 @@
+import pytest
+
+import sys
+import os
+# TODO: makes test suite able to import submodules, but the solution looks lame
+sys.path.append(os.path.abspath(".."))
+sys.path.append(os.path.abspath("../.."))
+
+from rulam import symbolizer
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    symbolizer.configure_symbolizer_caches()
+    yield
+    symbolizer.configure_symbolizer_caches()
+
+
+@pytest.mark.parametrize(
+    "lemma, symbol",
+    [("заяц", "zajats"), ("щука", "schuka"), ("ёж", "ezh"), ("объём", "obem"), ("Москва", "oskva"), ("e-mail", "email")]
+)
+def test_lemma_to_symbol(lemma, symbol):
+    assert symbolizer.lemma_to_symbol(lemma) == symbol
+
+
+def test_parse_features():
+    features = symbolizer.parse_features("Case=Nom|Gender=Masc|Number=Sing")
+    assert features == {"Case": "Nom", "Gender": "Masc", "Number": "Sing"}
+    assert symbolizer.parse_features("_") == {}
+    with pytest.raises(TypeError):
+        features["Case"] = "Gen"
+
+
+def test_symbolizer_cache_stats():
+    for _ in range(3):
+        symbolizer.SimplestSymbolizer({"lemma": "заяц"}).symb()
+    stats = symbolizer.symbolizer_cache_stats()["symbols"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_configure_symbolizer_caches_bounds_size():
+    symbolizer.configure_symbolizer_caches(symbol_cache_size=2)
+    for lemma in ["заяц", "лиса", "волк", "медведь"]:
+        symbolizer.lemma_to_symbol(lemma)
+    assert symbolizer.symbolizer_cache_stats()["symbols"]["size"] == 2
@@ -1,5 +1,8 @@
+import http.server
 import pytest
 import requests
+import threading
+import time
 
 import sys
 import os
@@ -7,14 +10,24 @@ import os
 sys.path.append(os.path.abspath(".."))
 sys.path.append(os.path.abspath("../.."))
 
-from rulam import web_udpipe_processor
+from rulam import conllu_cache, web_udpipe_processor
+
+
+@pytest.fixture(autouse=True)
+def empty_conllu_cache():
+    default_cache = conllu_cache.get_default_cache()
+    conllu_cache.set_default_cache(conllu_cache.ConlluCache())
+    yield
+    conllu_cache.set_default_cache(default_cache)
 
 
 def test_request_udpipe_processing_connection_error(mocker):
-    mocker.patch("requests.post", side_effect=requests.exceptions.ConnectionError)
+    post = mocker.patch("requests.Session.post", side_effect=requests.exceptions.ConnectionError)
+    mocker.patch("time.sleep")
     with pytest.raises(web_udpipe_processor.WebUDPipeProcessorError) as proc_err:
         web_udpipe_processor.web_udpipe_process_text_conllu("Я иду в лес.")
         assert str(proc_err) == "Failed to establish connection to the server."
+    assert post.call_count == web_udpipe_processor.get_default_client().retries + 1
 
 
 def test_request_udpipe_processing_non_json_value(mocker):
@@ -178,3 +191,146 @@ def test_parse_text_with_empty_value(value):
     with pytest.raises(web_udpipe_processor.WebUDPipeProcessorError) as proc_error:
         web_udpipe_processor.parse_text(value)
         assert str(proc_error) == "Empty value"
+
+
+def test_web_udpipe_process_sentences_conllu_single_request(mocker):
+    request = mocker.patch(
+        "rulam.web_udpipe_processor.request_udpipe_processing",
+        return_value={"result": "# sent_id = 1\n1\tЗаяц\n2\tбежит\n\n# sent_id = 2\n1\tОн\n2\tсерый\n\n"}
+    )
+    result = web_udpipe_processor.web_udpipe_process_sentences_conllu(["Заяц бежит", "Он\nсерый"])
+    request.assert_called_once()
+    assert request.call_args.args[:2] == ("Заяц бежит\nОн серый", web_udpipe_processor.PRESEGMENTED_TOKENIZER)
+    assert result == ["1\tЗаяц\n2\tбежит", "1\tОн\n2\tсерый"]
+
+
+def test_web_udpipe_process_sentences_conllu_caches_every_sentence(mocker):
+    request = mocker.patch(
+        "rulam.web_udpipe_processor.request_udpipe_processing",
+        return_value={"result": "1\tЗаяц\n2\tбежит\n\n1\tОн\n2\tсерый\n\n"}
+    )
+    web_udpipe_processor.web_udpipe_process_sentences_conllu(["Заяц бежит", "Он серый"])
+    request.return_value = {"result": "1\tЛиса\n2\tбежит\n\n"}
+    result = web_udpipe_processor.web_udpipe_process_sentences_conllu(["Он серый", "Лиса бежит", "Заяц бежит"])
+    assert request.call_count == 2
+    assert request.call_args.args[0] == "Лиса бежит"
+    assert result == ["1\tОн\n2\tсерый", "1\tЛиса\n2\tбежит", "1\tЗаяц\n2\tбежит"]
+
+
+def test_web_udpipe_process_sentences_conllu_sentence_count_mismatch(mocker):
+    mocker.patch(
+        "rulam.web_udpipe_processor.request_udpipe_processing",
+        return_value={"result": "1\tЗаяц\n2\tбежит\n\n"}
+    )
+    with pytest.raises(web_udpipe_processor.WebUDPipeProcessorError):
+        web_udpipe_processor.web_udpipe_process_sentences_conllu(["Заяц бежит", "Он серый"])
+
+
+def test_web_udpipe_process_sentences_conllu_with_empty_sentence():
+    with pytest.raises(web_udpipe_processor.WebUDPipeProcessorError):
+        web_udpipe_processor.web_udpipe_process_sentences_conllu(["Заяц бежит", " "])
+
+
+def test_web_udpipe_process_text_conllu_is_cached(mocker):
+    request = mocker.patch(
+        "rulam.web_udpipe_processor.request_udpipe_processing",
+        return_value={"result": "# sent_id = 1\n1\tЗаяц\n2\tбежит\n\n"}
+    )
+    assert web_udpipe_processor.web_udpipe_process_text_conllu("Заяц бежит") == "1\tЗаяц\n2\tбежит\n"
+    assert web_udpipe_processor.web_udpipe_process_text_conllu("  Заяц   бежит ") == "1\tЗаяц\n2\tбежит\n"
+    request.assert_called_once()
+    assert conllu_cache.get_default_cache().stats()["hits"] == 1
+
+
+class StubUDPipeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            server.client_ports.add(self.client_address[1])
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            failure = server.failures.pop(0) if server.failures else None
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        status, body = (failure, "{}") if failure else (200, '{"result": "1\\tЗаяц\\n"}')
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubUDPipeHandler)
+    server.lock = threading.Lock()
+    server.client_ports = set()
+    server.in_flight = server.max_in_flight = 0
+    server.failures = []
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_stub_client(server, **kwargs):
+    return web_udpipe_processor.WebUDPipeClient(
+        "http://127.0.0.1:%s/process" % server.server_address[1], backoff_factor=0.01, **kwargs
+    )
+
+
+def test_web_udpipe_client_keeps_connection_alive(stub_server):
+    client = make_stub_client(stub_server)
+    for text in ["Заяц бежит", "Он серый", "Лиса бежит"]:
+        web_udpipe_processor.web_udpipe_process_text_conllu(text, client=client)
+    assert len(stub_server.client_ports) == 1
+
+
+def test_web_udpipe_client_retries_transient_failures(stub_server):
+    stub_server.failures = [503, 502]
+    client = make_stub_client(stub_server, retries=2)
+    assert web_udpipe_processor.web_udpipe_process_text_conllu("Заяц", client=client) == "1\tЗаяц"
+
+
+def test_web_udpipe_client_gives_up_after_retries(stub_server):
+    stub_server.failures = [503, 503, 503]
+    client = make_stub_client(stub_server, retries=2)
+    with pytest.raises(web_udpipe_processor.WebUDPipeProcessorError):
+        web_udpipe_processor.web_udpipe_process_text_conllu("Заяц", client=client)
+
+
+def test_web_udpipe_client_read_timeout(stub_server):
+    stub_server.delay = 0.5
+    client = make_stub_client(stub_server, read_timeout=0.1, retries=1)
+    with pytest.raises(web_udpipe_processor.WebUDPipeProcessorError) as proc_err:
+        web_udpipe_processor.web_udpipe_process_text_conllu("Заяц", client=client)
+    assert str(proc_err.value) == "Server has not responded in time."
+
+
+def test_web_udpipe_client_caps_concurrency(stub_server):
+    stub_server.delay = 0.05
+    client = make_stub_client(stub_server, max_concurrency=2)
+    threads = [
+        threading.Thread(
+            target=web_udpipe_processor.web_udpipe_process_text_conllu,
+            args=("Заяц %s" % i,),
+            kwargs={"client": client}
+        )
+        for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub_server.max_in_flight == 2